@@ -4,7 +4,21 @@ dotenv.load_dotenv()
 
 import os
 from flask import Flask, Response
-from app.commands import init_database, drop_database, init_user
+from app.commands import (
+    annotate_content,
+    benchmark_encoding,
+    benchmark_topology,
+    create_indexes,
+    drop_database,
+    embed_senses,
+    evaluate_precision,
+    evaluate_retrieval,
+    export_model,
+    init_database,
+    init_user,
+    load_test,
+    tokenize_senses
+)
 from app.extensions import cors, jwt_manager, socketio
 from app.utils.logging import logger
 from app.views import api, base
@@ -41,6 +55,16 @@ def register_commands(app: Flask):
     app.cli.add_command(init_database)
     app.cli.add_command(drop_database)
     app.cli.add_command(init_user)
+    app.cli.add_command(evaluate_precision)
+    app.cli.add_command(export_model)
+    app.cli.add_command(tokenize_senses)
+    app.cli.add_command(benchmark_topology)
+    app.cli.add_command(annotate_content)
+    app.cli.add_command(embed_senses)
+    app.cli.add_command(evaluate_retrieval)
+    app.cli.add_command(load_test)
+    app.cli.add_command(benchmark_encoding)
+    app.cli.add_command(create_indexes)
 
 
 def register_extensions(app: Flask):
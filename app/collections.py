@@ -1,5 +1,6 @@
 from datetime import datetime
-from typing import TypedDict
+import os
+from typing import NotRequired, TypedDict
 from bson.objectid import ObjectId
 from pymongo.collection import Collection
 from app.extensions import mongo
@@ -26,6 +27,9 @@ class Sense(TypedDict):
     type: str
     equivalents: list[Equivalent]
     dictionaryEntryId: ObjectId
+    candidate: NotRequired[str]
+    candidateIds: NotRequired[list[int]]
+    candidateTokenizer: NotRequired[str]
 
 
 class DictionaryEntry(TypedDict):
@@ -48,6 +52,13 @@ class SenseRank(TypedDict):
     senseId: ObjectId
 
 
+class SenseRankCacheEntry(TypedDict):
+    _id: str
+    senseIds: list[ObjectId]
+    ranks: list[float]
+    createdAt: datetime
+
+
 class Highlight(TypedDict):
     position: int
     score: int
@@ -87,9 +98,37 @@ class Content(TypedDict):
     explanations: list[Explanation]
     highlights: list[Highlight]
     userId: ObjectId
+    annotations: NotRequired[list[Highlight]]
+    annotatedAt: NotRequired[datetime]
+
+
+class Metadata(TypedDict):
+    _id: str
+    version: str
+    updatedAt: datetime
 
 
 users: Collection[User] = mongo.db["User"]
 senses: Collection[Sense] = mongo.db["Sense"]
 dictionary_entries: Collection[DictionaryEntry] = mongo.db["DictionaryEntry"]
 contents: Collection[Content] = mongo.db["Content"]
+sense_rank_cache: Collection[SenseRankCacheEntry] = mongo.db["SenseRankCache"]
+metadata: Collection[Metadata] = mongo.db["Metadata"]
+
+# The number of seconds that ranks are kept in the SenseRankCache collection
+rank_cache_ttl = int(os.getenv("INFER_CACHE_TTL", 2592000))
+
+
+def create_indexes() -> None:
+    """
+    Create the indexes that filtered lookups use and the index that expires
+    cached ranks. Each lookup index ends in _id so that filtered pages are
+    read in _id order straight from the index. Indexes that already exist are
+    left unchanged.
+    """
+    dictionary_entries.create_index([("writtenForm", 1), ("partOfSpeech", 1), ("_id", 1)])
+    dictionary_entries.create_index([("partOfSpeech", 1), ("_id", 1)])
+    dictionary_entries.create_index([("grade", 1), ("_id", 1)])
+    senses.create_index([("dictionaryEntryId", 1), ("_id", 1)])
+    contents.create_index([("userId", 1), ("_id", 1)])
+    sense_rank_cache.create_index("createdAt", expireAfterSeconds=rank_cache_ttl)
@@ -1,19 +1,64 @@
 import datetime
-import json
 import os
 import click
 
+from bson.objectid import ObjectId
 from flask.cli import with_appcontext
+from pymongo import UpdateOne
 from tqdm import tqdm
 
-from app.collections import contents, dictionary_entries, senses, User, users
+from app.collections import (
+    contents,
+    create_indexes as create_collection_indexes,
+    sense_rank_cache,
+    senses,
+    User,
+    users
+)
 from app.extensions import mecab, mongo
+from app.utils.cli import parse_counts
+from app.utils.dictionary.annotate import annotate_content as annotate
+from app.utils.dictionary.benchmark import benchmark_topology as benchmark
+from app.utils.dictionary.evaluate import (
+    evaluate_model,
+    evaluate_retrieval as evaluate,
+    evaluation_samples,
+    get_evaluation_sets,
+    get_top_senses
+)
+from app.utils.dictionary.export import export_model as export
+from app.utils.dictionary.importer import embed_senses as embed, import_dictionary
+from app.utils.dictionary.infer import (
+    embeddings_path,
+    load_model,
+    model_name,
+    precisions,
+    render_candidates,
+    retrieval_k
+)
+from app.utils.dictionary.retrieval import SenseEmbeddings
+from app.utils.dictionary.synthetic import get_synthetic_entries
+from app.utils.jsonstream import iter_json_array
+from app.utils.loadtest import load_test as run_load_test
 from app.utils.morphs.parse import get_smap_from_morphs
+from app.utils.serialize import benchmark_encoding as benchmark_formats
 
 
 @click.command()
+@click.option("--batch-size", default=500, type=click.IntRange(min=1))
+@click.option("--writers", default=4, type=click.IntRange(min=1))
 @with_appcontext
-def init_database():
+def init_database(batch_size: int, writers: int):
+    """This command drops the sense rank cache and imports the dictionary from
+    dict.json, embedding every sense if INFER_RETRIEVAL_K is set. It can only
+    be run when MONGO_HOST is localhost.
+
+    Options:
+        --batch-size: (optional) The number of entries inserted per write.
+        Defaults to 500.
+        --writers: (optional) The number of threads writing to the database in
+        parallel. Defaults to 4.
+    """
 
     # Check that the command is being run in a development environment
     if os.getenv("MONGO_HOST") != "localhost":
@@ -22,9 +67,6 @@ def init_database():
     # with open("content.json") as f:
     #     content: list[dict] = json.load(f)
 
-    with open("dict.json") as f:
-        dictionary: list[dict] = json.load(f)
-
     # user: User | None = users.find_one()
     # if user is None:
     #     raise RuntimeError("No user present in the database. Run flask init-user before running flask init-database")
@@ -63,36 +105,65 @@ def init_database():
     # contents.create_index({"surfaces": "text"})
     # result = contents.insert_many(content_data)
 
-    # Initialize the database with the dictionary
+    # Ranks computed against the previous dictionary are no longer valid
+    sense_rank_cache.drop()
+
+    # Initialize the database with the dictionary, parsing one entry at a time
+    # so that the whole file is never held in memory
     print("Initializing dictionary...")
-    for entry in tqdm(dictionary):
-        dictionary_entry = dictionary_entries.insert_one({
-            "sourceId": entry["sourceId"],
-            "sourceLanguage": entry["sourceLanguage"],
-            "writtenForm": entry["writtenForm"],
-            "variations": entry["variations"],
-            "partOfSpeech": entry["partOfSpeech"],
-            "grade": entry["grade"],
-            "queryStrs": entry["queryStrs"],
-        })
-        dictionary_entry_id = dictionary_entry.inserted_id
-
-        for sense in entry["senses"]:
-            senses.insert_one({
-                "senseNo": sense["senseNo"],
-                "definition": sense["definition"],
-                "partOfSpeech": sense["partOfSpeech"],
-                "examples": sense["examples"],
-                "type": sense["type"],
-                "equivalents": sense["equivalents"],
-                "dictionaryEntryId": dictionary_entry_id,
-            })
-
-    dictionary_entries.create_index({"queryStrs": "text"})
+    with open("dict.json", encoding="utf-8") as f:
+        import_dictionary(iter_json_array(f), batch_size=batch_size, writers=writers)
+
+    # Embed every sense for retrieving the senses most similar to a context
+    if retrieval_k:
+        print("Embedding senses...")
+        embed(embeddings_path)
     # return result
 
 
 
+@click.command()
+@click.option("--batch-size", default=1000)
+@with_appcontext
+def tokenize_senses(batch_size: int):
+    """This command renders and tokenizes the candidate response of every sense
+    that was imported without one or with a different model's tokenizer. This
+    is done by flask init-database, so it is only needed for databases that
+    were initialized before candidates were stored or after changing models.
+
+    Options:
+        --batch-size: (optional) The number of senses to update per write.
+        Defaults to 1000.
+    """
+    query = {"candidateTokenizer": {"$ne": model_name}}
+    total = senses.count_documents(query)
+    cursor = senses.find(query, {"definition": 1}, batch_size=batch_size)
+
+    print("Tokenizing senses...")
+    with tqdm(total=total) as progress:
+        batch = []
+
+        for sense in cursor:
+            batch.append(sense)
+
+            if len(batch) == batch_size:
+                _update_sense_candidates(batch)
+                progress.update(len(batch))
+                batch = []
+
+        if batch:
+            _update_sense_candidates(batch)
+            progress.update(len(batch))
+
+
+def _update_sense_candidates(batch: list[dict]) -> None:
+    candidates = render_candidates([sense["definition"] for sense in batch])
+    senses.bulk_write([
+        UpdateOne({"_id": sense["_id"]}, {"$set": candidate})
+        for sense, candidate in zip(batch, candidates)
+    ], ordered=False)
+
+
 @click.command()
 @click.option("--name", default=None)
 @with_appcontext
@@ -123,6 +194,17 @@ def drop_database(name: str | None):
         mongo.client.drop_database(name)
 
 
+@click.command()
+@with_appcontext
+def create_indexes():
+    """This command creates the indexes that filtered GraphQL lookups use.
+    They are also created by init-database, so this is only needed for
+    databases imported before an index was added. Indexes that already exist
+    are left unchanged.
+    """
+    create_collection_indexes()
+
+
 @click.command()
 @click.option("--username", default=None)
 @with_appcontext
@@ -144,3 +226,293 @@ def init_user(username: str | None):
 
     user = users.insert_one({"username": username})
     click.echo(repr(user))
+
+
+@click.command()
+@click.option(
+    "--precision",
+    "-p",
+    multiple=True,
+    type=click.Choice(precisions),
+    default=["int8", "bf16"]
+)
+@with_appcontext
+def evaluate_precision(precision: tuple[str, ...]):
+    """This command evaluates the sense ranking model in reduced numeric
+    precisions against the model in fp32. A fixed set of sample sentences is
+    looked up in the dictionary and every ambiguous word is ranked by each
+    model. The command reports how often the top ranked sense agrees with fp32
+    along with the mean latency per word and the size of the model's weights.
+    The dictionary must be initialized before running this command.
+
+    Options:
+        --precision, -p: (optional) A precision to evaluate. Can be passed more
+        than once. Defaults to int8 and bf16.
+    """
+    candidate_sets = get_evaluation_sets(evaluation_samples)
+    click.echo("Evaluating %d ambiguous words..." % len(candidate_sets))
+
+    reference_model = load_model("fp32")
+    reference, _ = get_top_senses(reference_model, candidate_sets)
+
+    click.echo("%-10s %10s %14s %10s" % ("Precision", "Agreement", "Latency (ms)", "Size (MB)"))
+
+    for p in ["fp32", *precision]:
+        module = reference_model if p == "fp32" else load_model(p)
+        result = evaluate_model(module, candidate_sets, reference)
+
+        click.echo("%-10s %9.1f%% %14.1f %10.1f" % (
+            p,
+            result["agreement"] * 100,
+            result["latency"] * 1000,
+            result["size"] / 1024 ** 2
+        ))
+
+
+@click.command()
+@click.option(
+    "--format",
+    "-f",
+    "formats",
+    multiple=True,
+    type=click.Choice(["torchscript", "onnx"]),
+    default=["torchscript"]
+)
+@click.option("--output", "-o", default="model")
+@with_appcontext
+def export_model(formats: tuple[str, ...], output: str):
+    """This command exports the sense ranking model in fp32 to TorchScript
+    and/or ONNX so that it can be run with the torchscript or onnx inference
+    backend. Set INFER_BACKEND to the exported format and INFER_MODEL_PATH to
+    the output directory to use an exported model.
+
+    Options:
+        --format, -f: (optional) The format to export. Can be passed more than
+        once. Defaults to torchscript.
+        --output, -o: (optional) The directory to save exported models to.
+        Defaults to "model".
+    """
+    module = load_model("fp32")
+
+    for format in formats:
+        file = export(format, output, module)
+        click.echo("Exported %s model to %s" % (format, file))
+
+
+@click.command()
+@click.option("--threads", default="1,2,4", callback=parse_counts)
+@click.option("--workers", default="0,1,2", callback=parse_counts)
+@click.option("--requests", default=200, type=click.IntRange(min=1))
+@click.option("--concurrency", default=8)
+@with_appcontext
+def benchmark_topology(
+        threads: list[int],
+        workers: list[int],
+        requests: int,
+        concurrency: int
+    ):
+    """This command benchmarks the sense ranking model with different thread
+    and worker topologies. For every combination of intra-op thread count and
+    number of inference worker processes, a typical candidate set is ranked
+    from concurrent clients and the median (p50) and 99th percentile (p99)
+    latency and the throughput are reported. Use the results to choose
+    INFER_INTRA_OP_THREADS and INFER_WORKERS for a node.
+
+    Options:
+        --threads: (optional) Comma-separated intra-op thread counts. Defaults
+        to 1,2,4.
+        --workers: (optional) Comma-separated worker process counts, where 0
+        runs the model in the Flask process. Defaults to 0,1,2.
+        --requests: (optional) The number of candidate sets to rank for each
+        topology. Defaults to 200.
+        --concurrency: (optional) The number of concurrent clients. Defaults to
+        8.
+    """
+    results = benchmark(threads, workers, requests, concurrency)
+
+    click.echo("%-8s %-8s %10s %10s %12s" % ("Workers", "Threads", "p50 (ms)", "p99 (ms)", "Requests/s"))
+
+    for result in results:
+        click.echo("%-8d %-8d %10.1f %10.1f %12.1f" % (
+            result["workers"],
+            result["threads"],
+            result["p50"] * 1000,
+            result["p99"] * 1000,
+            result["throughput"]
+        ))
+
+
+@click.command()
+@click.option("--url", default="http://localhost:5000")
+@click.option("--endpoint", type=click.Choice(["infer", "graphql"]), default="infer")
+@click.option("--query", default=None)
+@click.option("--concurrency", default="1,4,16,64", callback=parse_counts)
+@click.option("--requests", default=200, type=click.IntRange(min=1))
+@click.option("--timeout", default=30.0)
+def load_test(
+        url: str,
+        endpoint: str,
+        query: str | None,
+        concurrency: list[int],
+        requests: int,
+        timeout: float
+    ):
+    """This command load tests a running server's /infer or /graphql endpoint
+    from increasing numbers of concurrent clients. For each level of
+    concurrency it reports the latency and throughput of successful requests,
+    the number of requests rejected because the server's executors were full
+    (503), and the mean number of requests in flight. Use the results to
+    choose INFER_EXECUTOR_WORKERS, INFER_EXECUTOR_MAX_PENDING,
+    GRAPHQL_EXECUTOR_WORKERS, and GRAPHQL_EXECUTOR_MAX_PENDING.
+
+    Options:
+        --url: (optional) The URL of the server. Defaults to
+        http://localhost:5000.
+        --endpoint: (optional) The endpoint to test, infer or graphql. Defaults
+        to infer.
+        --query: (optional) The query of each request. Defaults to a sample
+        sentence for infer and a trivial query for graphql.
+        --concurrency: (optional) Comma-separated numbers of concurrent
+        clients. Defaults to 1,4,16,64.
+        --requests: (optional) The number of requests to send at each level of
+        concurrency. Defaults to 200.
+        --timeout: (optional) The number of seconds to wait for each response
+        before counting the request as failed. Defaults to 30.
+    """
+    if endpoint == "infer":
+        query = query or evaluation_samples[1]
+        body = {"Query": query, "Context": query}
+    else:
+        body = {"query": query or "{ __typename }"}
+
+    results = run_load_test("%s/%s" % (url, endpoint), body, concurrency, requests, timeout)
+
+    click.echo("%-8s %6s %9s %7s %10s %10s %12s %10s" % (
+        "Clients", "OK", "Rejected", "Failed", "p50 (ms)", "p99 (ms)", "Requests/s", "In flight"
+    ))
+
+    for result in results:
+        click.echo("%-8d %6d %9d %7d %10.1f %10.1f %12.1f %10.1f" % (
+            result["concurrency"],
+            result["ok"],
+            result["rejected"],
+            result["failed"],
+            result["p50"] * 1000,
+            result["p99"] * 1000,
+            result["throughput"],
+            result["in_flight"]
+        ))
+
+
+@click.command()
+@click.option("--groups", default=8)
+@click.option("--senses", default=8)
+@click.option("--repeats", default=1000)
+def benchmark_encoding(groups: int, senses: int, repeats: int):
+    """This command benchmarks encoding an /infer response in the verbose and
+    compact formats with each available JSON backend. A synthetic response is
+    used, so neither the dictionary nor the model is needed. orjson is used if
+    it is installed.
+
+    Options:
+        --groups: (optional) The number of words in the response. Defaults to
+        8.
+        --senses: (optional) The number of senses of each word. Defaults to 8.
+        --repeats: (optional) The number of times to encode each response.
+        Defaults to 1000.
+    """
+    entries = get_synthetic_entries(groups, senses)
+    results = benchmark_formats(entries, repeats)
+
+    click.echo("%-8s %-13s %10s %12s" % ("Format", "Backend", "Bytes", "Encode (us)"))
+
+    for result in results:
+        click.echo("%-8s %-13s %10d %12.1f" % (
+            result["format"],
+            result["backend"],
+            result["size"],
+            result["latency"] * 1e6
+        ))
+
+
+@click.command()
+@click.option("--output", "-o", default=None)
+@click.option("--batch-size", default=256)
+@with_appcontext
+def embed_senses(output: str | None, batch_size: int):
+    """This command embeds the definition of every sense with the sense
+    ranking model's encoder and saves the embedding matrix. When
+    INFER_RETRIEVAL_K is set, only the senses most similar to the context are
+    ranked by the model. This is done by flask init-database when
+    INFER_RETRIEVAL_K is set, so it is only needed after changing models or to
+    enable retrieval on an existing database.
+
+    Options:
+        --output, -o: (optional) The directory to save the embeddings to.
+        Defaults to INFER_EMBEDDINGS_PATH.
+        --batch-size: (optional) The number of definitions to embed at a time.
+        Defaults to 256.
+    """
+    output = output or embeddings_path
+
+    print("Embedding senses...")
+    embed(output, batch_size)
+    click.echo("Saved sense embeddings to %s" % output)
+
+
+@click.command()
+@click.option("-k", "ks", default="1,3,5,10", callback=parse_counts)
+@with_appcontext
+def evaluate_retrieval(ks: list[int]):
+    """This command evaluates retrieving the senses most similar to a context
+    before ranking. For every ambiguous word in a fixed set of sample
+    sentences, it reports how often the sense ranked highest by the model over
+    all senses is among the k retrieved senses (recall@k). Use the results to
+    choose INFER_RETRIEVAL_K. Senses must be embedded with flask embed-senses
+    before running this command.
+
+    Options:
+        -k: (optional) Comma-separated values of k. Defaults to 1,3,5,10.
+    """
+    embeddings = SenseEmbeddings(embeddings_path)
+    if not embeddings.index:
+        raise click.ClickException("No sense embeddings found. Run flask embed-senses first.")
+
+    recall = evaluate(evaluation_samples, embeddings, ks)
+
+    click.echo("%-6s %10s" % ("k", "Recall"))
+    for k in ks:
+        click.echo("%-6d %9.1f%%" % (k, recall[k] * 100))
+
+
+@click.command()
+@click.option("--id", "ids", multiple=True)
+@click.option("--all", "annotate_all", is_flag=True)
+@with_appcontext
+def annotate_content(ids: tuple[str, ...], annotate_all: bool):
+    """This command ranks the senses of every word in content documents and
+    stores them in each document's annotations so that lookups can be served
+    from stored ranks. Each sentence is looked up in the dictionary and its
+    words are ranked in one batch. Content is also annotated in the background
+    whenever its text is saved unless INFER_ANNOTATE_ON_SAVE is False.
+
+    Options:
+        --id: (optional) The ID of a content document to annotate. Can be
+        passed more than once.
+        --all: (optional) Annotate all content, including content that was
+        already annotated. By default only content that was never annotated
+        is annotated.
+    """
+    if ids:
+        query = {"_id": {"$in": [ObjectId(id) for id in ids]}}
+    elif annotate_all:
+        query = {}
+    else:
+        query = {"annotatedAt": {"$exists": False}}
+
+    total = contents.count_documents(query)
+    cursor = contents.find(query, {"text": 1})
+
+    print("Annotating content...")
+    for content in tqdm(cursor, total=total):
+        annotate(content)
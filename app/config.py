@@ -6,6 +6,7 @@ class Default:
     SECRET_KEY = os.getenv("FLASK_SECRET_KEY", "secret")
     DEBUG = os.getenv("FLASK_DEBUG", True)
     LOG_LEVEL = os.getenv("FLASK_LOG_LEVEL", "INFO")
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "False").lower() == "true"
     TESTING = False
 
 
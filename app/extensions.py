@@ -4,6 +4,7 @@ from flask_socketio import SocketIO
 from mecab import MeCab
 
 from app.utils.cognito import Cognito
+from app.utils.metrics import Metrics
 from app.utils.mongo import Mongo
 
 cognito = Cognito()
@@ -14,6 +15,7 @@ cors = CORS(
 )
 
 mecab = MeCab()
+metrics = Metrics()
 mongo = Mongo()
 socketio = SocketIO()
 jwt_manager = JWTManager()
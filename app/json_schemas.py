@@ -1,4 +1,5 @@
 from functools import wraps
+from inspect import iscoroutinefunction
 from typing import Mapping, TypedDict, NotRequired
 
 from flask import make_response, request
@@ -34,18 +35,33 @@ def validate_schema(schema):
             # Use the validated_data here
             pass
     """
+    def get_error():
+        # Check if the incoming request has a JSON payload
+        if request.json is None:
+            return make_response({"Message": "Missing payload."}, 401)
+        try:
+            # Validate the request JSON data against the provided schema
+            validate(request.json, schema)
+        except ValidationError as e:
+            # Handle validation errors by returning a 401 Unauthorized response
+            return handle_server_error("Invalid paylod.", 401, e)
+
     def wrapped_func(f):
+        # Keep async route functions async so that Flask awaits them
+        if iscoroutinefunction(f):
+            @wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                if (error := get_error()) is not None:
+                    return error
+
+                return await f(*args, validated_data=request.json, **kwargs)
+
+            return async_wrapper
+
         @wraps(f)
         def wrapper(*args, **kwargs):
-            # Check if the incoming request has a JSON payload
-            if request.json is None:
-                return make_response({"Message": "Missing payload."}, 401)
-            try:
-                # Validate the request JSON data against the provided schema
-                validate(request.json, schema)
-            except ValidationError as e:
-                # Handle validation errors by returning a 401 Unauthorized response
-                return handle_server_error("Invalid paylod.", 401, e)
+            if (error := get_error()) is not None:
+                return error
 
             # If validation is successful, pass the validated data to the route function
             return f(*args, validated_data=request.json, **kwargs)
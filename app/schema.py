@@ -1,5 +1,9 @@
+import asyncio
 from datetime import datetime, UTC
+from inspect import isawaitable
+import os
 
+from bson.errors import InvalidId
 from bson.objectid import ObjectId
 from graphene import (
     Boolean,
@@ -11,11 +15,26 @@ from graphene import (
     List,
     Mutation,
     ObjectType,
+    relay,
     Schema,
     String
 )
+from graphql import ExecutionResult, GraphQLError, execute as graphql_execute
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
-from app.collections import contents, dictionary_entries
+from app.collections import contents, dictionary_entries, senses, users
+from app.extensions import cognito, metrics
+from app.utils.cost import CostAnalyzer
+from app.utils.dictionary.annotate import annotate_on_save, queue_annotation
+from app.utils.documents import DocumentCache, get_query_hash, PersistedQueries
+from app.utils.loaders import Loaders
+from app.utils.logging import logger
+from app.utils.pagination import default_page_size, paginate
+from app.utils.projection import get_projection, get_selected_fields
+
+# The largest number of updates in one bulk mutation
+max_bulk_updates = int(os.getenv("GRAPHQL_MAX_BULK_UPDATES", 500))
 
 
 class User(ObjectType):
@@ -23,12 +42,18 @@ class User(ObjectType):
     username = String()
     last_login = DateTime()
 
+    # The document fields needed to resolve each field
+    mongo_fields = {
+        "username": ["username"],
+        "lastLogin": ["lastLogin"],
+    }
+
     @staticmethod
     def from_mongo(document):
         return User(
             id=str(document["_id"]),
-            username=document["username"],
-            last_login=document["lastLogin"]
+            username=document.get("username"),
+            last_login=document.get("lastLogin")
         )
 
 
@@ -55,20 +80,43 @@ class Sense(ObjectType):
     type = String()
     equivalents = List(Equivalent)
     dictionary_entry_id = String()
+    dictionary_entry = Field(lambda: DictionaryEntry)
+
+    async def resolve_dictionary_entry(parent, info):
+        loader = info.context["loaders"].dictionary_entries
+        document = await loader.load(ObjectId(parent.dictionary_entry_id))
+
+        return DictionaryEntry.from_mongo(document) if document else None
+
+    # The document fields needed to resolve each field
+    mongo_fields = {
+        "senseNo": ["senseNo"],
+        "definition": ["definition"],
+        "partOfSpeech": ["partOfSpeech"],
+        "examples": ["examples"],
+        "type": ["type"],
+        "equivalents": ["equivalents"],
+        "dictionaryEntryId": ["dictionaryEntryId"],
+        "dictionaryEntry": ["dictionaryEntryId"],
+    }
 
     @staticmethod
     def from_mongo(document):
+        # Only convert the fields that were projected
         return Sense(
             id=str(document["_id"]),
-            sense_no=document["senseNo"],
-            definition=document["definition"],
-            part_of_speech=document["partOfSpeech"],
-            examples=document["examples"],
-            type=document["type"],
+            sense_no=document.get("senseNo"),
+            definition=document.get("definition"),
+            part_of_speech=document.get("partOfSpeech"),
+            examples=document.get("examples"),
+            type=document.get("type"),
             equivalents=[
-                Equivalent.from_mongo(eq) for eq in document["equivalents"]
+                Equivalent.from_mongo(eq) for eq in document.get("equivalents", [])
             ],
-            dictionary_entry_id=str(document["dictionaryEntryId"])
+            dictionary_entry_id=(
+                str(document["dictionaryEntryId"])
+                if "dictionaryEntryId" in document else None
+            )
         )
 
 
@@ -81,24 +129,47 @@ class DictionaryEntry(ObjectType):
     part_of_speech = String()
     grade = String()
     query_strs = String()
+    senses = List(Sense)
+
+    async def resolve_senses(parent, info):
+        loader = info.context["loaders"].senses_by_entry
+        documents = await loader.load(ObjectId(parent.id))
+
+        return [Sense.from_mongo(document) for document in documents]
+
+    # The document fields needed to resolve each field. Senses are loaded by
+    # the entry's ID.
+    mongo_fields = {
+        "sourceId": ["sourceId"],
+        "sourceLanguage": ["sourceLanguage"],
+        "writtenForm": ["writtenForm"],
+        "variations": ["variations"],
+        "partOfSpeech": ["partOfSpeech"],
+        "grade": ["grade"],
+        "queryStrs": ["queryStrs"],
+    }
 
     @staticmethod
     def from_mongo(document):
         return DictionaryEntry(
             id=str(document["_id"]),
-            source_id=document["sourceId"],
-            source_language=document["sourceLanguage"],
-            written_form=document["writtenForm"],
-            variations=document["variations"],
-            part_of_speech=document["partOfSpeech"],
-            grade=document["grade"],
-            query_strs=document["queryStrs"]
+            source_id=document.get("sourceId"),
+            source_language=document.get("sourceLanguage"),
+            written_form=document.get("writtenForm"),
+            variations=document.get("variations"),
+            part_of_speech=document.get("partOfSpeech"),
+            grade=document.get("grade"),
+            query_strs=document.get("queryStrs")
         )
 
 
 class DictionaryEntryWithSenses(DictionaryEntry):
     senses = List(Sense)
 
+    def resolve_senses(parent, info):
+        # The senses were already joined to the entry
+        return parent.senses
+
     @staticmethod
     def from_mongo(document):
         return DictionaryEntryWithSenses(
@@ -136,8 +207,11 @@ class Highlight(ObjectType):
         return Highlight(
             position=document["position"],
             score=document["score"],
+            # Highlights saved before senseRanks was introduced store their
+            # ranks as sense_ranks
             sense_ranks=[
-                SenseRank.from_mongo(sr) for sr in document["sense_ranks"]
+                SenseRank.from_mongo(sr)
+                for sr in document.get("senseRanks", document.get("sense_ranks", []))
             ]
         )
 
@@ -195,57 +269,249 @@ class Content(ObjectType):
     ix = List(Ix)
     explanations = List(Explanation)
     highlights = List(Highlight)
+    annotations = List(Highlight)
     user_id = String()
+    user = Field(User)
+
+    # Users can only be resolved by themselves
+    async def resolve_user(parent, info):
+        if parent.user_id != str(get_viewer_id(info)):
+            raise GraphQLError("Unauthorized request.")
+
+        document = await info.context["loaders"].users.load(ObjectId(parent.user_id))
+
+        return User.from_mongo(document) if document else None
+
+    # The document fields needed to resolve each field
+    mongo_fields = {
+        "lastModified": ["last_modified"],
+        "method": ["method"],
+        "level": ["level"],
+        "length": ["length"],
+        "format": ["format"],
+        "style": ["style"],
+        "prompt": ["prompt"],
+        "title": ["title"],
+        "text": ["text"],
+        "surfaces": ["surfaces"],
+        "ix": ["ix"],
+        "explanations": ["explanations"],
+        "highlights": ["highlights"],
+        "annotations": ["annotations"],
+        "userId": ["userId"],
+        "user": ["userId"],
+    }
 
     @staticmethod
     def from_mongo(document):
+        # Only convert the fields that were projected
         return Content(
             id=str(document["_id"]),
-            last_modified=document["last_modified"],
-            method=document["method"],
-            level=document["level"],
-            length=document["length"],
-            format=document["format"],
-            style=document["style"],
-            prompt=document["prompt"],
-            title=document["title"],
-            text=document["text"],
+            last_modified=document.get("last_modified"),
+            method=document.get("method"),
+            level=document.get("level"),
+            length=document.get("length"),
+            format=document.get("format"),
+            style=document.get("style"),
+            prompt=document.get("prompt"),
+            title=document.get("title"),
+            text=document.get("text"),
             surfaces=[
                 Surfaces.from_mongo(surface)
-                for surface in document["surfaces"]
+                for surface in document.get("surfaces", [])
             ],
-            ix=[Ix.from_mongo(ix) for ix in document["ix"]],
+            ix=[Ix.from_mongo(ix) for ix in document.get("ix", [])],
             explanations=[
-                Explanation.from_mongo(exp) for exp in document["explanations"]
+                Explanation.from_mongo(exp)
+                for exp in document.get("explanations", [])
             ],
             highlights=[
-                Highlight.from_mongo(hl) for hl in document["highlights"]
+                Highlight.from_mongo(hl) for hl in document.get("highlights", [])
+            ],
+            annotations=[
+                Highlight.from_mongo(hl) for hl in document.get("annotations", [])
             ],
-            user_id=str(document["userId"])
+            user_id=str(document["userId"]) if "userId" in document else None
         )
 
 
-class Query(ObjectType):
-    users = List(User)
-    senses = List(Sense)
-    dictionary_entries = List(DictionaryEntry)
-    contents = List(Content)
+class UserConnection(relay.Connection):
+    class Meta:
+        node = User
+
+
+class SenseConnection(relay.Connection):
+    class Meta:
+        node = Sense
+
+
+class DictionaryEntryConnection(relay.Connection):
+    class Meta:
+        node = DictionaryEntry
+
+
+class ContentConnection(relay.Connection):
+    class Meta:
+        node = Content
 
-    def resolve_users(self, info):
-        users = users.find()
-        return [User.from_mongo(u) for u in users]
 
-    def resolve_senses(self, info):
-        senses = senses.find()
-        return [Sense.from_mongo(s) for s in senses]
+# The path from a connection field to its nodes
+node_path = ("edges", "node")
+
+
+def get_filter(**kwargs) -> dict:
+    """
+    Translate the filter arguments of a connection field into a MongoDB
+    filter. Arguments that were not given are ignored and arguments named
+    like "userId" are converted to ObjectIds.
+
+    Raises:
+        GraphQLError: If an ID argument is not a valid ObjectId.
+
+    Returns:
+        dict
+    """
+    filter = {}
+
+    for name, value in kwargs.items():
+        if value is None:
+            continue
+
+        if name.endswith("Id"):
+            try:
+                value = ObjectId(value)
+            except InvalidId:
+                raise GraphQLError("Invalid %s: %s" % (name, value))
+
+        filter[name] = value
+
+    return filter
+
+
+def get_viewer_id(info) -> ObjectId:
+    """
+    Get the ID of the user who sent a GraphQL request from the Access Token in
+    its Authorization header. The token is verified as by the /verify view
+    and the user is looked up once per request.
+
+    Args:
+        info (ResolveInfo)
+
+    Raises:
+        GraphQLError: If the request has no valid Access Token.
+
+    Returns:
+        ObjectId
+    """
+    context = info.context
+
+    if "viewer_id" not in context:
+        context["viewer_id"] = None
+        access_token = context.get("access_token")
+
+        if access_token:
+            try:
+                claim = cognito.get_claim_from_access_token(access_token)
+            except Exception as e:
+                logger.info("Invalid GraphQL access token: %s" % e)
+            else:
+                user = users.find_one({"username": claim["username"]}, {"_id": 1})
+                context["viewer_id"] = user["_id"] if user else None
+
+    if context["viewer_id"] is None:
+        raise GraphQLError("Unauthorized request.")
+
+    return context["viewer_id"]
+
+
+class Query(ObjectType):
+    users = Field(UserConnection, first=Int(), after=String())
+    senses = Field(
+        SenseConnection,
+        first=Int(),
+        after=String(),
+        dictionary_entry_id=String()
+    )
+    dictionary_entries = Field(
+        DictionaryEntryConnection,
+        first=Int(),
+        after=String(),
+        written_form=String(),
+        part_of_speech=String(),
+        grade=String()
+    )
+    contents = Field(
+        ContentConnection,
+        first=Int(),
+        after=String(),
+        user_id=String()
+    )
+
+    # Only fetch the fields selected on each connection's nodes. Users can
+    # only list themselves
+    def resolve_users(self, info, first=None, after=None):
+        return paginate(
+            users,
+            UserConnection,
+            User.from_mongo,
+            first,
+            after,
+            filter={"_id": get_viewer_id(info)},
+            projection=get_projection(info, User.mongo_fields, node_path)
+        )
+
+    # Filters are served by the indexes created by create_indexes
+    def resolve_senses(self, info, first=None, after=None, dictionary_entry_id=None):
+        return paginate(
+            senses,
+            SenseConnection,
+            Sense.from_mongo,
+            first,
+            after,
+            filter=get_filter(dictionaryEntryId=dictionary_entry_id),
+            projection=get_projection(info, Sense.mongo_fields, node_path)
+        )
 
-    def resolve_dictionary_entries(self, info):
-        entries = dictionary_entries.find()
-        return [DictionaryEntry.from_mongo(e) for e in entries]
+    def resolve_dictionary_entries(
+            self,
+            info,
+            first=None,
+            after=None,
+            written_form=None,
+            part_of_speech=None,
+            grade=None
+        ):
+        return paginate(
+            dictionary_entries,
+            DictionaryEntryConnection,
+            DictionaryEntry.from_mongo,
+            first,
+            after,
+            filter=get_filter(
+                writtenForm=written_form,
+                partOfSpeech=part_of_speech,
+                grade=grade
+            ),
+            projection=get_projection(info, DictionaryEntry.mongo_fields, node_path)
+        )
 
-    def resolve_contents(self, info):
-        contents = contents.find()
-        return [Content.from_mongo(c) for c in contents]
+    # Users can only list their own content
+    def resolve_contents(self, info, first=None, after=None, user_id=None):
+        viewer_id = get_viewer_id(info)
+        filter = get_filter(userId=user_id)
+
+        if filter.setdefault("userId", viewer_id) != viewer_id:
+            raise GraphQLError("Unauthorized request.")
+
+        return paginate(
+            contents,
+            ContentConnection,
+            Content.from_mongo,
+            first,
+            after,
+            filter=filter,
+            projection=get_projection(info, Content.mongo_fields, node_path)
+        )
 
 
 class ContentSurfacesInput(InputObjectType):
@@ -266,7 +532,7 @@ class ExplanationInput(InputObjectType):
 
 class SenseRankInput(InputObjectType):
     rank = Float()
-    senseId = String()
+    senseId = String(required=True)
 
 
 class HighlightInput(InputObjectType):
@@ -275,6 +541,58 @@ class HighlightInput(InputObjectType):
     sense_ranks = List(SenseRankInput)
 
 
+def highlight_to_mongo(highlight: dict) -> dict:
+    """
+    Convert a highlight input to the format that highlights are stored in.
+
+    Args:
+        highlight (dict)
+
+    Raises:
+        GraphQLError: If a sense rank's senseId is not a valid ID.
+
+    Returns:
+        dict
+    """
+    sense_ranks = []
+
+    for sense_rank in highlight.get("sense_ranks") or []:
+        sense_id = sense_rank.get("senseId")
+        if not ObjectId.is_valid(sense_id):
+            raise GraphQLError("Invalid senseId: %s" % sense_id)
+
+        sense_ranks.append({"rank": sense_rank.get("rank"), "senseId": ObjectId(sense_id)})
+
+    return {
+        "position": highlight.get("position"),
+        "score": highlight.get("score"),
+        "senseRanks": sense_ranks,
+    }
+
+
+def get_content_updates(kwargs: dict) -> dict:
+    """
+    Get the fields of a content document to set from the arguments of a
+    mutation. Arguments that were not given are ignored and last_modified
+    defaults to now.
+
+    Args:
+        kwargs (dict)
+
+    Returns:
+        dict
+    """
+    updates = {k: v for k, v in kwargs.items() if v is not None}
+
+    if "highlights" in updates:
+        updates["highlights"] = [highlight_to_mongo(hl) for hl in updates["highlights"]]
+
+    if "last_modified" not in updates:
+        updates["last_modified"] = datetime.now(UTC)
+
+    return updates
+
+
 class UpdateContent(Mutation):
     class Arguments:
         id = String(required=True)
@@ -297,22 +615,225 @@ class UpdateContent(Mutation):
 
     def mutate(self, info, id, **kwargs):
         content_id = ObjectId(id)
-        updates = {k: v for k, v in kwargs.items() if v is not None}
-
-        if "last_modified" not in updates:
-            updates["last_modified"] = datetime.now(UTC)
+        updates = get_content_updates(kwargs)
 
         result = contents.find_one_and_update(
             {"_id": content_id},
             {"$set": updates},
+            projection=get_projection(info, Content.mongo_fields, ("content",)),
             return_document=True
         )
 
+        # Rank the senses of the new text in the background, unless the
+        # learner saved highlights for it
+        if "text" in updates and "highlights" not in updates and annotate_on_save:
+            queue_annotation(content_id)
+
         return UpdateContent(content=Content.from_mongo(result), ok=True)
 
 
+class ContentUpdateInput(InputObjectType):
+    id = String(required=True)
+    last_modified = DateTime()
+    method = String()
+    level = String()
+    length = String()
+    format = String()
+    style = String()
+    prompt = String()
+    title = String()
+    text = String()
+    surfaces = List(ContentSurfacesInput)
+    ix = List(ContentIxInput)
+    explanations = List(ExplanationInput)
+    highlights = List(HighlightInput)
+    push_explanations = List(ExplanationInput)
+    push_highlights = List(HighlightInput)
+
+
+class BulkUpdateContents(Mutation):
+    """
+    Apply many partial content updates in one unordered bulk write. Fields
+    that are given are set, and pushExplanations and pushHighlights append to
+    a content's explanations and highlights without replacing them. Updates
+    that fail do not stop the others. The updated contents are only fetched
+    if they are selected.
+    """
+    class Arguments:
+        updates = List(ContentUpdateInput, required=True)
+
+    ok = Boolean()
+    matched_count = Int()
+    modified_count = Int()
+    ids = List(String)
+    errors = List(String)
+    contents = List(lambda: Content)
+
+    def mutate(self, info, updates):
+        if len(updates) > max_bulk_updates:
+            raise GraphQLError("updates must have at most %d items." % max_bulk_updates)
+
+        operations = []
+        content_ids = []
+        annotate_ids = []
+
+        for update in updates:
+            id = update.pop("id")
+            try:
+                content_id = ObjectId(id)
+            except InvalidId:
+                raise GraphQLError("Invalid id: %s" % id)
+
+            push = {
+                "explanations": update.pop("push_explanations", None),
+                "highlights": [
+                    highlight_to_mongo(hl) for hl in update.pop("push_highlights", None) or []
+                ],
+            }
+
+            document = {"$set": get_content_updates(update)}
+            push = {k: {"$each": v} for k, v in push.items() if v}
+            if push:
+                document["$push"] = push
+
+            operations.append(UpdateOne({"_id": content_id}, document))
+            content_ids.append(content_id)
+
+            if "text" in document["$set"] and not (
+                "highlights" in document["$set"] or "highlights" in push
+            ):
+                annotate_ids.append(content_id)
+
+        errors = []
+
+        if not operations:
+            return BulkUpdateContents(ok=True, matched_count=0, modified_count=0, ids=[], errors=[])
+
+        try:
+            result = contents.bulk_write(operations, ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            result = e.details
+            errors = [
+                "%s: %s" % (content_ids[error["index"]], error["errmsg"])
+                for error in result["writeErrors"]
+            ]
+
+        # Rank the senses of the new texts in the background, unless the
+        # learner saved highlights for them
+        if annotate_on_save:
+            for content_id in annotate_ids:
+                queue_annotation(content_id)
+
+        result_contents = None
+        if "contents" in get_selected_fields(info):
+            result_contents = [
+                Content.from_mongo(document) for document in contents.find(
+                    {"_id": {"$in": content_ids}},
+                    get_projection(info, Content.mongo_fields, ("contents",))
+                )
+            ]
+
+        return BulkUpdateContents(
+            ok=not errors,
+            matched_count=result["nMatched"],
+            modified_count=result["nModified"],
+            ids=[str(content_id) for content_id in content_ids],
+            errors=errors,
+            contents=result_contents
+        )
+
+
 class Mutation(ObjectType):
     update_content = UpdateContent.Field()
+    bulk_update_contents = BulkUpdateContents.Field()
 
 
 schema = Schema(query=Query, mutation=Mutation)
+
+
+# Parse and validate each distinct query once per process
+documents = DocumentCache(schema.graphql_schema)
+persisted_queries = PersistedQueries()
+
+# Fields that query MongoDB weigh more than the fields of documents that were
+# already fetched
+cost_analyzer = CostAnalyzer(
+    schema.graphql_schema,
+    default_first=default_page_size,
+    weights={
+        "Query.users": 10,
+        "Query.senses": 10,
+        "Query.dictionaryEntries": 10,
+        "Query.contents": 10,
+        "Mutation.updateContent": 10,
+        "Mutation.bulkUpdateContents": 10,
+        "Sense.dictionaryEntry": 2,
+        "DictionaryEntry.senses": 2,
+        "Content.user": 2,
+    }
+)
+
+
+def execute(
+        query: str | None,
+        variables: dict | None = None,
+        operation_name: str | None = None,
+        query_hash: str | None = None,
+        access_token: str | None = None
+    ) -> ExecutionResult:
+    """
+    Execute a GraphQL request with its own loaders. Relations are resolved
+    asynchronously so that the loaders can batch the IDs requested by every
+    object in a list into one query per relation.
+
+    Args:
+        query (str | None): The query, or None to execute a persisted query
+        variables (dict | None, optional): Defaults to None.
+        operation_name (str | None, optional): Defaults to None.
+        query_hash (str | None, optional): The hash of a persisted query to
+            execute if query is None. Defaults to None.
+        access_token (str | None, optional): The Access Token of the user who
+            sent the request, verified by the resolvers of user data. Defaults
+            to None.
+
+    Returns:
+        ExecutionResult
+    """
+    if query is None and query_hash is not None:
+        query = persisted_queries.get(query_hash)
+        if query is None:
+            return ExecutionResult(None, [GraphQLError("PersistedQueryNotFound")])
+
+    if not query:
+        return ExecutionResult(None, [GraphQLError("Missing query.")])
+
+    if persisted_queries.only and persisted_queries.get(get_query_hash(query)) is None:
+        return ExecutionResult(None, [GraphQLError("Only persisted queries are allowed.")])
+
+    document, errors = documents.get(query)
+    if errors:
+        return ExecutionResult(None, errors)
+
+    # Reject operations that are too expensive before executing them
+    cost = cost_analyzer.get_cost(document, operation_name, variables)
+    logger.info("GraphQL operation %s cost %d depth %d" % (
+        operation_name or get_query_hash(query)[:12], cost.cost, cost.depth
+    ))
+    metrics.maximum("graphql.cost_max", cost.cost)
+
+    if (error := cost_analyzer.check(cost)) is not None:
+        metrics.increment("graphql.rejected")
+        return ExecutionResult(None, [error])
+
+    async def run():
+        result = graphql_execute(
+            schema.graphql_schema,
+            document,
+            variable_values=variables,
+            operation_name=operation_name,
+            context_value={"loaders": Loaders(), "access_token": access_token}
+        )
+
+        return await result if isawaitable(result) else result
+
+    return asyncio.run(run())
@@ -0,0 +1,88 @@
+from hashlib import sha256
+import os
+import re
+from threading import Lock
+import time
+from typing import Callable, Generic, TypeVar
+import unicodedata
+
+T = TypeVar("T")
+
+# The number of seconds that clients and shared caches may reuse a GET /infer
+# response before revalidating it
+max_age = int(os.getenv("INFER_CACHE_MAX_AGE", 86400))
+
+# The number of seconds that each process reuses the dictionary version
+version_ttl = float(os.getenv("INFER_VERSION_TTL", 5))
+
+
+class TTLValue(Generic[T]):
+    """
+    A value that is computed at most once every ttl seconds in each process,
+    so that a value read on every request (e.g., the dictionary version) does
+    not need a database round trip each time.
+
+    Attributes:
+        fn (Callable[[], T]): The function that computes the value
+        ttl (float): The number of seconds the value is reused
+    """
+    def __init__(self, fn: Callable[[], T], ttl: float):
+        self.fn = fn
+        self.ttl = ttl
+        self._value: T | None = None
+        self._expires = 0.0
+        self._lock = Lock()
+
+    def get(self) -> T:
+        """
+        Get the value, computing it again if it has expired.
+
+        Returns:
+            T
+        """
+        with self._lock:
+            if time.monotonic() >= self._expires:
+                self._value = self.fn()
+                self._expires = time.monotonic() + self.ttl
+
+            return self._value
+
+
+def canonicalize_text(text: str | None) -> str:
+    """
+    Normalize text so that requests that differ only in Unicode composition or
+    whitespace share a URL and an ETag.
+
+    Args:
+        text (str | None)
+
+    Returns:
+        str: The text in NFC form with runs of whitespace collapsed to a single
+            space and leading and trailing whitespace removed
+    """
+    if not text:
+        return ""
+
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def get_etag(*parts: str) -> str:
+    """
+    Get a strong ETag that changes whenever any of its parts change.
+
+    Args:
+        *parts (str): The canonical inputs of a response and the versions of
+            everything it was computed from
+
+    Returns:
+        str: The unquoted ETag
+    """
+    digest = sha256()
+
+    for part in parts:
+        # Prefix each part with its length so that parts cannot run together
+        encoded = part.encode()
+        digest.update(b"%d:" % len(encoded))
+        digest.update(encoded)
+
+    return digest.hexdigest()
@@ -0,0 +1,45 @@
+from statistics import quantiles
+
+import click
+
+
+def parse_counts(ctx: click.Context, param: click.Parameter, value: str) -> list[int]:
+    """
+    Parse a comma-separated list of integers passed to a command option.
+
+    Args:
+        ctx (click.Context)
+        param (click.Parameter)
+        value (str)
+
+    Raises:
+        click.BadParameter: If any item is not an integer.
+
+    Returns:
+        list[int]
+    """
+    try:
+        return [int(x) for x in value.split(",")]
+    except ValueError:
+        raise click.BadParameter("Must be a comma-separated list of integers.")
+
+
+def get_percentiles(latencies: list[float]) -> list[float]:
+    """
+    Get the 1st to 99th percentiles of a list of latencies for a benchmark
+    report.
+
+    Args:
+        latencies (list[float])
+
+    Returns:
+        list[float]: 99 percentiles. Every percentile of a single latency is
+            that latency, and every percentile of no latencies is 0.
+    """
+    if not latencies:
+        return [0.0] * 99
+
+    if len(latencies) == 1:
+        return latencies * 99
+
+    return quantiles(latencies, n=100)
@@ -0,0 +1,218 @@
+import os
+from typing import NamedTuple
+
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    get_named_type,
+    get_nullable_type,
+    GraphQLError,
+    GraphQLObjectType,
+    GraphQLSchema,
+    InlineFragmentNode,
+    is_list_type,
+    OperationDefinitionNode,
+    OperationType,
+    SelectionSetNode
+)
+from graphql.execution.values import get_argument_values
+
+
+class QueryCost(NamedTuple):
+    cost: int
+    depth: int
+
+
+class CostAnalyzer():
+    """
+    Estimate the cost of a GraphQL operation before it is executed. The cost
+    of a field is its weight plus the cost of its selections multiplied by the
+    number of objects it returns: the value of its "first" argument if it has
+    one (the number of edges of a connection), and the expected size of a
+    list otherwise. The edges of a connection are not multiplied again.
+    Introspection fields are free.
+
+    This class will initialize using the following environment variables. If
+    they are not initialized, default values will be used.
+     - GRAPHQL_MAX_COST (default: 10000)
+     - GRAPHQL_MAX_DEPTH (default: 10)
+     - GRAPHQL_LIST_SIZE (default: 10)
+
+    Attributes:
+        schema (GraphQLSchema)
+        max_cost (int)
+        max_depth (int)
+        list_size (int): The expected number of objects in a list without a
+            "first" argument
+        default_first (int): The number of edges of a connection when "first"
+            is not given
+        weights (dict[str, int]): The weights of fields that do not weigh 1,
+            as "Type.field"
+    """
+    def __init__(
+            self,
+            schema: GraphQLSchema,
+            default_first: int,
+            weights: dict[str, int] | None = None,
+            max_cost: int | None = None,
+            max_depth: int | None = None
+        ):
+        self.schema = schema
+
+        if max_cost is None:
+            max_cost = int(os.getenv("GRAPHQL_MAX_COST", 10000))
+        self.max_cost = max_cost
+
+        if max_depth is None:
+            max_depth = int(os.getenv("GRAPHQL_MAX_DEPTH", 10))
+        self.max_depth = max_depth
+
+        self.list_size = int(os.getenv("GRAPHQL_LIST_SIZE", 10))
+        self.default_first = default_first
+        self.weights = weights or {}
+
+    def get_cost(
+            self,
+            document: DocumentNode,
+            operation_name: str | None = None,
+            variables: dict | None = None
+        ) -> QueryCost:
+        """
+        Get the cost and depth of an operation in a validated document.
+
+        Args:
+            document (DocumentNode)
+            operation_name (str | None, optional): Defaults to None.
+            variables (dict | None, optional): Defaults to None.
+
+        Returns:
+            QueryCost
+        """
+        operations = [
+            definition for definition in document.definitions
+            if isinstance(definition, OperationDefinitionNode) and (
+                operation_name is None
+                or (definition.name and definition.name.value == operation_name)
+            )
+        ]
+
+        if not operations:
+            return QueryCost(0, 0)
+
+        operation = operations[0]
+        fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+
+        if operation.operation == OperationType.MUTATION:
+            root = self.schema.mutation_type
+        else:
+            root = self.schema.query_type
+
+        return self._get_selection_cost(
+            root, operation.selection_set, fragments, variables or {}, 1
+        )
+
+    def _get_selection_cost(
+            self,
+            parent: GraphQLObjectType,
+            selection_set: SelectionSetNode | None,
+            fragments: dict[str, FragmentDefinitionNode],
+            variables: dict,
+            depth: int
+        ) -> QueryCost:
+        if selection_set is None:
+            return QueryCost(0, depth - 1)
+
+        cost = 0
+        max_depth = depth - 1
+
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                result = self._get_field_cost(parent, selection, fragments, variables, depth)
+
+            else:
+                if isinstance(selection, FragmentSpreadNode):
+                    fragment = fragments[selection.name.value]
+                else:
+                    fragment = selection
+
+                # Fragments on this schema's types are always on the parent
+                result = self._get_selection_cost(
+                    parent, fragment.selection_set, fragments, variables, depth
+                )
+
+            cost += result.cost
+            max_depth = max(max_depth, result.depth)
+
+        return QueryCost(cost, max_depth)
+
+    def _get_field_cost(
+            self,
+            parent: GraphQLObjectType,
+            node: FieldNode,
+            fragments: dict[str, FragmentDefinitionNode],
+            variables: dict,
+            depth: int
+        ) -> QueryCost:
+        name = node.name.value
+
+        if name.startswith("__") or name not in parent.fields:
+            return QueryCost(0, depth)
+
+        field = parent.fields[name]
+        field_type = get_named_type(field.type)
+
+        if "first" in field.args:
+            try:
+                first = get_argument_values(field, node, variables).get("first")
+            except GraphQLError:
+                first = None
+            multiplier = self.default_first if first is None else first
+
+        # The edges of a connection were already multiplied by "first"
+        elif is_list_type(get_nullable_type(field.type)) and not (
+            name == "edges" and "pageInfo" in parent.fields
+        ):
+            multiplier = self.list_size
+
+        else:
+            multiplier = 1
+
+        weight = self.weights.get("%s.%s" % (parent.name, name), 1)
+
+        if not isinstance(field_type, GraphQLObjectType):
+            return QueryCost(weight, depth)
+
+        result = self._get_selection_cost(
+            field_type, node.selection_set, fragments, variables, depth + 1
+        )
+
+        return QueryCost(weight + multiplier * result.cost, result.depth)
+
+    def check(self, cost: QueryCost) -> GraphQLError | None:
+        """
+        Check a cost against the limits.
+
+        Args:
+            cost (QueryCost)
+
+        Returns:
+            GraphQLError | None: An error if the operation is over budget
+        """
+        if cost.depth > self.max_depth:
+            return GraphQLError(
+                "Query depth %d exceeds the maximum of %d." % (cost.depth, self.max_depth)
+            )
+
+        if cost.cost > self.max_cost:
+            return GraphQLError(
+                "Query cost %d exceeds the maximum of %d. Request fewer objects "
+                "with \"first\" or select fewer nested lists." % (cost.cost, self.max_cost)
+            )
+
+        return None
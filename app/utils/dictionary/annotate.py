@@ -0,0 +1,123 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, UTC
+import os
+
+from bson.objectid import ObjectId
+
+from app.collections import Content, contents, DictionaryEntryWithSenses, Highlight
+from app.extensions import metrics
+from app.utils.dictionary.context import get_sentences
+from app.utils.dictionary.infer import get_inference
+from app.utils.logging import logger
+
+# Annotate content in the background whenever its text is saved
+annotate_on_save = os.getenv("INFER_ANNOTATE_ON_SAVE", "True").lower() == "true"
+
+# Annotations run one at a time so they do not compete with requests
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="annotate")
+
+
+def get_word_position(entry: DictionaryEntryWithSenses, sentence: str) -> int:
+    """
+    Get the index of a dictionary entry's word in the sentence it was found
+    in. Inflected words may not appear in any of their written forms, in which
+    case the start of the sentence is returned.
+
+    Args:
+        entry (DictionaryEntryWithSenses)
+        sentence (str)
+
+    Returns:
+        int
+    """
+    for form in [entry["writtenForm"], *entry["variations"], *entry["queryStrs"]]:
+        if form and (i := sentence.find(form)) >= 0:
+            return i
+
+    return 0
+
+
+def get_highlights(text: str) -> list[Highlight]:
+    """
+    Rank the senses of every word in a text. Each sentence is looked up in the
+    dictionary and ranked in one batch with the sentence as its context, which
+    is the same context the sentence's words are ranked in when they are
+    clicked. Ranks are therefore also stored in the rank cache.
+
+    Args:
+        text (str)
+
+    Returns:
+        list[Highlight]: One highlight per word, where position is the index of
+            the word in the text and score is the rank of its top sense as a
+            percentage
+    """
+    highlights: list[Highlight] = []
+
+    for start, sentence in get_sentences(text):
+        for entry in get_inference(sentence, context=sentence):
+            ranks = [
+                {"rank": sense["rank"], "senseId": sense["_id"]}
+                for sense in entry["senses"]
+            ]
+            ranks.sort(key=lambda x: x["rank"], reverse=True)
+
+            highlights.append({
+                "position": start + get_word_position(entry, sentence),
+                "score": round(ranks[0]["rank"] * 100),
+                "senseRanks": ranks,
+            })
+
+    return highlights
+
+
+def annotate_content(content: Content) -> bool:
+    """
+    Rank the senses of every word in a content document and store them in its
+    annotations. Annotations are kept apart from the highlights that learners
+    save, which are never changed. The annotations are only stored if the
+    content's text was not changed while it was being annotated.
+
+    Args:
+        content (Content)
+
+    Returns:
+        bool: Whether the annotations were stored
+    """
+    highlights = get_highlights(content["text"])
+
+    result = contents.update_one(
+        {"_id": content["_id"], "text": content["text"]},
+        {"$set": {
+            "annotations": highlights,
+            "annotatedAt": datetime.now(UTC),
+        }}
+    )
+
+    metrics.increment("annotate.contents")
+    metrics.increment("annotate.highlights", len(highlights))
+
+    return result.modified_count > 0
+
+
+def _annotate(content_id: ObjectId) -> None:
+    try:
+        content = contents.find_one({"_id": content_id})
+        if content is not None:
+            annotate_content(content)
+
+    except Exception as e:
+        logger.exception(e)
+
+
+def queue_annotation(content_id: ObjectId) -> Future:
+    """
+    Annotate a content document in the background.
+
+    Args:
+        content_id (ObjectId)
+
+    Returns:
+        Future
+    """
+    return executor.submit(_annotate, content_id)
@@ -0,0 +1,232 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import time
+from typing import Callable, TypedDict
+
+import torch
+
+from app.collections import dictionary_entries, senses
+from app.utils.cli import get_percentiles
+from app.utils.dictionary.dictionary import query_dictionary
+from app.utils.dictionary.importer import import_dictionary
+from app.utils.dictionary.infer import (
+    backend,
+    backend_name,
+    encode_pairs,
+    get_candidate,
+    get_inference,
+    get_prompt,
+    load_backend,
+    precision,
+    score_sequences,
+    Sequence
+)
+from app.utils.dictionary.synthetic import (
+    get_synthetic_dictionary,
+    get_synthetic_query
+)
+from app.utils.dictionary.workers import InferenceWorkerPool
+
+
+class TopologyResult(TypedDict):
+    threads: int
+    workers: int
+    p50: float
+    p99: float
+    throughput: float
+
+
+class InferenceResult(TypedDict):
+    groups: int
+    senses: int
+    context: int
+    length: int
+    lookup: float
+    p50: float
+    p99: float
+    throughput: float
+
+
+def get_benchmark_sequences() -> list[Sequence]:
+    """
+    Get the encoded candidate set of a typical ambiguous word.
+
+    Returns:
+        list[Sequence]
+    """
+    prompt = get_prompt("눈이 많이 와서 길이 미끄러워요.", "눈")
+    definitions = [
+        "빛의 자극을 받아 물체를 볼 수 있는 감각 기관.",
+        "사물을 보고 판단하는 힘.",
+        "대기 중의 수증기가 찬 기운을 만나 얼어서 땅 위로 떨어지는 얼음의 결정체.",
+        "저울, 자 등에 표시하여 길이, 양, 무게 등을 나타내는 금.",
+        "그물 따위에서 코와 코를 이어 이룬 구멍.",
+    ]
+
+    return encode_pairs([
+        [prompt, get_candidate(definition)] for definition in definitions
+    ])
+
+
+def measure(
+        run: Callable[[list[Sequence]], list[float]],
+        sequences: list[Sequence],
+        requests: int,
+        concurrency: int
+    ) -> tuple[list[float], float]:
+    """
+    Run a candidate set a number of times from concurrent clients and measure
+    the latency of each run.
+
+    Args:
+        run (Callable[[list[Sequence]], list[float]])
+        sequences (list[Sequence])
+        requests (int): The total number of runs
+        concurrency (int): The number of concurrent clients
+
+    Returns:
+        tuple[list[float], float]: A (latencies, elapsed) tuple in seconds
+    """
+    def request(_: int) -> float:
+        start = time.perf_counter()
+        run(sequences)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        latencies = list(executor.map(request, range(requests)))
+
+    return latencies, time.perf_counter() - start
+
+
+def benchmark_topology(
+        threads: list[int],
+        workers: list[int],
+        requests: int = 200,
+        concurrency: int = 8
+    ) -> list[TopologyResult]:
+    """
+    Measure the latency and throughput of the model for every combination of
+    intra-op thread count and number of inference worker processes. A worker
+    count of 0 runs the model in this process.
+
+    Args:
+        threads (list[int]): Intra-op thread counts to benchmark
+        workers (list[int]): Worker process counts to benchmark
+        requests (int, optional): The number of candidate sets to run for each
+            topology. Defaults to 200.
+        concurrency (int, optional): The number of concurrent clients.
+            Defaults to 8.
+
+    Returns:
+        list[TopologyResult]: The median and 99th percentile latency in seconds
+            and the throughput in candidate sets per second of each topology
+    """
+    sequences = get_benchmark_sequences()
+    runtime = backend or load_backend(backend_name, precision)
+    default_threads = torch.get_num_threads()
+    results: list[TopologyResult] = []
+
+    for n_workers in workers:
+        for n_threads in threads:
+            if n_workers == 0:
+                torch.set_num_threads(n_threads)
+                run = partial(score_sequences, runtime=runtime)
+                pool = None
+            else:
+                pool = InferenceWorkerPool(n_workers, intra_op=n_threads)
+                run = pool.score
+
+                # Start every worker and load its model before measuring
+                for future in [pool.submit(sequences) for _ in range(n_workers)]:
+                    future.result()
+
+            # Warm up
+            run(sequences)
+
+            latencies, elapsed = measure(run, sequences, requests, concurrency)
+            percentiles = get_percentiles(latencies)
+
+            results.append({
+                "threads": n_threads,
+                "workers": n_workers,
+                "p50": percentiles[49],
+                "p99": percentiles[98],
+                "throughput": requests / elapsed,
+            })
+
+            if pool is not None:
+                pool.shutdown()
+
+    torch.set_num_threads(default_threads)
+
+    return results
+
+
+def benchmark_inference(
+        groups: list[int],
+        senses_per_group: list[int],
+        contexts: list[int],
+        requests: int = 20
+    ) -> list[InferenceResult]:
+    """
+    Measure the latency of dictionary lookup and inference against a synthetic
+    dictionary for every combination of the number of words in the query, the
+    number of senses of each word, and the number of filler sentences around
+    the query. The dictionary collections are dropped and replaced with a
+    synthetic dictionary for each number of senses, so this must only be run
+    against a benchmark database.
+
+    Args:
+        groups (list[int]): Numbers of words in the query to benchmark
+        senses_per_group (list[int]): Numbers of senses of each word to
+            benchmark
+        contexts (list[int]): Numbers of filler sentences on each side of the
+            query to benchmark
+        requests (int, optional): The number of queries to run for each
+            combination. Defaults to 20.
+
+    Returns:
+        list[InferenceResult]: The mean latency of query_dictionary, the median
+            and 99th percentile latency of get_inference in seconds, and the
+            throughput in queries per second of each combination
+    """
+    results: list[InferenceResult] = []
+
+    for n_senses in senses_per_group:
+        dictionary_entries.drop()
+        senses.drop()
+        import_dictionary(get_synthetic_dictionary(max(groups), n_senses))
+
+        for n_groups in groups:
+            for n_context in contexts:
+                query, context = get_synthetic_query(n_groups, n_context)
+
+                # Warm up
+                get_inference(query, context)
+
+                start = time.perf_counter()
+                for _ in range(requests):
+                    query_dictionary(query, context)
+                lookup = (time.perf_counter() - start) / requests
+
+                latencies = []
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    get_inference(query, context)
+                    latencies.append(time.perf_counter() - start)
+
+                percentiles = get_percentiles(latencies)
+
+                results.append({
+                    "groups": n_groups,
+                    "senses": n_senses,
+                    "context": n_context,
+                    "length": len(context),
+                    "lookup": lookup,
+                    "p50": percentiles[49],
+                    "p99": percentiles[98],
+                    "throughput": requests / sum(latencies),
+                })
+
+    return results
@@ -0,0 +1,47 @@
+def get_length_buckets(
+        lengths: list[int],
+        max_size: int = 64,
+        overhead: int = 128
+    ) -> list[list[int]]:
+    """
+    Group sequences into buckets of similar length so that each bucket can be
+    padded to its own longest sequence. Sequences are sorted by length and
+    split where the padding saved outweighs the cost of running another
+    bucket, which is counted as overhead tokens. This minimizes the total of
+    padded tokens and bucket overhead exactly.
+
+    Args:
+        lengths (list[int]): The length of each sequence
+        max_size (int, optional): The maximum number of sequences in a bucket.
+            Defaults to 64.
+        overhead (int, optional): The cost of running a bucket in tokens.
+            Defaults to 128.
+
+    Returns:
+        list[list[int]]: The indices of the sequences in each bucket, from the
+            shortest bucket to the longest
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    sorted_lengths = [lengths[i] for i in order]
+    n = len(order)
+
+    # cost[j] is the lowest cost of the first j sorted sequences and start[j]
+    # is the index of the first sequence of their last bucket
+    cost = [0] + [float("inf")] * n
+    start = [0] * (n + 1)
+
+    for j in range(1, n + 1):
+        for i in range(max(0, j - max_size), j):
+            c = cost[i] + sorted_lengths[j - 1] * (j - i) + overhead
+            if c < cost[j]:
+                cost[j] = c
+                start[j] = i
+
+    buckets = []
+    j = n
+
+    while j > 0:
+        buckets.append(order[start[j]:j])
+        j = start[j]
+
+    return buckets[::-1]
@@ -0,0 +1,184 @@
+from collections import OrderedDict
+from datetime import datetime, UTC
+from hashlib import sha256
+import os
+from threading import Lock
+
+from bson.objectid import ObjectId
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+
+from app.collections import SenseRankCacheEntry
+from app.extensions import metrics
+from app.utils.logging import logger
+
+
+def get_rank_key(
+        model_id: str,
+        context: str | None,
+        written_form: str,
+        sense_ids: list[ObjectId]
+    ) -> str:
+    """
+    Get the cache key of the ranks of a word's senses in a context. Sense IDs
+    are regenerated whenever the dictionary is imported, so keys of ranks that
+    were computed against a previous import are never looked up again.
+
+    Args:
+        model_id (str): The model and settings that computed the ranks
+        context (str | None): The context sentence passed to the model
+        written_form (str)
+        sense_ids (list[ObjectId]): The IDs of each sense in the order that
+            they were ranked
+
+    Returns:
+        str: A hex digest
+    """
+    key = "\x1f".join([
+        model_id,
+        context or "",
+        written_form,
+        *[str(sense_id) for sense_id in sense_ids]
+    ])
+
+    return sha256(key.encode()).hexdigest()
+
+
+class RankCache():
+    """
+    A two-level cache of sense rank vectors. Ranks are first looked up in an
+    in-process LRU cache and then in a MongoDB collection that is shared by all
+    workers. Ranks found in MongoDB are promoted to the LRU cache. Errors from
+    MongoDB are logged and treated as cache misses so that caching never
+    prevents inference.
+
+    This class will initialize using the following environment variables. If
+    they are not initialized, default values will be used.
+     - INFER_CACHE (default: "True")
+     - INFER_CACHE_SIZE (default: 4096)
+
+    Attributes:
+        model_id (str): The model and settings whose ranks are cached, such as
+            infer.inference_id
+        collection (Collection | None): The collection used as the second level
+            of the cache. No second level is used if None.
+        enabled (bool)
+        max_size (int): The maximum number of rank vectors held in memory
+    """
+    def __init__(
+            self,
+            model_id: str,
+            collection: Collection[SenseRankCacheEntry] | None = None,
+            max_size: int | None = None
+        ):
+        self.model_id = model_id
+        self.collection = collection
+        self.enabled = os.getenv("INFER_CACHE", "True").lower() == "true"
+
+        if max_size is None:
+            max_size = int(os.getenv("INFER_CACHE_SIZE", 4096))
+        self.max_size = max_size
+
+        self._lru: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = Lock()
+
+    def _set_lru(self, key: str, ranks: list[float]) -> None:
+        with self._lock:
+            self._lru[key] = ranks
+            self._lru.move_to_end(key)
+
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+    def get(
+            self,
+            context: str | None,
+            written_form: str,
+            sense_ids: list[ObjectId]
+        ) -> list[float] | None:
+        """
+        Get the cached ranks of a word's senses in a context.
+
+        Args:
+            context (str | None)
+            written_form (str)
+            sense_ids (list[ObjectId])
+
+        Returns:
+            list[float] | None: The ranks in the same order as sense_ids or None
+                if they are not cached
+        """
+        if not self.enabled:
+            return None
+
+        key = get_rank_key(self.model_id, context, written_form, sense_ids)
+
+        with self._lock:
+            ranks = self._lru.get(key)
+            if ranks is not None:
+                self._lru.move_to_end(key)
+
+        if ranks is not None:
+            metrics.increment("infer.cache.lru_hits")
+            return ranks
+
+        if self.collection is not None:
+            try:
+                document = self.collection.find_one({"_id": key})
+            except PyMongoError as e:
+                logger.exception(e)
+                document = None
+
+            if document is not None:
+                metrics.increment("infer.cache.mongo_hits")
+                self._set_lru(key, document["ranks"])
+                return document["ranks"]
+
+        metrics.increment("infer.cache.misses")
+        return None
+
+    def set(
+            self,
+            context: str | None,
+            written_form: str,
+            sense_ids: list[ObjectId],
+            ranks: list[float]
+        ) -> None:
+        """
+        Cache the ranks of a word's senses in a context.
+
+        Args:
+            context (str | None)
+            written_form (str)
+            sense_ids (list[ObjectId])
+            ranks (list[float]): The ranks in the same order as sense_ids
+        """
+        if not self.enabled:
+            return
+
+        key = get_rank_key(self.model_id, context, written_form, sense_ids)
+        self._set_lru(key, ranks)
+
+        if self.collection is not None:
+            try:
+                self.collection.replace_one(
+                    {"_id": key},
+                    {
+                        "senseIds": sense_ids,
+                        "ranks": ranks,
+                        "createdAt": datetime.now(UTC)
+                    },
+                    upsert=True
+                )
+            except PyMongoError as e:
+                logger.exception(e)
+
+    def clear(self) -> None:
+        """
+        Remove all ranks from both levels of the cache.
+        """
+        with self._lock:
+            self._lru.clear()
+
+        if self.collection is not None:
+            self.collection.delete_many({})
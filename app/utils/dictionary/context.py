@@ -0,0 +1,123 @@
+import re
+
+from transformers import PreTrainedTokenizerBase
+
+# Sentences end with sentence-final punctuation followed by whitespace or with
+# a line break
+sentence_boundary = re.compile(r"(?<=[.!?。])\s+|\n+")
+
+
+def get_query_span(query: str, context: str) -> tuple[int, int]:
+    """
+    Get the start and end indices of a query in its context. If the query is
+    not found in the context, the whole context is returned as the span.
+
+    Args:
+        query (str)
+        context (str)
+
+    Returns:
+        tuple[int, int]
+    """
+    try:
+        start = context.index(query)
+    except ValueError:
+        return 0, len(context)
+
+    return start, start + len(query)
+
+
+def get_sentence_window(query: str, context: str) -> str:
+    """
+    Get the sentence of a context that contains the query. If the query spans
+    multiple sentences, all of them are returned.
+
+    Args:
+        query (str)
+        context (str)
+
+    Returns:
+        str
+    """
+    start, end = get_query_span(query, context)
+    window_start = 0
+    window_end = len(context)
+
+    for boundary in sentence_boundary.finditer(context):
+        if boundary.end() <= start:
+            window_start = boundary.end()
+
+        elif boundary.start() >= end:
+            window_end = boundary.start()
+            break
+
+    return context[window_start:window_end].strip()
+
+
+def get_sentences(text: str) -> list[tuple[int, str]]:
+    """
+    Split a text into its sentences.
+
+    Args:
+        text (str)
+
+    Returns:
+        list[tuple[int, str]]: (start, sentence) tuples, where start is the
+            index of the sentence in the text
+    """
+    result = []
+    start = 0
+
+    for boundary in [*sentence_boundary.finditer(text), None]:
+        end = boundary.start() if boundary else len(text)
+        sentence = text[start:end]
+
+        if sentence.strip():
+            offset = len(sentence) - len(sentence.lstrip())
+            result.append((start + offset, sentence.strip()))
+
+        if boundary:
+            start = boundary.end()
+
+    return result
+
+
+def get_token_window(
+        query: str,
+        context: str,
+        tokenizer: PreTrainedTokenizerBase,
+        size: int
+    ) -> str:
+    """
+    Get a window of the context that contains the query and up to size tokens
+    around it, split evenly before and after the query. The query is always
+    included in full, even if it is longer than size tokens. This requires a
+    fast tokenizer that returns offset mappings.
+
+    Args:
+        query (str)
+        context (str)
+        tokenizer (PreTrainedTokenizerBase)
+        size (int): The number of context tokens to keep around the query
+
+    Returns:
+        str
+    """
+    start, end = get_query_span(query, context)
+    offsets = tokenizer(
+        context,
+        add_special_tokens=False,
+        return_offsets_mapping=True
+    )["offset_mapping"]
+
+    # Get the indices of the first and last tokens of the query
+    tokens = [i for i, (s, e) in enumerate(offsets) if e > start and s < end]
+    if not tokens:
+        return context
+
+    before = size // 2
+    after = size - before
+    first = max(tokens[0] - before, 0)
+    last = min(tokens[-1] + after, len(offsets) - 1)
+
+    return context[offsets[first][0]:offsets[last][1]]
@@ -1,14 +1,21 @@
+from datetime import datetime, UTC
 from itertools import groupby
+from uuid import uuid4
 
 from app.collections import (
     DictionaryEntry,
     DictionaryEntryWithSenses,
     dictionary_entries,
+    metadata,
     senses
 )
 from app.extensions import mecab
 from app.utils.morphs.parse import get_morph_surface
-from app.utils.morphs.types import exclude_dictionary, is_morph_type
+from app.utils.morphs.types import (
+    exclude_dictionary,
+    get_morph_type,
+    is_morph_type
+)
 
 
 type QueryResult = dict[str, list[DictionaryEntryWithSenses]]
@@ -17,18 +24,22 @@ type QueryResult = dict[str, list[DictionaryEntryWithSenses]]
 exclude_words = ["것", "수", "있다", "안", "하다", "되다", ""]
 
 
-def get_query_str(
+def get_query_keys(
         query: str,
         context: str | None = None,
         punctuation: bool = False
-    ) -> str:  # TODO: duplicate verbs with suffixes
-    """Get a space-separated string of keys for executing a text search against
-    dictionary entries in the database. These keys are the dictionary forms of
-    each word in query. When a word contains suffixes (e.g., auxiliary verbs),
-    both are returned. Compound words are not included. A sentence containing
-    the query can be passed as context if the query's meaning is dependent on
-    context. Keys are returned in the order they appear in query and without
-    duplicates removed.
+    ) -> list[tuple[str, str]]:  # TODO: duplicate verbs with suffixes
+    """Get the keys for executing a text search against dictionary entries in
+    the database along with the morpheme type of each key. These keys are the
+    dictionary forms of each word in query. When a word contains suffixes
+    (e.g., auxiliary verbs), both are returned. Compound words are not
+    included. A sentence containing the query can be passed as context if the
+    query's meaning is dependent on context. Keys are returned in the order
+    they appear in query and without duplicates removed.
+
+    The morpheme type of a key is the type of the morpheme it was formed from.
+    Nouns and roots that are joined with a verb or adjective suffix (e.g.,
+    공부하다) are typed as verbs or adjectives.
 
     Args:
         query (str)
@@ -40,8 +51,7 @@ def get_query_str(
             span multiple sentences.
 
     Returns:
-        str: A space-separated string of keys that can be used for a text search
-            against dictionary entries stored in the database
+        list[tuple[str, str]]: A list of (key, morpheme type) tuples
     """
 
     # If there is context, use the start and end indices of the query
@@ -56,7 +66,9 @@ def get_query_str(
         morphs = mecab.parse(query)
 
     result: list[str] = []
+    types: list[str] = []
     prefix: str | None = None
+    prefix_type: str | None = None
 
     for morph in morphs:
 
@@ -79,6 +91,7 @@ def get_query_str(
             continue
 
         surface = get_morph_surface(morph)
+        morph_type = get_morph_type(morph)
 
         # Prepend prefixes and roots to this morpheme
         if prefix is not None:
@@ -87,10 +100,13 @@ def get_query_str(
         # Prepend prefixes and roots to the next morpheme
         if is_morph_type(morph, ["prefix", "root"]):
             prefix = surface
+            prefix_type = morph_type
             continue
 
         # Append verb and adjective suffixes with "다" ending
         if is_morph_type(morph, ["verb suffix", "adjective suffix"]):
+            morph_type = "verb" if morph_type == "verb suffix" else "adjective"
+
             try:
 
                 # Append to prefixes and roots that were not appended to result
@@ -100,6 +116,7 @@ def get_query_str(
                 # Append to the last element in result
                 else:
                     result[-1] = result[-1] + surface + "다"
+                    types[-1] = morph_type
                     continue
 
             # If there is no prefix or root and no morphemes appended to result
@@ -121,13 +138,40 @@ def get_query_str(
             surface = surface + "다"
 
         result.append(surface)
+        types.append(morph_type)
         prefix = None
 
     # Handle cases when the only query key is a prefix
     if result or prefix:
         result = result or [prefix]
+        types = types or [prefix_type]
+
+    return list(zip(result, types))
+
+
+def get_query_str(
+        query: str,
+        context: str | None = None,
+        punctuation: bool = False
+    ) -> str:
+    """Get a space-separated string of keys for executing a text search against
+    dictionary entries in the database. See get_query_keys.
+
+    Args:
+        query (str)
+        context (str | None, optional): An optional sentence that contains query
+            for cases when the meaning of query depends on context. Defaults to
+            None.
+        punctuation (bool, optional): Whether to include sentence-final
+            punctuation as a key. This is useful for determining queries that
+            span multiple sentences.
 
-    return " ".join(result)
+    Returns:
+        str: A space-separated string of keys that can be used for a text search
+            against dictionary entries stored in the database
+    """
+    keys = get_query_keys(query, context=context, punctuation=punctuation)
+    return " ".join(key for key, _ in keys)
 
 
 def query_dictionary(
@@ -201,3 +245,34 @@ def query_dictionary(
         result.append(group)
 
     return result
+
+
+def get_dictionary_version() -> str:
+    """
+    Get the version of the dictionary, which changes every time the dictionary
+    is imported.
+
+    Returns:
+        str: The version, or an empty string if the dictionary was imported
+            before versions were recorded
+    """
+    document = metadata.find_one({"_id": "dictionary"})
+
+    return document["version"] if document else ""
+
+
+def set_dictionary_version() -> str:
+    """
+    Record a new version of the dictionary after it is imported.
+
+    Returns:
+        str: The new version
+    """
+    version = uuid4().hex
+    metadata.replace_one(
+        {"_id": "dictionary"},
+        {"version": version, "updatedAt": datetime.now(UTC)},
+        upsert=True
+    )
+
+    return version
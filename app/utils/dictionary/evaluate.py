@@ -0,0 +1,213 @@
+from io import BytesIO
+from statistics import mean
+import time
+from typing import TypedDict
+
+import torch
+
+from app.utils.dictionary.dictionary import query_dictionary
+from app.utils.dictionary.infer import (
+    EagerBackend,
+    embed,
+    encode,
+    exclude_words,
+    get_prompt,
+    get_sense_candidate_ids,
+    rank_candidates,
+    score_sequences,
+    Sequence
+)
+from app.utils.dictionary.retrieval import SenseEmbeddings
+
+type CandidateSet = list[Sequence]
+
+# A fixed set of sentences containing common homographs for evaluating models
+evaluation_samples = [
+    "강아지는 뽀송뽀송하다.",
+    "눈이 많이 와서 길이 미끄러워요.",
+    "눈이 아파서 안과에 갔어요.",
+    "배가 고파서 밥을 먹었어요.",
+    "배를 타고 섬에 갔어요.",
+    "가을에는 배가 맛있어요.",
+    "말을 타고 들판을 달렸다.",
+    "그 사람은 말이 너무 많아요.",
+    "차를 마시면서 이야기를 나눴어요.",
+    "차가 막혀서 회의에 늦었어요.",
+    "밤이 깊어서 모두 잠들었다.",
+    "겨울에는 군밤을 사 먹어요.",
+    "다리를 다쳐서 걸을 수 없어요.",
+    "강 위에 다리를 새로 지었다.",
+    "편지를 쓰고 우표를 붙였다.",
+    "약이 너무 써서 먹기 싫어요.",
+    "모자를 쓰고 밖에 나갔다.",
+    "사과를 깎아서 친구에게 주었다.",
+    "늦어서 친구에게 사과를 했다.",
+    "손을 깨끗이 씻으세요.",
+    "가게에 손님이 많아요.",
+    "하늘을 우러러 한 점 부끄럼이 없기를.",
+    "잎새에 이는 바람에도 나는 괴로워했다.",
+    "별을 노래하는 마음으로 모든 죽어 가는 것을 사랑해야지.",
+]
+
+
+class EvaluationResult(TypedDict):
+    agreement: float
+    latency: float
+    size: int
+
+
+def get_evaluation_sets(samples: list[str]) -> list[CandidateSet]:
+    """
+    Get the candidate sets of every ambiguous word in a list of sentences. Each
+    sentence is used as its own context.
+
+    Args:
+        samples (list[str])
+
+    Returns:
+        list[CandidateSet]: The encoded [prompt, candidate] sequences of each
+            word that has more than one sense
+    """
+    candidate_sets = []
+
+    for sample in samples:
+        for group in query_dictionary(sample, sample):
+            written_form = group[0]["writtenForm"]
+            if written_form in exclude_words:
+                continue
+
+            senses = [sense for entry in group for sense in entry["senses"]]
+
+            if len(senses) > 1:
+                prompt = get_prompt(sample, written_form)
+                candidate_ids = get_sense_candidate_ids(senses)
+                candidate_sets.append(encode(prompt, candidate_ids))
+
+    return candidate_sets
+
+
+def get_model_size(module: torch.nn.Module) -> int:
+    """
+    Get the size in bytes of a model's serialized weights. Unlike counting
+    parameters, this includes the packed weights of quantized layers.
+
+    Args:
+        module (torch.nn.Module)
+
+    Returns:
+        int
+    """
+    buffer = BytesIO()
+    torch.save(module.state_dict(), buffer)
+
+    return buffer.getbuffer().nbytes
+
+
+def get_top_senses(
+        module: torch.nn.Module,
+        candidate_sets: list[CandidateSet]
+    ) -> tuple[list[int], list[float]]:
+    """
+    Run a model on each candidate set and get the index of the highest ranked
+    candidate along with the latency of each run.
+
+    Args:
+        module (torch.nn.Module)
+        candidate_sets (list[CandidateSet])
+
+    Returns:
+        tuple[list[int], list[float]]: A (top_senses, latencies) tuple where
+            latencies are in seconds
+    """
+    runtime = EagerBackend(module)
+    top_senses = []
+    latencies = []
+
+    # Warm up the model so that one-time initialization is not measured
+    if candidate_sets:
+        score_sequences(candidate_sets[0], runtime)
+
+    for sequences in candidate_sets:
+        start = time.perf_counter()
+        logits = score_sequences(sequences, runtime)
+        latencies.append(time.perf_counter() - start)
+        top_senses.append(max(range(len(logits)), key=lambda i: logits[i]))
+
+    return top_senses, latencies
+
+
+def evaluate_model(
+        module: torch.nn.Module,
+        candidate_sets: list[CandidateSet],
+        reference: list[int]
+    ) -> EvaluationResult:
+    """
+    Evaluate a model against the top ranked senses of a reference model.
+
+    Args:
+        module (torch.nn.Module)
+        candidate_sets (list[CandidateSet])
+        reference (list[int]): The index of the top ranked candidate of each
+            candidate set according to the reference model
+
+    Returns:
+        EvaluationResult: The fraction of candidate sets where the top ranked
+            sense agrees with the reference, the mean latency in seconds, and
+            the size of the model's weights in bytes
+    """
+    top_senses, latencies = get_top_senses(module, candidate_sets)
+    agreed = sum(a == b for a, b in zip(top_senses, reference))
+
+    return {
+        "agreement": agreed / len(reference) if reference else 1.0,
+        "latency": mean(latencies) if latencies else 0.0,
+        "size": get_model_size(module),
+    }
+
+
+def evaluate_retrieval(
+        samples: list[str],
+        embeddings: SenseEmbeddings,
+        ks: list[int]
+    ) -> dict[int, float]:
+    """
+    Evaluate how often the top ranked sense of every ambiguous word is among
+    the k senses most similar to its context (recall@k), taking the ranks of
+    the sense ranking model over all senses as the reference. Each sentence is
+    used as its own context.
+
+    Args:
+        samples (list[str])
+        embeddings (SenseEmbeddings)
+        ks (list[int])
+
+    Returns:
+        dict[int, float]: The recall of each k
+    """
+    hits = {k: 0 for k in ks}
+    total = 0
+
+    for sample in samples:
+        vector = embed([sample])[0]
+
+        for group in query_dictionary(sample, sample):
+            written_form = group[0]["writtenForm"]
+            if written_form in exclude_words:
+                continue
+
+            senses = [sense for entry in group for sense in entry["senses"]]
+            if len(senses) < 2:
+                continue
+
+            probs = rank_candidates(
+                get_prompt(sample, written_form),
+                get_sense_candidate_ids(senses)
+            )
+            top = max(range(len(probs)), key=lambda i: probs[i])
+            order = embeddings.rank(vector, [sense["_id"] for sense in senses])
+            total += 1
+
+            for k in ks:
+                hits[k] += top in order[:k]
+
+    return {k: hits[k] / total if total else 1.0 for k in ks}
@@ -0,0 +1,142 @@
+import os
+
+import torch
+
+from app.utils.dictionary.infer import (
+    backends,
+    load_model,
+    ModelInputs,
+    tokenizer
+)
+
+# The names of the exported model's inputs in the order they are passed
+input_names = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+class LogitsModule(torch.nn.Module):
+    """
+    Wrap the sense ranking model so that it takes its inputs as positional
+    tensors and returns only the logits, which is the signature expected by
+    the TorchScript and ONNX backends.
+
+    Attributes:
+        module (torch.nn.Module)
+    """
+    def __init__(self, module: torch.nn.Module):
+        super().__init__()
+        self.module = module
+
+    def forward(
+            self,
+            input_ids: torch.Tensor,
+            attention_mask: torch.Tensor,
+            token_type_ids: torch.Tensor
+        ) -> torch.Tensor:
+        return self.module(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids
+        ).logits
+
+
+def get_example_inputs() -> ModelInputs:
+    """
+    Get example inputs for tracing the model. The candidates have different
+    lengths so that padding is traced.
+
+    Returns:
+        ModelInputs
+    """
+    pairs = [
+        ["\"강아지는 뽀송뽀송하다.\"에 있는 \"강아지\"의 정의는 ", "\"개의 새끼\"예요."],
+        ["\"강아지는 뽀송뽀송하다.\"에 있는 \"강아지\"의 정의는 ", "\"주로 어린 자식이나 손주를 귀엽게 이르는 말\"이에요."],
+    ]
+    inputs = tokenizer(pairs, return_tensors="pt", padding=True)
+
+    return {k: inputs[k].unsqueeze(0) for k in input_names}
+
+
+def export_torchscript(module: torch.nn.Module, path: str) -> None:
+    """
+    Trace a model to TorchScript and save it to path.
+
+    Args:
+        module (torch.nn.Module)
+        path (str)
+    """
+    inputs = get_example_inputs()
+
+    with torch.no_grad():
+        traced = torch.jit.trace(
+            LogitsModule(module),
+            tuple(inputs[k] for k in input_names),
+            strict=False
+        )
+
+    traced = torch.jit.freeze(traced.eval())
+    traced.save(path)
+
+
+def export_onnx(module: torch.nn.Module, path: str) -> None:
+    """
+    Export a model to ONNX and save it to path. The number of choices and the
+    sequence length are exported as dynamic axes.
+
+    Args:
+        module (torch.nn.Module)
+        path (str)
+    """
+    inputs = get_example_inputs()
+    dynamic_axes = {k: {1: "choices", 2: "sequence"} for k in input_names}
+    dynamic_axes["logits"] = {1: "choices"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            LogitsModule(module),
+            tuple(inputs[k] for k in input_names),
+            path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17
+        )
+
+
+def export_model(
+        format: str,
+        path: str = "model",
+        module: torch.nn.Module | None = None
+    ) -> str:
+    """
+    Export the sense ranking model so that it can be loaded by the TorchScript
+    or ONNX inference backend. The model is saved to the directory at path with
+    the file name expected by the backend.
+
+    Args:
+        format (str): "torchscript" or "onnx"
+        path (str, optional): The directory to save the model to. Defaults to
+            "model".
+        module (torch.nn.Module | None, optional): The model to export.
+            Defaults to the model in fp32.
+
+    Raises:
+        ValueError: If format is not supported.
+
+    Returns:
+        str: The path of the exported model
+    """
+    if format == "torchscript":
+        export = export_torchscript
+    elif format == "onnx":
+        export = export_onnx
+    else:
+        raise ValueError("Unsupported export format: %s" % format)
+
+    module = module or load_model("fp32")
+    module.to(torch.device("cpu"))
+
+    os.makedirs(path, exist_ok=True)
+    file = os.path.join(path, backends[format])
+    export(module, file)
+
+    return file
@@ -0,0 +1,176 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Iterable, Iterator
+
+from bson.objectid import ObjectId
+import numpy as np
+from pymongo.collection import Collection
+from tqdm import tqdm
+
+from app.collections import create_indexes, dictionary_entries, senses
+from app.utils.dictionary.dictionary import get_dictionary_version, set_dictionary_version
+from app.utils.dictionary.infer import embed, render_candidates
+from app.utils.dictionary.retrieval import SenseEmbeddings
+
+
+def iter_batches(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    """
+    Group items into lists of at most size items without materializing the
+    whole iterable.
+
+    Args:
+        items (Iterable[Any])
+        size (int)
+
+    Yields:
+        Iterator[list[Any]]
+    """
+    iterator = iter(items)
+
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def import_dictionary(
+        dictionary: Iterable[dict],
+        total: int | None = None,
+        batch_size: int = 500,
+        writers: int = 4
+    ) -> None:
+    """
+    Insert dictionary entries and their senses in the format of dict.json into
+    the database. Entries are consumed in batches, so dictionary can be a
+    stream such as iter_json_array and only a few batches are held in memory.
+    The candidate responses of each batch's senses are rendered and tokenized
+    together, and the batch is written with one unordered insert_many per
+    collection while the next batch is prepared. Each insert_many is a
+    separate task on a pool of writer threads. Entry IDs are generated before
+    inserting so that senses do not wait for their entries to be written.
+
+    Args:
+        dictionary (Iterable[dict])
+        total (int | None, optional): The number of entries, for reporting
+            progress. Defaults to the length of dictionary if it has one.
+        batch_size (int, optional): The number of entries processed at a
+            time. Defaults to 500.
+        writers (int, optional): The number of threads writing batches in
+            parallel. Defaults to 4.
+    """
+    if total is None and hasattr(dictionary, "__len__"):
+        total = len(dictionary)
+
+    def write(collection: Collection, documents: list[dict]) -> int:
+        if documents:
+            collection.insert_many(documents, ordered=False)
+
+        return len(documents)
+
+    # Limit the batches waiting to be written so that memory stays flat when
+    # the database is slower than parsing
+    pending: deque[tuple[Future, Future]] = deque()
+    sense_count = 0
+
+    with (
+        tqdm(total=total, unit="entries", smoothing=0.1) as progress,
+        ThreadPoolExecutor(writers) as executor
+    ):
+        def wait() -> None:
+            nonlocal sense_count
+            entries_written, senses_written = pending.popleft()
+            n_entries = entries_written.result()
+            n_senses = senses_written.result()
+            sense_count += n_senses
+            progress.update(n_entries)
+            progress.set_postfix(
+                senses=sense_count,
+                senses_per_s="%.0f" % (sense_count / max(progress.format_dict["elapsed"], 1e-9))
+            )
+
+        for batch in iter_batches(dictionary, batch_size):
+            # Pre-render and tokenize the candidate response of each sense
+            candidates = iter(render_candidates([
+                sense["definition"] for entry in batch for sense in entry["senses"]
+            ]))
+
+            entry_documents = []
+            sense_documents = []
+
+            for entry in batch:
+                dictionary_entry_id = ObjectId()
+                entry_documents.append({
+                    "_id": dictionary_entry_id,
+                    "sourceId": entry["sourceId"],
+                    "sourceLanguage": entry["sourceLanguage"],
+                    "writtenForm": entry["writtenForm"],
+                    "variations": entry["variations"],
+                    "partOfSpeech": entry["partOfSpeech"],
+                    "grade": entry["grade"],
+                    "queryStrs": entry["queryStrs"],
+                })
+
+                for sense, candidate in zip(entry["senses"], candidates):
+                    sense_documents.append({
+                        "senseNo": sense["senseNo"],
+                        "definition": sense["definition"],
+                        "partOfSpeech": sense["partOfSpeech"],
+                        "examples": sense["examples"],
+                        "type": sense["type"],
+                        "equivalents": sense["equivalents"],
+                        "dictionaryEntryId": dictionary_entry_id,
+                        **candidate,
+                    })
+
+            pending.append((
+                executor.submit(write, dictionary_entries, entry_documents),
+                executor.submit(write, senses, sense_documents)
+            ))
+
+            while len(pending) > 2 * writers:
+                wait()
+
+        while pending:
+            wait()
+
+    dictionary_entries.create_index({"queryStrs": "text"})
+    create_indexes()
+
+    # Invalidate responses that were computed against the previous dictionary
+    set_dictionary_version()
+
+
+def embed_senses(path: str, batch_size: int = 256) -> None:
+    """
+    Embed the definition of every sense and save the embedding matrix to path
+    for retrieving the senses most similar to a context.
+
+    Args:
+        path (str)
+        batch_size (int, optional): The number of definitions read and
+            embedded at a time. Defaults to 256.
+    """
+    sense_ids = []
+    embeddings = []
+    batch = []
+
+    def flush():
+        embeddings.append(embed([sense["definition"] for sense in batch]))
+        sense_ids.extend(sense["_id"] for sense in batch)
+        batch.clear()
+
+    cursor = senses.find({}, {"definition": 1}, batch_size=batch_size)
+    for sense in tqdm(cursor, total=senses.estimated_document_count()):
+        batch.append(sense)
+
+        if len(batch) == batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    SenseEmbeddings.save(
+        path,
+        sense_ids,
+        np.concatenate(embeddings) if embeddings else np.zeros((0, 0)),
+        get_dictionary_version()
+    )
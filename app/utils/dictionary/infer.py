@@ -1,17 +1,298 @@
+from concurrent.futures import as_completed, Future
+from functools import cache
+from hashlib import sha256
+import os
 import re
+from typing import Iterator, NamedTuple, TypedDict
 
+from bson.objectid import ObjectId
 import jamotools
 import torch
-from transformers import AutoTokenizer, AutoModelForMultipleChoice
+import numpy as np
+from transformers import AutoModel, AutoTokenizer, AutoModelForMultipleChoice
+
+from app.collections import DictionaryEntryWithSenses, Sense, sense_rank_cache
+from app.extensions import metrics
+from app.utils.dictionary.bucketing import get_length_buckets
+from app.utils.dictionary.cache import RankCache
+from app.utils.dictionary.context import get_sentence_window, get_token_window
+from app.utils.dictionary.dictionary import (
+    get_dictionary_version,
+    get_query_keys,
+    query_dictionary
+)
+from app.utils.dictionary.prune import get_sense_weights
+from app.utils.dictionary.retrieval import embed_texts, SenseEmbeddings
+from app.utils.dictionary.scheduler import InferenceScheduler
+from app.utils.dictionary.workers import configure_threads, InferenceWorkerPool
+from app.utils.logging import logger
+
+# The Hugging Face model or local directory of the sense ranking model
+model_name = os.getenv("INFER_MODEL_NAME", "JesseStover/L2AI-dictionary-klue-bert-base")
+
+# Numeric precisions the model can be run in
+precisions = ["fp32", "int8", "bf16"]
+
+
+def bf16_supported() -> bool:
+    """
+    Determine whether the CPU has native support for bfloat16 operations.
+
+    Returns:
+        bool
+    """
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def load_model(precision: str = "fp32") -> torch.nn.Module:
+    """
+    Load the sense ranking model in the given numeric precision.
+
+    - fp32: The model as it was trained.
+    - int8: Linear layers are dynamically quantized to int8. Quantized models
+        always run on the CPU.
+    - bf16: All weights are cast to bfloat16. Falls back to fp32 if the CPU
+        does not support bfloat16.
+
+    Args:
+        precision (str, optional): One of "fp32", "int8", or "bf16". Defaults
+            to "fp32".
+
+    Raises:
+        ValueError: If precision is not supported.
+
+    Returns:
+        torch.nn.Module
+    """
+    if precision not in precisions:
+        raise ValueError("Unsupported inference precision: %s" % precision)
+
+    model = AutoModelForMultipleChoice.from_pretrained(model_name)
+    model.eval()
+
+    if precision == "int8":
+        return torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+    model.to(torch.device("cuda" if torch.cuda.is_available() else "cpu"))
+
+    if precision == "bf16":
+        if torch.cuda.is_available() or bf16_supported():
+            model.to(torch.bfloat16)
+        else:
+            logger.warning("bfloat16 is not supported on this CPU. Defaulting to fp32.")
+
+    return model
+
+
+type ModelInputs = dict[str, torch.Tensor]
+
+
+class Backend():
+    """
+    A runtime for the sense ranking model. Backends are called with the
+    tokenized inputs of a multiple choice question, each of shape
+    (1, num_choices, sequence_length), and return the logits of each choice
+    with shape (1, num_choices).
+    """
+    device = torch.device("cpu")
+
+    def __call__(self, inputs: ModelInputs) -> torch.Tensor:
+        raise NotImplementedError
+
+
+class EagerBackend(Backend):
+    """
+    Run the model with eager-mode PyTorch.
+
+    Attributes:
+        module (torch.nn.Module)
+    """
+    def __init__(self, module: torch.nn.Module):
+        self.module = module
+
+        # Run the inputs on the same device as the model's weights
+        self.device = next(module.parameters(), torch.empty(0)).device
+
+    def __call__(self, inputs: ModelInputs) -> torch.Tensor:
+        return self.module(**inputs).logits
+
+
+class TorchScriptBackend(Backend):
+    """
+    Run a model that was exported to TorchScript with `flask export-model`.
+
+    Attributes:
+        module (torch.jit.ScriptModule)
+    """
+    def __init__(self, path: str):
+        self.module = torch.jit.load(path, map_location=self.device)
+        self.module.eval()
 
-from app.collections import DictionaryEntryWithSenses
-from app.utils.dictionary.dictionary import query_dictionary
+    def __call__(self, inputs: ModelInputs) -> torch.Tensor:
+        return self.module(
+            inputs["input_ids"],
+            inputs["attention_mask"],
+            inputs["token_type_ids"]
+        )
+
+
+class OnnxBackend(Backend):
+    """
+    Run a model that was exported to ONNX with `flask export-model`. This
+    backend requires the onnxruntime package to be installed.
+
+    Attributes:
+        session (onnxruntime.InferenceSession)
+    """
+    def __init__(self, path: str):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The onnx inference backend requires onnxruntime to be installed.") from e
+
+        self.session = onnxruntime.InferenceSession(
+            path, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def __call__(self, inputs: ModelInputs) -> torch.Tensor:
+        feed = {name: inputs[name].cpu().numpy() for name in self.input_names}
+        (logits,) = self.session.run(["logits"], feed)
+
+        return torch.from_numpy(logits)
+
+
+# Inference backends and the file name of their exported model
+backends = {
+    "eager": None,
+    "torchscript": "model.pt",
+    "onnx": "model.onnx",
+}
+
+
+def load_backend(
+        name: str = "eager",
+        precision: str = "fp32",
+        path: str = "model"
+    ) -> Backend:
+    """
+    Load the sense ranking model with an inference backend. The eager backend
+    loads the model from Hugging Face in the given precision. Other backends
+    load a model that was exported to the directory at path.
+
+    Args:
+        name (str, optional): One of "eager", "torchscript", or "onnx".
+            Defaults to "eager".
+        precision (str, optional): The precision of the eager backend. Defaults
+            to "fp32".
+        path (str, optional): The directory of exported models. Defaults to
+            "model".
+
+    Raises:
+        ValueError: If the backend is not supported.
+
+    Returns:
+        Backend
+    """
+    if name not in backends:
+        raise ValueError("Unsupported inference backend: %s" % name)
+
+    if name == "eager":
+        return EagerBackend(load_model(precision))
+
+    file = os.path.join(path, backends[name])
+
+    if name == "torchscript":
+        return TorchScriptBackend(file)
+
+    return OnnxBackend(file)
+
+
+def get_thread_count(name: str) -> int | None:
+    """
+    Get a thread count from an environment variable.
+
+    Args:
+        name (str)
+
+    Returns:
+        int | None: None if the environment variable is not set
+    """
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+# Limit the threads torch uses in each process
+intra_op_threads = get_thread_count("INFER_INTRA_OP_THREADS")
+inter_op_threads = get_thread_count("INFER_INTER_OP_THREADS")
+workers = int(os.getenv("INFER_WORKERS", 0))
+configure_threads(intra_op_threads, inter_op_threads)
 
 # Initialize the model and tokenizer
-model_name = "JesseStover/L2AI-dictionary-klue-bert-base"
+precision = os.getenv("INFER_PRECISION", "fp32")
+backend_name = os.getenv("INFER_BACKEND", "eager")
 tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForMultipleChoice.from_pretrained(model_name)
-model.to(torch.device("cuda" if torch.cuda.is_available() else "cpu"))
+
+# The model is only loaded in this process when there are no worker processes
+if workers > 0:
+    backend = None
+    pool = InferenceWorkerPool(workers, intra_op_threads, inter_op_threads)
+else:
+    backend = load_backend(
+        backend_name,
+        precision,
+        os.getenv("INFER_MODEL_PATH", "model")
+    )
+    pool = None
+
+# Exported models are always fp32
+model_id = "%s@%s" % (model_name, precision if backend_name == "eager" else backend_name)
+
+# Limit the length of the context and of each sequence passed to the model.
+# The whole context is passed unless a window is chosen
+context_window = os.getenv("INFER_CONTEXT_WINDOW", "none")
+context_tokens = int(os.getenv("INFER_CONTEXT_TOKENS", 64))
+max_length = int(os.getenv("INFER_MAX_LENGTH", 256))
+
+# Run candidate sequences in buckets of similar length
+bucketing = os.getenv("INFER_BUCKETING", "True").lower() == "true"
+bucket_size = int(os.getenv("INFER_BUCKET_SIZE", 64))
+bucket_overhead = int(os.getenv("INFER_BUCKET_OVERHEAD", 128))
+
+# Prune senses whose part of speech does not match the query before ranking
+pos_pruning = os.getenv("INFER_POS_PRUNING", "filter")
+pos_weight = float(os.getenv("INFER_POS_WEIGHT", 0.1))
+max_candidates = int(os.getenv("INFER_MAX_CANDIDATES", 0))
+
+# Only rank the senses most similar to the context when a word has more than
+# INFER_RETRIEVAL_K senses
+retrieval_k = int(os.getenv("INFER_RETRIEVAL_K", 0))
+embeddings_path = os.getenv("INFER_EMBEDDINGS_PATH", "model")
+sense_embeddings = (
+    SenseEmbeddings(embeddings_path, get_dictionary_version()) if retrieval_k else None
+)
+
+# Identify the model and every setting that changes the ranks it returns, so
+# that responses can be cached until one of them changes
+inference_id = sha256(repr((
+    model_id,
+    context_window,
+    context_tokens,
+    max_length,
+    pos_pruning,
+    pos_weight,
+    max_candidates,
+    retrieval_k,
+)).encode()).hexdigest()[:16]
+
+# Cache the ranks of words that are looked up in the same context repeatedly,
+# keyed by every setting that changes them
+rank_cache = RankCache(inference_id, sense_rank_cache)
 
 # Single common words to exclude from inference
 exclude_words = ["것", "수", "있다", "안", "하다", "되다"]
@@ -37,136 +318,695 @@ def ends_in_vowel(str: str) -> bool:
     return ord(jamos[-1]) >= 0x1161 and ord(jamos[-1]) <= 0x1175
 
 
-def get_inference(
-        query: str,
-        context: str | None = None
-    ) -> list[DictionaryEntryWithSenses]:
+def get_context_window(query: str, context: str | None) -> str | None:
     """
-    Analyzes the given query sentence and infers the most probable meanings
-    (senses) of each word based on the context.
+    Get the part of the context that is passed to the model. Depending on
+    INFER_CONTEXT_WINDOW this is the sentence that contains the query
+    ("sentence"), up to INFER_CONTEXT_TOKENS tokens around the query
+    ("tokens"), or the whole context ("none").
 
-    The function processes the query by segmenting it into individual words and 
-    phrases, retrieving possible definitions for each, and then inferring the 
-    most likely definition from the context of the sentence. For instance, given
-    "강아지는 뽀송뽀송하다." ("The puppy is fluffy.") it would infer that 
-    "강아지" means "puppy" and "뽀송뽀송" means "fluffy".
+    Args:
+        query (str)
+        context (str | None)
+
+    Raises:
+        ValueError: If INFER_CONTEXT_WINDOW is not supported.
+
+    Returns:
+        str | None
+    """
+    if context is None or context_window == "none":
+        return context
+
+    if context_window == "sentence":
+        window = get_sentence_window(query, context)
+    elif context_window == "tokens":
+        window = get_token_window(query, context, tokenizer, context_tokens)
+    else:
+        raise ValueError("Unsupported context window: %s" % context_window)
+
+    metrics.increment("infer.contexts")
+    if len(window) < len(context):
+        metrics.increment("infer.contexts.windowed")
+
+    return window
+
+
+def get_prompt(context: str | None, written_form: str) -> str:
+    """
+    Get the prompt that asks the model for the definition of a word in a
+    context.
 
     Args:
-        query (str): The input sentence for which word definitions need to be
-            inferred.
-        context (str | None, optional): Additional context that might help to 
-            disambiguate the definitions. Default is None.
+        context (str | None)
+        written_form (str)
 
     Returns:
-        list[DictionaryEntryWithSenses]: A list of dictionary entries, each
-            mapped to its inferred senses with their respective ranks based on 
-            the context. Each entry in the list contains the word, its part of 
-            speech, and a ranked list of possible meanings.
+        str
+    """
+    return "\"%s\"에 있는 \"%s\"의 정의는 " % (context, written_form)
+
+
+def get_candidate(definition: str) -> str:
+    """
+    Get the candidate response to a prompt for a sense's definition. The
+    definition is quoted and conjugated as the end of a sentence.
+
+    Args:
+        definition (str)
+
+    Returns:
+        str
+    """
+
+    # Remove ending punctuation
+    if definition.endswith("."):
+        definition = definition[:-1]
+
+    # Remove all characters that are not Hangul, alphanumeric, or numbers
+    definition_stripped = re.sub(r"[^\u3131-\uD79DA-Za-z\d]", "", definition)
+
+    # Conjugate the end of the sentence
+    end = "예요." if ends_in_vowel(definition_stripped) else "이에요."
+
+    return "\"%s\"%s" % (definition, end)
+
+
+class Sequence(NamedTuple):
+    input_ids: list[int]
+    token_type_ids: list[int]
+
+
+def get_candidate_ids(candidates: list[str]) -> list[list[int]]:
+    """
+    Tokenize candidate responses without special tokens so that they can be
+    stored and combined with any prompt later.
+
+    Args:
+        candidates (list[str])
+
+    Returns:
+        list[list[int]]
+    """
+    if not candidates:
+        return []
+
+    return tokenizer(candidates, add_special_tokens=False)["input_ids"]
+
+
+class CandidateFields(TypedDict):
+    candidate: str
+    candidateIds: list[int]
+    candidateTokenizer: str
+
+
+def render_candidates(definitions: list[str]) -> list[CandidateFields]:
+    """
+    Render and tokenize the candidate response of each definition. These
+    fields are stored on each sense when the dictionary is imported so that
+    definitions do not need to be processed for every request.
+
+    Args:
+        definitions (list[str])
+
+    Returns:
+        list[CandidateFields]
+    """
+    candidates = [get_candidate(definition) for definition in definitions]
+
+    return [
+        {
+            "candidate": candidate,
+            "candidateIds": ids,
+            "candidateTokenizer": model_name,
+        }
+        for candidate, ids in zip(candidates, get_candidate_ids(candidates))
+    ]
+
+
+def get_sense_candidate_ids(senses: list[Sense]) -> list[list[int]]:
+    """
+    Get the token IDs of the candidate response of each sense. IDs that were
+    stored on the sense when the dictionary was imported are used if they were
+    produced by this model's tokenizer, otherwise the candidate is rendered and
+    tokenized.
+
+    Args:
+        senses (list[Sense])
+
+    Returns:
+        list[list[int]]
+    """
+    result: list[list[int] | None] = [
+        sense.get("candidateIds")
+        if sense.get("candidateTokenizer") == model_name else None
+        for sense in senses
+    ]
+
+    # Render and tokenize the candidates that were not stored
+    missing = [i for i, ids in enumerate(result) if ids is None]
+    candidates = [get_candidate(senses[i]["definition"]) for i in missing]
+
+    for i, ids in zip(missing, get_candidate_ids(candidates)):
+        result[i] = ids
+
+    metrics.increment("infer.candidates", len(senses))
+    metrics.increment("infer.candidates.tokenized", len(missing))
+
+    return result
+
+
+def encode(prompt: str, candidate_ids: list[list[int]]) -> list[Sequence]:
+    """
+    Combine a prompt with the token IDs of each candidate response into the
+    sequences passed to the model. The prompt is tokenized once and truncated
+    from the left so that each sequence fits within INFER_MAX_LENGTH, which
+    drops the start of a long context but keeps the word being defined at the
+    end of the prompt. Candidates that do not fit even with an empty prompt
+    are also truncated.
+
+    Args:
+        prompt (str)
+        candidate_ids (list[list[int]])
+
+    Returns:
+        list[Sequence]
+    """
+    prompt_ids = tokenizer(prompt, add_special_tokens=False)["input_ids"]
+    special = tokenizer.num_special_tokens_to_add(pair=True)
+    result = []
+
+    for ids in candidate_ids:
+        ids = ids[:max(max_length - special, 0)]
+        first = prompt_ids[max(len(prompt_ids) - (max_length - special - len(ids)), 0):]
+
+        if len(first) < len(prompt_ids):
+            metrics.increment("infer.sequences.truncated")
+
+        result.append(Sequence(
+            tokenizer.build_inputs_with_special_tokens(first, ids),
+            tokenizer.create_token_type_ids_from_sequences(first, ids)
+        ))
+
+    metrics.increment("infer.sequences", len(result))
+
+    return result
+
+
+def encode_pairs(pairs: list[list[str]]) -> list[Sequence]:
+    """
+    Encode [prompt, candidate] pairs of text into the sequences passed to the
+    model.
+
+    Args:
+        pairs (list[list[str]])
+
+    Returns:
+        list[Sequence]
+    """
+    result = []
+
+    for prompt, candidate in pairs:
+        result.extend(encode(prompt, get_candidate_ids([candidate])))
+
+    return result
+
+
+def collate(sequences: list[Sequence], device: torch.device) -> ModelInputs:
+    """
+    Pad sequences to the same length and stack them into the inputs of a
+    single multiple choice question.
+
+    Args:
+        sequences (list[Sequence])
+        device (torch.device)
+
+    Returns:
+        ModelInputs
+    """
+    length = max(len(sequence.input_ids) for sequence in sequences)
+    pad = [0] * length
+    input_ids = []
+    token_type_ids = []
+    attention_mask = []
+
+    for sequence in sequences:
+        padding = length - len(sequence.input_ids)
+        input_ids.append(sequence.input_ids + [tokenizer.pad_token_id] * padding)
+        token_type_ids.append(sequence.token_type_ids + pad[:padding])
+        attention_mask.append([1] * len(sequence.input_ids) + pad[:padding])
+
+    inputs = {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "token_type_ids": token_type_ids,
+    }
+
+    return {
+        k: torch.tensor(v, dtype=torch.long, device=device).unsqueeze(0)
+        for k, v in inputs.items()
+    }
+
+
+def score_sequences(
+        sequences: list[Sequence],
+        runtime: Backend | None = None
+    ) -> list[float]:
+    """
+    Run the model on a list of encoded [prompt, candidate] sequences and return
+    the logit of each. Sequences are run as the choices of a single multiple
+    choice question, but because the model scores each sequence independently,
+    sequences from different questions can be run together and their logits
+    split afterwards. For the same reason, when bucketing is enabled sequences
+    are run in buckets of similar length and their logits reassembled in
+    order.
+
+    Args:
+        sequences (list[Sequence])
+        runtime (Backend | None, optional): The backend to run the model with.
+            Defaults to the backend set by INFER_BACKEND.
+
+    Returns:
+        list[float]: One logit per sequence, in the order they were passed
+    """
+    runtime = runtime or backend
+
+    # Run sequences of similar length together to limit padding
+    if bucketing:
+        buckets = get_length_buckets(
+            [len(sequence.input_ids) for sequence in sequences],
+            bucket_size,
+            bucket_overhead
+        )
+    else:
+        buckets = [list(range(len(sequences)))]
+
+    result = [0.0] * len(sequences)
+    tokens = 0
+    padded = 0
+
+    for bucket in buckets:
+        inputs = collate([sequences[i] for i in bucket], runtime.device)
+        tokens += int(inputs["attention_mask"].sum())
+        padded += inputs["attention_mask"].numel()
+
+        with torch.no_grad():
+            logits = runtime(inputs)
+
+        for i, x in zip(bucket, logits[0]):
+            result[i] = float(x)
+
+    metrics.increment("infer.buckets", len(buckets))
+    metrics.increment("infer.tokens", tokens)
+    metrics.increment("infer.tokens.padded", padded)
+    if padded:
+        metrics.set("infer.padding_efficiency", tokens / padded)
+
+    return result
+
+
+def softmax(logits: list[float]) -> list[float]:
+    """
+    Apply Softmax to the logits of a single multiple choice question.
+
+    Args:
+        logits (list[float])
+
+    Returns:
+        list[float]
+    """
+    return [float(x) for x in torch.tensor(logits).softmax(0)]
+
+
+# Batch candidate sets from concurrent requests when enabled
+if os.getenv("INFER_BATCHING", "False").lower() == "true":
+    if pool is not None:
+        scheduler = InferenceScheduler(pool.score, concurrency=workers)
+    else:
+        scheduler = InferenceScheduler(score_sequences)
+else:
+    scheduler = None
+
+
+@cache
+def get_encoder() -> torch.nn.Module:
+    """
+    Get the encoder used to embed contexts and definitions. This is the BERT
+    encoder of the sense ranking model, which is shared with the backend when
+    the model runs eagerly and loaded separately for exported backends. It is
+    only loaded the first time it is used.
+
+    Returns:
+        torch.nn.Module
+    """
+    if isinstance(backend, EagerBackend):
+        return backend.module.base_model
+
+    encoder = AutoModel.from_pretrained(model_name)
+    encoder.eval()
+
+    return encoder
+
+
+def embed(texts: list[str]) -> np.ndarray:
+    """
+    Embed contexts or definitions for retrieving the senses most similar to a
+    context. When there are inference worker processes the texts are embedded
+    in the next available worker, so that the encoder is not loaded again in
+    this process.
+
+    Args:
+        texts (list[str])
+
+    Returns:
+        np.ndarray: A float32 matrix of unit-length rows, one per text
+    """
+    if pool is not None:
+        return pool.embed(texts)
+
+    return embed_texts(texts, get_encoder(), tokenizer)
+
+
+def rank_candidate_sets(
+        candidate_sets: list[tuple[str, list[list[int]]]]
+    ) -> list[list[float]]:
+    """
+    Get the probability of each candidate response to the prompt of every
+    candidate set. All candidate sets are run together and their logits split
+    afterwards. When batching is enabled the candidates are submitted to the
+    inference scheduler. When there are inference worker processes the
+    candidates are run in the next available worker. Otherwise the model is run
+    directly.
+
+    Args:
+        candidate_sets (list[tuple[str, list[list[int]]]]): (prompt,
+            candidate_ids) tuples, where candidate_ids are the token IDs of
+            each candidate
+
+    Returns:
+        list[list[float]]: The probabilities of each candidate set
+    """
+    encoded = [encode(prompt, ids) for prompt, ids in candidate_sets]
+    sequences = [sequence for sequence_set in encoded for sequence in sequence_set]
+
+    if scheduler is not None:
+        logits = scheduler.submit(sequences).result()
+    elif pool is not None:
+        logits = pool.score(sequences)
+    else:
+        logits = score_sequences(sequences)
+
+    result = []
+    start = 0
+
+    for sequence_set in encoded:
+        end = start + len(sequence_set)
+        result.append(softmax(logits[start:end]))
+        start = end
+
+    return result
+
+
+def rank_candidates(prompt: str, candidate_ids: list[list[int]]) -> list[float]:
+    """
+    Get the probability of each candidate response to a prompt.
+
+    Args:
+        prompt (str)
+        candidate_ids (list[list[int]]): The token IDs of each candidate
+
+    Returns:
+        list[float]
+    """
+    return rank_candidate_sets([(prompt, candidate_ids)])[0]
+
+
+class WordRanking(TypedDict):
+    index: int
+    group: list[DictionaryEntryWithSenses]
+    writtenForm: str
+    weights: list[float]
+    kept: list[int]
+    keptIds: list[ObjectId]
+    probs: list[float] | None
+
+
+def submit_candidates(prompt: str, candidate_ids: list[list[int]]) -> Future:
+    """
+    Submit a candidate set to the inference scheduler or the inference worker
+    processes without waiting for the result.
+
+    Args:
+        prompt (str)
+        candidate_ids (list[list[int]]): The token IDs of each candidate
 
     Raises:
-        ValueError: If a variation in the query string is not found among the 
-            dictionary keys searched, indicating a probable issue with the 
-            function's internal dictionary lookup.
+        RuntimeError: If batching is disabled and there are no inference
+            worker processes.
+
+    Returns:
+        Future: A Future that resolves to the logit of each candidate
+    """
+    sequences = encode(prompt, candidate_ids)
+
+    if scheduler is not None:
+        return scheduler.submit(sequences)
+    elif pool is not None:
+        return pool.submit(sequences)
+
+    raise RuntimeError("Candidates can only be submitted to a scheduler or worker pool.")
+
+
+def get_ranked_entry(word: WordRanking) -> DictionaryEntryWithSenses:
+    """
+    Map the probabilities of a word's remaining senses to the ranks of all of
+    its senses and get the dictionary entry with the highest ranked sense.
+
+    Args:
+        word (WordRanking)
+
+    Returns:
+        DictionaryEntryWithSenses: The entry with the rank of each sense
+    """
+    group = word["group"]
+    weights = word["weights"]
+
+    # Apply the weights of the remaining senses and renormalize
+    infer_result = [0.0] * len(weights)
+    for i, prob in zip(word["kept"], word["probs"]):
+        infer_result[i] = prob * weights[i]
+
+    total = sum(infer_result)
+    infer_result = [rank / total for rank in infer_result]
+
+    start = 0
+    ranks = []
+
+    for entry in group:
+
+        # Get the end index of this word's results
+        end = start + len(entry["senses"])
+
+        # Map the results to each sense of this word
+        entry["ranks"] = infer_result[start:end]
+
+        # Set the start index of the next word's results
+        start = end
+
+        # Make a list of each sense and their scores
+        ranks.extend(list(zip(
+            [sense["_id"] for sense in entry["senses"]], entry["ranks"]
+        )))
+
+    # Sort this word's senses according to its rank
+    ranks.sort(key=lambda x: x[1], reverse=True)
+    rank_map = dict(ranks)
+
+    # Get dictionary entry that has sense with highest score
+    entry = next(
+        entry for entry in group
+        if any(sense["_id"] == ranks[0][0] for sense in entry["senses"])
+    )
+
+    # Add the rank to each sense
+    for sense in entry["senses"]:
+        sense["rank"] = rank_map[sense["_id"]]
+
+    return entry
+
+
+def iter_inference(
+        query: str,
+        context: str | None = None,
+        stream: bool = False
+    ) -> Iterator[tuple[int, DictionaryEntryWithSenses]]:
+    """
+    Infer the most probable senses of each word in a query and yield each word
+    as soon as it is ranked. Words that need no model call, because they have
+    one remaining sense or were already ranked in this context, are yielded
+    first. Then the remaining words are ranked in one batch, or if stream is
+    True, individually so that each is yielded as soon as it is ranked. When
+    streaming with batching or inference worker processes every word is
+    submitted at once and yielded in the order they finish. Otherwise words
+    with fewer senses are ranked first.
+
+    Args:
+        query (str)
+        context (str | None, optional): Defaults to None.
+        stream (bool, optional): Defaults to False.
+
+    Yields:
+        tuple[int, DictionaryEntryWithSenses]: The index of the word in the
+            query and its dictionary entry with the rank of each sense
     """
 
     # Get all words, idioms, or proverbs in the query
     groups = query_dictionary(query, context)
-    result = []
 
-    for group in groups:
+    # Get the morpheme type of each word in the query
+    morph_types = dict(get_query_keys(query, context))
+
+    # Only pass the part of the context around the query to the model
+    window = get_context_window(query, context)
+
+    # Candidate sets that are not cached
+    pending: list[tuple[WordRanking, str, list[list[int]]]] = []
+
+    # The context is embedded once when retrieval is first needed
+    context_vector = None
+
+    for index, group in enumerate(groups):
 
         # All words in a group have the same written form, so use the first
         written_form = group[0]["writtenForm"]
-        pos = group[0]["partOfSpeech"]  # TODO: use part of speech to improve results
+        morph_type = next(
+            (morph_types[key] for key in group[0]["queryStrs"] if key in morph_types),
+            None
+        )
 
         # If the word is a common excluded word
         if written_form in exclude_words:
             continue
 
-        # Construct the prompt using the variation that was used in the query
-        prompt = "\"%s\"에 있는 \"%s\"의 정의는 " % (context, written_form)
+        senses = [sense for entry in group for sense in entry["senses"]]
 
-        # Construct a list of candidate responses using each of the word's senses
-        definitions = []
-        for entry in group:
-            definitions.extend([sense["definition"] for sense in entry["senses"]])
+        # Prune or down-weight senses that do not match the query's part of speech
+        weights = get_sense_weights(
+            group, morph_type, pos_pruning, pos_weight, max_candidates
+        )
+        kept = [i for i, weight in enumerate(weights) if weight > 0]
 
-        # If the word has only one sense
-        if len(definitions) == 1:
-            infer_result = [1.0]
+        # Only rank the senses most similar to the context
+        if retrieval_k and len(kept) > retrieval_k and sense_embeddings.index:
+            if context_vector is None:
+                context_vector = embed([window or query])[0]
 
-        else:
-            candidates = []
+            top = sense_embeddings.top_k(
+                context_vector, [senses[i]["_id"] for i in kept], retrieval_k
+            )
+            retrieved = [kept[i] for i in top]
 
-            # Prepare the candidate responses
-            for definition in definitions:
+            for i in kept:
+                if i not in retrieved:
+                    weights[i] = 0.0
 
-                # Remove ending punctuation
-                if definition.endswith("."):
-                    definition = definition[:-1]
+            kept = retrieved
+            metrics.increment("infer.retrievals")
 
-                # Remove all characters that are not Hangul, alphanumeric, or numbers
-                definition_stripped = re.sub(
-                    r"[^\u3131-\uD79DA-Za-z\d]", "", definition
-                )
+        kept_ids = [senses[i]["_id"] for i in kept]
+        metrics.increment("infer.senses", len(senses))
+        metrics.increment("infer.senses.pruned", len(senses) - len(kept))
 
-                # Conjugate the end of the sentence
-                end = "예요." if ends_in_vowel(definition_stripped) else "이에요."
+        word: WordRanking = {
+            "index": index,
+            "group": group,
+            "writtenForm": written_form,
+            "weights": weights,
+            "kept": kept,
+            "keptIds": kept_ids,
+            "probs": None,
+        }
 
-                candidates.append("\"%s\"%s" % (definition, end))
+        # If the word has only one remaining sense
+        if len(kept) == 1:
+            word["probs"] = [1.0]
 
-            # Prepare the model's inputs
-            inputs = tokenizer(
-                [[prompt, candidate] for candidate in candidates],
-                return_tensors="pt",
-                padding=True
-            )
+        # If the word was already ranked in this context
+        elif (cached := rank_cache.get(window, written_form, kept_ids)):
+            word["probs"] = cached
 
-            labels = torch.tensor(0).unsqueeze(0)
+        else:
 
-            # Run the inference
-            with torch.no_grad():
-                outputs = model(
-                    **{k: v.unsqueeze(0) for k, v in inputs.items()},
-                    labels=labels
-                )
+            # Construct the prompt using the variation that was used in the query
+            prompt = get_prompt(window, written_form)
 
-            # Use Softmax to get the inference results
-            infer_result = [float(x) for x in outputs.logits.softmax(1)[0]]
+            # Prepare the candidate responses of the remaining senses
+            candidate_ids = get_sense_candidate_ids([senses[i] for i in kept])
+            pending.append((word, prompt, candidate_ids))
 
-        start = 0
-        ranks = []
+        if word["probs"] is not None:
+            yield word["index"], get_ranked_entry(word)
 
-        for entry in group:
+    def ranked(word: WordRanking, probs: list[float]) -> tuple[int, DictionaryEntryWithSenses]:
+        word["probs"] = probs
+        rank_cache.set(window, word["writtenForm"], word["keptIds"], probs)
+        return word["index"], get_ranked_entry(word)
 
-            # Get the end index of this word's results
-            end = start + len(entry["senses"])
+    # Rank each word as soon as its model call finishes
+    if stream and (scheduler is not None or pool is not None):
+        futures = {
+            submit_candidates(prompt, candidate_ids): word
+            for word, prompt, candidate_ids in pending
+        }
 
-            # Map the results to each sense of this word
-            entry["ranks"] = infer_result[start:end]
+        for future in as_completed(futures):
+            yield ranked(futures[future], softmax(future.result()))
 
-            # Set the start index of the next word's results
-            start = end
+    elif stream:
+        for word, prompt, candidate_ids in sorted(pending, key=lambda x: len(x[2])):
+            yield ranked(word, rank_candidates(prompt, candidate_ids))
 
-            # Make a list of each sense and their scores
-            ranks.extend(list(zip(
-                [sense["_id"] for sense in entry["senses"]], entry["ranks"]
-            )))
+    # Run the inference of every word that was not cached in one batch
+    elif pending:
+        probs = rank_candidate_sets([
+            (prompt, candidate_ids) for _, prompt, candidate_ids in pending
+        ])
 
-        # Sort this word's senses according to its rank
-        ranks.sort(key=lambda x: x[1], reverse=True)
-        rank_map = dict(ranks)
+        for (word, _, _), word_probs in zip(pending, probs):
+            yield ranked(word, word_probs)
 
-        # Get dictionary entry that has sense with highest score
-        for entry in group:
-            for sense in entry["senses"]:
-                if sense["_id"] == ranks[0][0]:
-                    break
 
-        # Add the rank to each sense
-        for sense in entry["senses"]:
-            sense["rank"] = rank_map[sense["_id"]]
+def get_inference(
+        query: str,
+        context: str | None = None
+    ) -> list[DictionaryEntryWithSenses]:
+    """
+    Analyzes the given query sentence and infers the most probable meanings
+    (senses) of each word based on the context.
 
-        result.append(entry)
+    The function processes the query by segmenting it into individual words and 
+    phrases, retrieving possible definitions for each, and then inferring the 
+    most likely definition from the context of the sentence. For instance, given
+    "강아지는 뽀송뽀송하다." ("The puppy is fluffy.") it would infer that 
+    "강아지" means "puppy" and "뽀송뽀송" means "fluffy".
 
-    return result
+    Args:
+        query (str): The input sentence for which word definitions need to be
+            inferred.
+        context (str | None, optional): Additional context that might help to 
+            disambiguate the definitions. Default is None.
+
+    Returns:
+        list[DictionaryEntryWithSenses]: A list of dictionary entries, each
+            mapped to its inferred senses with their respective ranks based on 
+            the context. Each entry in the list contains the word, its part of 
+            speech, and a ranked list of possible meanings.
+
+    Raises:
+        ValueError: If a variation in the query string is not found among the 
+            dictionary keys searched, indicating a probable issue with the 
+            function's internal dictionary lookup.
+    """
+    result = sorted(iter_inference(query, context), key=lambda x: x[0])
+
+    return [entry for _, entry in result]
@@ -0,0 +1,125 @@
+from app.collections import DictionaryEntryWithSenses
+
+# The dictionary parts of speech that each morpheme type can be an instance of
+dictionary_pos = {
+    "common noun": ["명사"],
+    "proper noun": ["명사"],
+    "dependent noun": ["의존 명사", "명사"],
+    "counting noun": ["의존 명사", "명사"],
+    "pronoun": ["대명사"],
+    "numeral": ["수사"],
+    "verb": ["동사"],
+    "adjective": ["형용사"],
+    "auxiliary verb": ["보조 동사", "보조 형용사", "동사", "형용사"],
+    "adverb": ["부사"],
+    "determiner": ["관형사"],
+    "interjection": ["감탄사"],
+}
+
+# Entries without a part of speech (e.g., idioms and proverbs) always match
+no_pos = ["품사 없음", ""]
+
+# Vocabulary grades from most to least common
+grades = ["초급", "중급", "고급"]
+
+
+def is_pos_match(entry: DictionaryEntryWithSenses, morph_type: str | None) -> bool:
+    """
+    Determine whether a dictionary entry's part of speech is compatible with
+    the morpheme type of the queried word. Always returns True if the morpheme
+    type is unknown or has no corresponding part of speech.
+
+    Args:
+        entry (DictionaryEntryWithSenses)
+        morph_type (str | None)
+
+    Returns:
+        bool
+    """
+    if morph_type not in dictionary_pos or entry["partOfSpeech"] in no_pos:
+        return True
+
+    return entry["partOfSpeech"] in dictionary_pos[morph_type]
+
+
+def get_grade_rank(entry: DictionaryEntryWithSenses) -> int:
+    """
+    Get the rank of an entry's vocabulary grade, where more common grades rank
+    lower. Entries without a grade rank last.
+
+    Args:
+        entry (DictionaryEntryWithSenses)
+
+    Returns:
+        int
+    """
+    try:
+        return grades.index(entry["grade"])
+    except ValueError:
+        return len(grades)
+
+
+def get_sense_weights(
+        group: list[DictionaryEntryWithSenses],
+        morph_type: str | None,
+        mode: str = "filter",
+        weight: float = 0.1,
+        max_candidates: int = 0
+    ) -> list[float]:
+    """
+    Get the prior weight of every sense in a group of dictionary entries before
+    the senses are ranked by the model. Senses of entries whose part of speech
+    does not match the queried morpheme are pruned (mode "filter") or
+    down-weighted (mode "weight"). If every sense would be pruned, none are.
+    When more than max_candidates senses remain, those with a matching part of
+    speech, a more common grade, and a lower sense number are kept.
+
+    Args:
+        group (list[DictionaryEntryWithSenses])
+        morph_type (str | None): The morpheme type of the queried word
+        mode (str, optional): "filter", "weight", or "off". Defaults to
+            "filter".
+        weight (float, optional): The weight of mismatched senses in mode
+            "weight". Defaults to 0.1.
+        max_candidates (int, optional): The maximum number of senses with a
+            nonzero weight, or 0 for no maximum. Defaults to 0.
+
+    Raises:
+        ValueError: If mode is not supported.
+
+    Returns:
+        list[float]: One weight per sense in the order of the group's entries
+            and their senses. Pruned senses have a weight of 0.
+    """
+    if mode not in ["filter", "weight", "off"]:
+        raise ValueError("Unsupported part of speech pruning mode: %s" % mode)
+
+    weights = []
+    priorities = []
+
+    for entry in group:
+        match = mode == "off" or is_pos_match(entry, morph_type)
+
+        for i, _ in enumerate(entry["senses"]):
+            if match:
+                weights.append(1.0)
+            else:
+                weights.append(weight if mode == "weight" else 0.0)
+
+            priorities.append((not match, get_grade_rank(entry), i))
+
+    # Never prune every sense
+    if not any(weights):
+        weights = [1.0] * len(weights)
+
+    # Keep the senses with the highest priority
+    if max_candidates and sum(w > 0 for w in weights) > max_candidates:
+        kept = sorted(
+            (i for i, w in enumerate(weights) if w > 0),
+            key=lambda i: priorities[i]
+        )
+
+        for i in kept[max_candidates:]:
+            weights[i] = 0.0
+
+    return weights
@@ -0,0 +1,185 @@
+import json
+import os
+
+from bson.objectid import ObjectId
+import numpy as np
+import torch
+from transformers import PreTrainedTokenizerBase
+
+from app.utils.logging import logger
+
+
+def embed_texts(
+        texts: list[str],
+        encoder: torch.nn.Module,
+        tokenizer: PreTrainedTokenizerBase,
+        batch_size: int = 64,
+        max_length: int = 128
+    ) -> np.ndarray:
+    """
+    Embed texts as the mean of their final hidden states, normalized to unit
+    length so that the dot product of two embeddings is their cosine
+    similarity.
+
+    Args:
+        texts (list[str])
+        encoder (torch.nn.Module): A model that returns last_hidden_state
+        tokenizer (PreTrainedTokenizerBase)
+        batch_size (int, optional): Defaults to 64.
+        max_length (int, optional): The maximum number of tokens embedded of
+            each text. Defaults to 128.
+
+    Returns:
+        np.ndarray: A float32 matrix with one row per text
+    """
+    device = next(encoder.parameters(), torch.empty(0)).device
+    result = []
+
+    for start in range(0, len(texts), batch_size):
+        inputs = tokenizer(
+            texts[start:start + batch_size],
+            padding=True,
+            truncation=True,
+            max_length=max_length,
+            return_tensors="pt"
+        ).to(device)
+
+        with torch.no_grad():
+            hidden = encoder(**inputs).last_hidden_state.float()
+
+        mask = inputs["attention_mask"].unsqueeze(-1).float()
+        pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1)
+        result.append(torch.nn.functional.normalize(pooled, dim=-1).cpu().numpy())
+
+    if not result:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    return np.concatenate(result).astype(np.float32)
+
+
+class SenseEmbeddings():
+    """
+    The embeddings of every sense's definition, stored as a matrix in
+    sense_embeddings.npy with the ID of the sense of each row in
+    sense_ids.npy and the version of the dictionary they were computed from in
+    sense_embeddings.json. The matrix is memory-mapped so that worker
+    processes share it. If the files do not exist or were computed from
+    another version of the dictionary, no senses have embeddings.
+
+    Attributes:
+        path (str): The directory of the embedding files
+        embeddings (np.ndarray | None)
+        index (dict[str, int]): The row of each sense ID
+    """
+    def __init__(self, path: str, version: str | None = None):
+        self.path = path
+        self.embeddings = None
+        self.index = {}
+
+        matrix_file, ids_file, metadata_file = self.get_files(path)
+
+        if not os.path.exists(matrix_file) or not os.path.exists(ids_file):
+            logger.warning("Sense embeddings not found in %s. Run flask embed-senses to compute them." % path)
+            return
+
+        # Sense IDs change whenever the dictionary is imported, so embeddings
+        # of a previous import would match none of the current senses
+        if version is not None:
+            saved_version = None
+            if os.path.exists(metadata_file):
+                with open(metadata_file) as f:
+                    saved_version = json.load(f).get("dictionaryVersion")
+
+            if saved_version != version:
+                logger.warning(
+                    "Sense embeddings in %s were computed from dictionary version %s, not %s. "
+                    "Retrieval is disabled until flask embed-senses is run." % (path, saved_version, version)
+                )
+                return
+
+        self.embeddings = np.load(matrix_file, mmap_mode="r")
+        self.index = {
+            sense_id: i for i, sense_id in enumerate(np.load(ids_file))
+        }
+
+    @staticmethod
+    def get_files(path: str) -> tuple[str, str, str]:
+        """
+        Get the paths of the embedding matrix, sense ID, and metadata files.
+
+        Args:
+            path (str)
+
+        Returns:
+            tuple[str, str, str]: A (matrix_file, ids_file, metadata_file)
+                tuple
+        """
+        return (
+            os.path.join(path, "sense_embeddings.npy"),
+            os.path.join(path, "sense_ids.npy"),
+            os.path.join(path, "sense_embeddings.json")
+        )
+
+    @staticmethod
+    def save(
+            path: str,
+            sense_ids: list[ObjectId],
+            embeddings: np.ndarray,
+            version: str = ""
+        ) -> None:
+        """
+        Save the embeddings of senses to path.
+
+        Args:
+            path (str)
+            sense_ids (list[ObjectId])
+            embeddings (np.ndarray): One row per sense ID
+            version (str, optional): The version of the dictionary the senses
+                are from. Defaults to "".
+        """
+        matrix_file, ids_file, metadata_file = SenseEmbeddings.get_files(path)
+        os.makedirs(path, exist_ok=True)
+
+        np.save(matrix_file, embeddings.astype(np.float32))
+        np.save(ids_file, np.array([str(sense_id) for sense_id in sense_ids]))
+
+        with open(metadata_file, "w") as f:
+            json.dump({"dictionaryVersion": version}, f)
+
+    def rank(self, vector: np.ndarray, sense_ids: list[ObjectId]) -> list[int]:
+        """
+        Order senses by the cosine similarity of their embedding to a context
+        embedding. Senses without an embedding are ordered first, so that
+        senses added since the embeddings were computed are never dropped.
+
+        Args:
+            vector (np.ndarray): The context embedding
+            sense_ids (list[ObjectId])
+
+        Returns:
+            list[int]: Indices into sense_ids from most to least similar
+        """
+        rows = [self.index.get(str(sense_id)) for sense_id in sense_ids]
+        similarity = [float("inf")] * len(sense_ids)
+        known = [i for i, row in enumerate(rows) if row is not None]
+
+        if self.embeddings is not None and known:
+            scores = self.embeddings[[rows[i] for i in known]] @ vector
+            for i, score in zip(known, scores):
+                similarity[i] = float(score)
+
+        return sorted(range(len(sense_ids)), key=lambda i: -similarity[i])
+
+    def top_k(self, vector: np.ndarray, sense_ids: list[ObjectId], k: int) -> list[int]:
+        """
+        Get the k senses most similar to a context embedding.
+
+        Args:
+            vector (np.ndarray): The context embedding
+            sense_ids (list[ObjectId])
+            k (int)
+
+        Returns:
+            list[int]: Indices into sense_ids in their original order
+        """
+        return sorted(self.rank(vector, sense_ids)[:k])
@@ -0,0 +1,203 @@
+from concurrent.futures import Future
+import os
+from queue import Empty, Queue
+from threading import Lock, Thread
+import time
+from typing import Any, Callable, NamedTuple
+
+from app.extensions import metrics
+from app.utils.logging import logger
+
+type RunBatch = Callable[[list[Any]], list[float]]
+
+
+class _Request(NamedTuple):
+    sequences: list[Any]
+    future: Future
+
+
+class InferenceScheduler():
+    """
+    A micro-batching scheduler for the sense ranking model.
+
+    Candidate sets that are submitted from concurrent requests are queued and
+    run through the model together in a single forward pass. A batch is formed
+    from the queue until either the maximum batch size (measured in candidate
+    sequences) is reached or the maximum wait time has passed since the first
+    candidate set of the batch was dequeued. Each submitted candidate set
+    receives its own Future that resolves to one logit per candidate.
+
+    The model scores every (prompt, candidate) sequence independently, so the
+    logits of a candidate set are the same whether it is run alone or together
+    with others. Callers are responsible for applying softmax to their own
+    logits.
+
+    Batches are run by one worker thread by default. When the model runs in a
+    pool of worker processes, one thread per process can be used so that the
+    pool is kept busy.
+
+    This class will initialize using the following environment variables. If
+    they are not initialized, default values will be used.
+     - INFER_BATCH_MAX_SIZE (default: 64)
+     - INFER_BATCH_MAX_WAIT_MS (default: 2)
+
+    Attributes:
+        run_batch (RunBatch): A function that returns one logit for each
+            encoded (prompt, candidate) sequence it is passed
+        max_size (int): The maximum number of sequences in a batch. A single
+            candidate set larger than this is run in a batch by itself.
+        max_wait (float): The maximum number of seconds to wait for more
+            candidate sets after the first of a batch is dequeued
+        concurrency (int): The number of batches that can run at once
+    """
+    def __init__(
+            self,
+            run_batch: RunBatch,
+            max_size: int | None = None,
+            max_wait_ms: float | None = None,
+            concurrency: int = 1
+        ):
+        self.run_batch = run_batch
+        self.concurrency = concurrency
+
+        if max_size is None:
+            max_size = int(os.getenv("INFER_BATCH_MAX_SIZE", 64))
+        self.max_size = max_size
+
+        if max_wait_ms is None:
+            max_wait_ms = float(os.getenv("INFER_BATCH_MAX_WAIT_MS", 2))
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue: Queue[_Request] = Queue()
+        self._threads: list[Thread] = []
+        self._lock = Lock()
+
+    def submit(self, sequences: list[Any]) -> Future:
+        """
+        Queue a candidate set to be run in the next available batch. The worker
+        threads are started on the first submission.
+
+        Args:
+            sequences (list[Any]): The encoded [prompt, candidate] sequences of
+                a candidate set
+
+        Returns:
+            Future: A Future that resolves to a list of logits, one for each
+                sequence in the order they were passed
+        """
+        future = Future()
+
+        if not sequences:
+            future.set_result([])
+            return future
+
+        self._start()
+        self._queue.put(_Request(sequences, future))
+
+        depth = self._queue.qsize()
+        metrics.set("infer.scheduler.queue_depth", depth)
+        metrics.maximum("infer.scheduler.queue_depth_max", depth)
+
+        return future
+
+    def _start(self) -> None:
+        """
+        Start the worker threads if they are not already running.
+        """
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+
+            while len(self._threads) < self.concurrency:
+                thread = Thread(
+                    target=self._work,
+                    name="inference-scheduler-%d" % len(self._threads),
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _next_batch(
+            self,
+            carry: _Request | None
+        ) -> tuple[list[_Request], _Request | None]:
+        """
+        Block until at least one candidate set is available then collect
+        candidate sets into a batch until the batch is full or the maximum
+        wait time has passed.
+
+        Args:
+            carry (_Request | None): A candidate set that did not fit in the
+                previous batch
+
+        Returns:
+            tuple[list[_Request], _Request | None]: A (batch, carry) tuple
+        """
+
+        # Start with a candidate set that did not fit in the previous batch
+        if carry is not None:
+            first, carry = carry, None
+        else:
+            first = self._queue.get()
+
+        batch = [first]
+        size = len(first.sequences)
+        deadline = time.monotonic() + self.max_wait
+
+        while size < self.max_size:
+            try:
+                timeout = max(deadline - time.monotonic(), 0)
+                request = self._queue.get(timeout=timeout)
+            except Empty:
+                break
+
+            # Keep candidate sets that do not fit for the next batch
+            if size + len(request.sequences) > self.max_size:
+                carry = request
+                break
+
+            batch.append(request)
+            size += len(request.sequences)
+
+        return batch, carry
+
+    def _work(self) -> None:
+        """
+        Run batches until the process exits.
+        """
+        carry = None
+
+        while True:
+            batch, carry = self._next_batch(carry)
+            metrics.set("infer.scheduler.queue_depth", self._queue.qsize())
+
+            # Skip candidate sets whose callers are no longer waiting
+            batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            sequences = [s for request in batch for s in request.sequences]
+
+            try:
+                logits = self.run_batch(sequences)
+
+            except Exception as e:
+                logger.exception(e)
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            metrics.increment("infer.scheduler.batches")
+            metrics.increment("infer.scheduler.requests", len(batch))
+            metrics.increment("infer.scheduler.sequences", len(sequences))
+            logger.debug(
+                "Ran inference batch of %d candidate sets (%d sequences).",
+                len(batch),
+                len(sequences)
+            )
+
+            # Split the logits back into each candidate set
+            start = 0
+            for request in batch:
+                end = start + len(request.sequences)
+                request.future.set_result(logits[start:end])
+                start = end
@@ -0,0 +1,261 @@
+import json
+import os
+import random
+import tempfile
+
+from bson.objectid import ObjectId
+import click
+import dotenv
+
+from app.utils.cli import parse_counts
+
+# Common nouns that MeCab always parses as a single morpheme
+words = [
+    "사과", "학교", "바다", "하늘", "나무", "친구", "음식", "시간",
+    "사람", "도시", "자동차", "병원", "가족", "문제", "생각", "이야기",
+    "노래", "공원", "시장", "의자", "책상", "편지", "사진", "여행",
+    "운동", "날씨", "주말", "아침", "저녁", "고양이", "강아지", "가방",
+]
+
+# Filler sentences that contain none of the words above
+filler = [
+    "오늘은 기분이 좋아요.",
+    "어제는 비가 많이 왔어요.",
+    "그래서 집에서 쉬었어요.",
+    "내일은 일찍 일어날 거예요.",
+]
+
+special_tokens = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+
+
+def get_synthetic_dictionary(
+        groups: int,
+        senses: int,
+        seed: int = 0
+    ) -> list[dict]:
+    """
+    Generate a dictionary in the format of dict.json with one entry for each
+    of the first groups words, each with the given number of senses.
+    Definitions vary in length like those of the real dictionary.
+
+    Args:
+        groups (int): The number of words. At most len(words).
+        senses (int): The number of senses of each word
+        seed (int, optional): Defaults to 0.
+
+    Raises:
+        ValueError: If groups is greater than the number of words.
+
+    Returns:
+        list[dict]
+    """
+    if groups > len(words):
+        raise ValueError("At most %d groups can be generated." % len(words))
+
+    rng = random.Random(seed)
+    dictionary = []
+
+    for i, word in enumerate(words[:groups]):
+        dictionary.append({
+            "sourceId": "synthetic-%d" % i,
+            "sourceLanguage": "한국어",
+            "writtenForm": word,
+            "variations": [],
+            "partOfSpeech": "명사",
+            "grade": "초급",
+            "queryStrs": [word],
+            "senses": [{
+                "senseNo": str(j + 1),
+                "definition": "%s의 %d번째 뜻으로 %s 쓰는 말." % (
+                    word, j + 1, " ".join(rng.choices(filler, k=rng.randint(1, 3)))
+                ),
+                "partOfSpeech": "명사",
+                "examples": [],
+                "type": "일반어",
+                "equivalents": [{
+                    "equivalentLanguage": "영어",
+                    "equivalent": "word %d-%d" % (i, j + 1),
+                    "definition": "The meaning number %d of a synthetic word." % (j + 1),
+                }],
+            } for j in range(senses)],
+        })
+
+    return dictionary
+
+
+def get_synthetic_entries(groups: int, senses: int, seed: int = 0) -> list[dict]:
+    """
+    Generate the dictionary entries returned by get_inference for a query of
+    the first groups words, with IDs and random ranks, without a database or
+    model.
+
+    Args:
+        groups (int)
+        senses (int)
+        seed (int, optional): Defaults to 0.
+
+    Returns:
+        list[dict]
+    """
+    rng = random.Random(seed)
+    entries = get_synthetic_dictionary(groups, senses, seed)
+
+    for entry in entries:
+        entry["_id"] = ObjectId()
+        ranks = [rng.random() for _ in entry["senses"]]
+
+        for sense, rank in zip(entry["senses"], ranks):
+            sense["_id"] = ObjectId()
+            sense["rank"] = rank / sum(ranks)
+
+    return entries
+
+
+def get_synthetic_query(groups: int, context: int) -> tuple[str, str]:
+    """
+    Get a sentence that contains the first groups words and a context with
+    the given number of filler sentences before and after it.
+
+    Args:
+        groups (int)
+        context (int): The number of filler sentences on each side of the
+            query
+
+    Returns:
+        tuple[str, str]: A (query, context) tuple
+    """
+    query = " ".join(word + "와" for word in words[:groups]) + " 있어요."
+    before = [filler[i % len(filler)] for i in range(context)]
+    after = [filler[-i % len(filler)] for i in range(context)]
+
+    return query, " ".join([*before, query, *after])
+
+
+def build_tiny_model(path: str, seed: int = 0) -> None:
+    """
+    Save a randomly initialized two-layer BERT multiple choice model and a
+    tokenizer with a vocabulary of every Hangul syllable to path. The model has
+    the architecture of the sense ranking model but is small enough to build
+    in seconds without a network connection. Its ranks are meaningless.
+
+    Args:
+        path (str)
+        seed (int, optional): Defaults to 0.
+    """
+    import torch
+    from transformers import BertConfig, BertForMultipleChoice, BertTokenizerFast
+
+    syllables = [chr(c) for c in range(ord("가"), ord("힣") + 1)]
+    characters = [chr(c) for c in range(33, 127)]
+    vocab = [
+        *special_tokens,
+        *characters,
+        *syllables,
+        *["##" + c for c in [*characters, *syllables]],
+    ]
+
+    os.makedirs(path, exist_ok=True)
+    vocab_file = os.path.join(path, "vocab.txt")
+    with open(vocab_file, "w") as f:
+        f.write("\n".join(vocab))
+
+    BertTokenizerFast(vocab_file=vocab_file, do_lower_case=False).save_pretrained(path)
+
+    torch.manual_seed(seed)
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=128,
+    )
+    BertForMultipleChoice(config).save_pretrained(path)
+
+
+@click.command()
+@click.option("--groups", default="1,8,32", callback=parse_counts)
+@click.option("--senses", default="2,8,32", callback=parse_counts)
+@click.option("--contexts", default="0,4,16", callback=parse_counts)
+@click.option("--requests", default=20, type=click.IntRange(min=1))
+@click.option("--database", default="lexica-benchmark")
+@click.option("--model", default=None)
+@click.option("--output", "-o", default="benchmark.json")
+def main(
+        groups: list[int],
+        senses: list[int],
+        contexts: list[int],
+        requests: int,
+        database: str,
+        model: str | None,
+        output: str
+    ):
+    """This command benchmarks dictionary lookup and inference against a
+    synthetic dictionary and a tiny randomly initialized model, so it needs
+    neither the real dictionary nor a network connection. For every
+    combination of word count (groups), senses per word, and filler sentences
+    around the query (contexts), the latency of query_dictionary and
+    get_inference is measured. The synthetic dictionary is imported into its
+    own database, which is dropped first. The rank cache is disabled. Other
+    INFER_* environment variables are used as set. Run it with:
+
+    python -m app.utils.dictionary.synthetic
+
+    Options:
+        --groups: (optional) Comma-separated numbers of words in the query.
+        Defaults to 1,8,32.
+        --senses: (optional) Comma-separated numbers of senses of each word.
+        Defaults to 2,8,32.
+        --contexts: (optional) Comma-separated numbers of filler sentences on
+        each side of the query. Defaults to 0,4,16.
+        --requests: (optional) The number of queries to run for each
+        combination. Defaults to 20.
+        --database: (optional) The MongoDB database to import the synthetic
+        dictionary into. Defaults to lexica-benchmark.
+        --model: (optional) The directory of a model to benchmark. Defaults to
+        a tiny model built in a temporary directory.
+        --output, -o: (optional) The JSON file to write results to. Defaults
+        to benchmark.json.
+    """
+    dotenv.load_dotenv()
+
+    if database == os.getenv("MONGO_NAME", "lexica"):
+        raise click.BadParameter("Must not be the application's database.", param_hint="--database")
+
+    if model is None:
+        model = tempfile.mkdtemp()
+        click.echo("Building tiny model in %s..." % model)
+        build_tiny_model(model)
+
+    # Configure the app before it is imported
+    os.environ["MONGO_NAME"] = database
+    os.environ["INFER_MODEL_NAME"] = model
+    os.environ["INFER_CACHE"] = "False"
+    os.environ["INFER_ANNOTATE_ON_SAVE"] = "False"
+
+    from app.utils.dictionary.benchmark import benchmark_inference
+
+    results = benchmark_inference(groups, senses, contexts, requests)
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    click.echo("%-7s %-7s %-8s %12s %12s %12s %10s" % (
+        "Groups", "Senses", "Context", "Lookup (ms)", "p50 (ms)", "p99 (ms)", "Words/s"
+    ))
+
+    for result in results:
+        click.echo("%-7d %-7d %-8d %12.1f %12.1f %12.1f %10.1f" % (
+            result["groups"],
+            result["senses"],
+            result["context"],
+            result["lookup"] * 1000,
+            result["p50"] * 1000,
+            result["p99"] * 1000,
+            result["throughput"] * result["groups"]
+        ))
+
+    click.echo("Wrote results to %s" % output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+import multiprocessing
+import os
+from typing import Any
+
+import numpy as np
+import torch
+
+from app.extensions import metrics
+from app.utils.logging import logger
+
+
+def configure_threads(intra_op: int | None, inter_op: int | None) -> None:
+    """
+    Set the number of threads torch uses within an operation (intra-op) and
+    across independent operations (inter-op) in this process. Inter-op threads
+    can only be set before torch runs its first parallel operation, so a
+    warning is logged if they can no longer be changed.
+
+    Args:
+        intra_op (int | None): Leave unchanged if None
+        inter_op (int | None): Leave unchanged if None
+    """
+    if intra_op is not None:
+        torch.set_num_threads(intra_op)
+
+    if inter_op is not None:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            logger.warning("Inter-op threads can no longer be set in this process.")
+
+
+def _initialize_worker(intra_op: int | None, inter_op: int | None) -> None:
+    """
+    Initialize an inference worker process. Thread budgets are set before the
+    model is loaded and the worker is prevented from starting a pool of its
+    own.
+    """
+    os.environ["INFER_WORKERS"] = "0"
+    os.environ["INFER_BATCHING"] = "False"
+
+    if intra_op is not None:
+        os.environ["INFER_INTRA_OP_THREADS"] = str(intra_op)
+    if inter_op is not None:
+        os.environ["INFER_INTER_OP_THREADS"] = str(inter_op)
+
+    # Set the thread budgets and load the model in this process
+    import app.utils.dictionary.infer
+
+
+def _score(sequences: list[Any]) -> tuple[list[float], tuple[dict, dict]]:
+    from app.utils.dictionary.infer import score_sequences
+
+    # Return the metrics recorded while scoring so that they are served by
+    # the parent process
+    return score_sequences(sequences), metrics.drain()
+
+
+def _embed(texts: list[str]) -> tuple[np.ndarray, tuple[dict, dict]]:
+    from app.utils.dictionary.infer import embed
+
+    return embed(texts), metrics.drain()
+
+
+def _merge_metrics(future: Future) -> Future:
+    """
+    Get a Future that resolves to the result of a worker's task once the
+    metrics returned with it are merged into this process's metrics.
+    """
+    result = Future()
+
+    def done(task: Future):
+        try:
+            value, (counters, gauges) = task.result()
+        except BaseException as e:
+            result.set_exception(e)
+            return
+
+        metrics.merge(counters, gauges)
+        result.set_result(value)
+
+    future.add_done_callback(done)
+
+    return result
+
+
+class InferenceWorkerPool():
+    """
+    A pool of dedicated inference worker processes. Each worker loads its own
+    copy of the model and is limited to a fixed number of torch threads so
+    that several workers, and the Flask workers that submit to them, do not
+    oversubscribe the CPU. Workers are started with the spawn method so that
+    they do not inherit torch's thread pools from the parent process. Metrics
+    recorded in a worker are returned with each result and merged into the
+    metrics of the parent process.
+
+    Attributes:
+        workers (int): The number of worker processes
+        intra_op (int | None): The number of intra-op threads per worker
+        inter_op (int | None): The number of inter-op threads per worker
+        executor (ProcessPoolExecutor)
+    """
+    def __init__(
+            self,
+            workers: int,
+            intra_op: int | None = None,
+            inter_op: int | None = None
+        ):
+        self.workers = workers
+        self.intra_op = intra_op
+        self.inter_op = inter_op
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_initialize_worker,
+            initargs=(intra_op, inter_op)
+        )
+
+    def submit(self, sequences: list[Any]) -> Future:
+        """
+        Score encoded sequences in the next available worker.
+
+        Args:
+            sequences (list[Any])
+
+        Returns:
+            Future: A Future that resolves to one logit per sequence
+        """
+        return _merge_metrics(self.executor.submit(_score, sequences))
+
+    def score(self, sequences: list[Any]) -> list[float]:
+        """
+        Score encoded sequences in the next available worker and wait for the
+        result.
+
+        Args:
+            sequences (list[Any])
+
+        Returns:
+            list[float]
+        """
+        return self.submit(sequences).result()
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Embed texts with the encoder of the model in the next available worker
+        and wait for the result.
+
+        Args:
+            texts (list[str])
+
+        Returns:
+            np.ndarray
+        """
+        return _merge_metrics(self.executor.submit(_embed, texts)).result()
+
+    def shutdown(self) -> None:
+        """
+        Stop all worker processes.
+        """
+        self.executor.shutdown()
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from hashlib import sha256
+import json
+import os
+from threading import Lock
+
+from graphql import DocumentNode, GraphQLError, GraphQLSchema, parse, validate
+
+from app.extensions import metrics
+from app.utils.logging import logger
+
+
+def get_query_hash(query: str) -> str:
+    """
+    Get the hash that identifies a GraphQL query.
+
+    Args:
+        query (str)
+
+    Returns:
+        str: The hex SHA-256 digest of the query
+    """
+    return sha256(query.encode()).hexdigest()
+
+
+class DocumentCache():
+    """
+    An LRU cache of parsed and validated GraphQL documents keyed by the hash
+    of their query, so that repeated queries are only parsed and validated
+    once in each process. Only valid documents are cached.
+
+    This class will initialize using the following environment variables. If
+    they are not initialized, default values will be used.
+     - GRAPHQL_DOCUMENT_CACHE_SIZE (default: 256)
+
+    Attributes:
+        schema (GraphQLSchema): The schema that documents are validated against
+        max_size (int): The maximum number of documents held in memory
+    """
+    def __init__(self, schema: GraphQLSchema, max_size: int | None = None):
+        self.schema = schema
+
+        if max_size is None:
+            max_size = int(os.getenv("GRAPHQL_DOCUMENT_CACHE_SIZE", 256))
+        self.max_size = max_size
+
+        self._lru: OrderedDict[str, DocumentNode] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, query: str) -> tuple[DocumentNode | None, list[GraphQLError]]:
+        """
+        Get the parsed document of a query.
+
+        Args:
+            query (str)
+
+        Returns:
+            tuple[DocumentNode | None, list[GraphQLError]]: A (document, errors)
+                tuple where document is None if the query could not be parsed
+                and errors are any syntax or validation errors
+        """
+        key = get_query_hash(query)
+
+        with self._lock:
+            document = self._lru.get(key)
+            if document is not None:
+                self._lru.move_to_end(key)
+
+        if document is not None:
+            metrics.increment("graphql.documents.hits")
+            return document, []
+
+        metrics.increment("graphql.documents.misses")
+
+        try:
+            document = parse(query)
+        except GraphQLError as e:
+            return None, [e]
+
+        errors = validate(self.schema, document)
+        if errors:
+            return document, errors
+
+        with self._lock:
+            self._lru[key] = document
+
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+        return document, []
+
+
+class PersistedQueries():
+    """
+    Queries that clients can execute by their hash instead of sending their
+    full text, registered from a JSON manifest that maps the hex SHA-256
+    digest of each query to the query. If the manifest does not exist, no
+    queries are persisted.
+
+    This class will initialize using the following environment variables. If
+    they are not initialized, default values will be used.
+     - GRAPHQL_PERSISTED_QUERIES (default: "persisted_queries.json")
+     - GRAPHQL_PERSISTED_ONLY (default: "False")
+
+    Attributes:
+        queries (dict[str, str]): Queries by their hash
+        only (bool): Whether queries that are not persisted are rejected
+    """
+    def __init__(self, path: str | None = None):
+        if path is None:
+            path = os.getenv("GRAPHQL_PERSISTED_QUERIES", "persisted_queries.json")
+
+        self.only = os.getenv("GRAPHQL_PERSISTED_ONLY", "False").lower() == "true"
+        self.queries = {}
+
+        if not os.path.exists(path):
+            if self.only:
+                logger.warning("Persisted query manifest %s not found. All queries will be rejected." % path)
+            return
+
+        with open(path) as f:
+            manifest = json.load(f)
+
+        for query_hash, query in manifest.items():
+            if get_query_hash(query) != query_hash:
+                logger.warning("Persisted query %s does not match its hash. Skipping." % query_hash)
+                continue
+
+            self.queries[query_hash] = query
+
+        logger.info("Loaded %d persisted queries from %s" % (len(self.queries), path))
+
+    def get(self, query_hash: str) -> str | None:
+        """
+        Get a persisted query.
+
+        Args:
+            query_hash (str)
+
+        Returns:
+            str | None: The query or None if it is not persisted
+        """
+        return self.queries.get(query_hash)
@@ -0,0 +1,104 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+from threading import Lock
+from typing import Any, Callable
+
+from app.extensions import metrics
+from app.utils.logging import logger
+
+
+class ExecutorFull(Exception):
+    """
+    Raised when a task is submitted to a BoundedExecutor that already has its
+    maximum number of pending tasks.
+    """
+
+
+class BoundedExecutor():
+    """
+    A thread pool that limits the number of tasks waiting for or running in
+    its threads. Async views await blocking work (the model, MongoDB) in the
+    pool instead of running it in their event loop, and are rejected with
+    ExecutorFull instead of queueing without bound when the pool is saturated.
+
+    This class will initialize using the following environment variables,
+    where NAME is the name of the executor. If they are not initialized,
+    default values will be used.
+     - NAME_EXECUTOR_WORKERS
+     - NAME_EXECUTOR_MAX_PENDING
+
+    Attributes:
+        name (str)
+        workers (int): The number of threads
+        max_pending (int): The maximum number of tasks waiting or running
+        pending (int)
+        executor (ThreadPoolExecutor)
+    """
+    def __init__(self, name: str, workers: int, max_pending: int):
+        self.name = name.lower()
+
+        self.workers = int(os.getenv("%s_EXECUTOR_WORKERS" % name, workers))
+        self.max_pending = int(os.getenv("%s_EXECUTOR_MAX_PENDING" % name, max_pending))
+        if self.max_pending < self.workers:
+            logger.warning("%s_EXECUTOR_MAX_PENDING is less than %s_EXECUTOR_WORKERS. Some threads will never be used." % (name, name))
+
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="%s-executor" % self.name
+        )
+        self._lock = Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Run a function in the pool.
+
+        Args:
+            fn (Callable)
+
+        Raises:
+            ExecutorFull: If the maximum number of tasks are already pending.
+
+        Returns:
+            Future
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                metrics.increment("%s.executor.rejected" % self.name)
+                raise ExecutorFull("The %s executor is full." % self.name)
+
+            self.pending += 1
+            pending = self.pending
+
+        metrics.set("%s.executor.pending" % self.name, pending)
+        metrics.maximum("%s.executor.pending_max" % self.name, pending)
+
+        return self.executor.submit(self._call, fn, *args, **kwargs)
+
+    def _call(self, fn: Callable, *args, **kwargs) -> Any:
+        try:
+            return fn(*args, **kwargs)
+
+        # Release the task's place before its result is available
+        finally:
+            with self._lock:
+                self.pending -= 1
+                pending = self.pending
+
+            metrics.set("%s.executor.pending" % self.name, pending)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run a function in the pool and await its result.
+
+        Args:
+            fn (Callable)
+
+        Raises:
+            ExecutorFull: If the maximum number of tasks are already pending.
+
+        Returns:
+            Any: The return value of fn
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
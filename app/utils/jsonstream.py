@@ -0,0 +1,113 @@
+import json
+from typing import Any, Iterator, TextIO
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# The number of characters read from a file at a time
+chunk_size = 1 << 16
+
+whitespace = " \t\n\r"
+
+
+def iter_json_array(f: TextIO, use_ijson: bool = True) -> Iterator[Any]:
+    """
+    Parse the items of a top-level JSON array one at a time, so that only the
+    item being parsed is held in memory however large the file is. Items are
+    parsed by ijson's C backend if it is installed and by the standard
+    library's decoder otherwise.
+
+    Args:
+        f (TextIO): A file opened in text mode
+        use_ijson (bool, optional): Whether to use ijson if it is installed.
+            Defaults to True.
+
+    Raises:
+        ValueError: If the file is not a JSON array.
+
+    Yields:
+        Iterator[Any]: Each item of the array
+    """
+    if use_ijson and ijson is not None:
+        yield from ijson.items(f.buffer if hasattr(f, "buffer") else f, "item", use_float=True)
+        return
+
+    yield from _iter_json_array(f)
+
+
+def _iter_json_array(f: TextIO) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+
+    def read(size: int) -> bool:
+        nonlocal buffer, position, eof
+
+        # Drop the items that were already parsed before reading more
+        chunk = f.read(size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        eof = not chunk
+
+        return not eof
+
+    def skip(characters: str) -> str:
+        """Skip whitespace and up to one of characters, reading as needed."""
+        nonlocal position
+
+        while True:
+            while position < len(buffer) and buffer[position] in whitespace:
+                position += 1
+
+            if position < len(buffer):
+                if buffer[position] in characters:
+                    position += 1
+                    return buffer[position - 1]
+                return ""
+
+            if not read(chunk_size):
+                return ""
+
+    if skip("[") != "[":
+        raise ValueError("Expected a JSON array")
+
+    if skip("]") == "]":
+        return
+
+    while True:
+        # Parse the next item, reading more of the file while it is
+        # incomplete. An item is only complete once it is followed by a
+        # separator, since a number split across reads (e.g. "1." of "1.5")
+        # also parses, unless the file has ended.
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+
+                following = end
+                while following < len(buffer) and buffer[following] in whitespace:
+                    following += 1
+
+                if eof or (following < len(buffer) and buffer[following] in ",]"):
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+
+            # Read at least as much as is buffered so that an item larger than
+            # a chunk is not re-parsed once per chunk
+            read(max(chunk_size, len(buffer) - position))
+
+        position = end
+        yield item
+
+        separator = skip(",]")
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError("Expected ',' or ']' after item")
+
+        # Skip the whitespace before the next item
+        skip("")
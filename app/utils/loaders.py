@@ -0,0 +1,67 @@
+from collections import defaultdict
+from typing import Any
+
+from graphene.utils.dataloader import DataLoader
+from pymongo.collection import Collection
+
+from app.collections import dictionary_entries, senses, users
+
+
+class DocumentLoader(DataLoader):
+    """
+    Load documents by a field with one $in query for all of the keys that are
+    requested in the same tick of the event loop. Documents are cached by key
+    for the lifetime of the loader, so a loader should only be used for one
+    request.
+
+    Attributes:
+        collection (Collection)
+        field (str): The field that keys are matched against
+        many (bool): Whether each key loads a list of documents instead of at
+            most one document
+    """
+    def __init__(self, collection: Collection, field: str = "_id", many: bool = False):
+        super().__init__()
+        self.collection = collection
+        self.field = field
+        self.many = many
+
+    async def batch_load_fn(self, keys: list[Any]) -> list[Any]:
+        """
+        Load the documents of a batch of keys.
+
+        Args:
+            keys (list[Any])
+
+        Returns:
+            list[Any]: For each key, a list of its documents if many is True,
+                and its document or None otherwise
+        """
+        # MongoDB is queried synchronously. GraphQL requests run on executor
+        # threads, each with its own event loop, so this only blocks the
+        # request that is waiting for the documents
+        documents = defaultdict(list)
+        for document in self.collection.find({self.field: {"$in": list(keys)}}):
+            documents[document[self.field]].append(document)
+
+        if self.many:
+            return [documents[key] for key in keys]
+
+        return [documents[key][0] if documents[key] else None for key in keys]
+
+
+class Loaders():
+    """
+    The loaders of a single GraphQL request, available to resolvers as
+    info.context["loaders"].
+
+    Attributes:
+        users (DocumentLoader): Users by ID
+        dictionary_entries (DocumentLoader): Dictionary entries by ID
+        senses_by_entry (DocumentLoader): The senses of dictionary entries by
+            the entry's ID
+    """
+    def __init__(self):
+        self.users = DocumentLoader(users)
+        self.dictionary_entries = DocumentLoader(dictionary_entries)
+        self.senses_by_entry = DocumentLoader(senses, "dictionaryEntryId", many=True)
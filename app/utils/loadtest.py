@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import time
+from typing import TypedDict
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from app.utils.cli import get_percentiles
+
+
+class LoadTestResult(TypedDict):
+    concurrency: int
+    ok: int
+    rejected: int
+    failed: int
+    p50: float
+    p99: float
+    throughput: float
+    in_flight: float
+
+
+def send(url: str, body: dict, timeout: float = 30) -> tuple[int, float]:
+    """
+    Send a JSON POST request. Requests whose connection is refused, reset, or
+    timed out are reported with status 0 so that they are counted as failed.
+
+    Args:
+        url (str)
+        body (dict)
+        timeout (float, optional): The number of seconds to wait for the
+            server. Defaults to 30.
+
+    Returns:
+        tuple[int, float]: A (status, latency) tuple where latency is in
+            seconds
+    """
+    request = Request(
+        url,
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+
+    start = time.perf_counter()
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except HTTPError as e:
+        status = e.code
+    except (URLError, OSError):
+        status = 0
+
+    return status, time.perf_counter() - start
+
+
+def load_test(
+        url: str,
+        body: dict,
+        concurrency: list[int],
+        requests: int = 200,
+        timeout: float = 30
+    ) -> list[LoadTestResult]:
+    """
+    Send requests to an endpoint from a number of concurrent clients and
+    measure the latency and throughput at each level of concurrency. The mean
+    number of requests in flight is derived from the throughput and mean
+    latency (Little's law) and shows how many requests the server handled
+    concurrently.
+
+    Args:
+        url (str)
+        body (dict): The JSON body of each request
+        concurrency (list[int]): Numbers of concurrent clients to test
+        requests (int, optional): The number of requests to send at each level
+            of concurrency. Defaults to 200.
+        timeout (float, optional): The number of seconds to wait for each
+            response. Defaults to 30.
+
+    Returns:
+        list[LoadTestResult]: The number of successful (2xx), rejected (503),
+            and failed requests (including connection errors and timeouts),
+            the median and 99th percentile latency of successful requests in
+            seconds, the throughput of successful requests per second, and the
+            mean number of requests in flight
+    """
+    results: list[LoadTestResult] = []
+
+    for clients in concurrency:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as executor:
+            responses = list(executor.map(lambda _: send(url, body, timeout), range(requests)))
+        elapsed = time.perf_counter() - start
+
+        latencies = [latency for status, latency in responses if 0 < status < 300]
+        rejected = sum(status == 503 for status, _ in responses)
+        percentiles = get_percentiles(latencies)
+
+        results.append({
+            "concurrency": clients,
+            "ok": len(latencies),
+            "rejected": rejected,
+            "failed": requests - len(latencies) - rejected,
+            "p50": percentiles[49],
+            "p99": percentiles[98],
+            "throughput": len(latencies) / elapsed,
+            "in_flight": sum(latency for _, latency in responses) / elapsed,
+        })
+
+    return results
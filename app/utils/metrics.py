@@ -0,0 +1,102 @@
+from threading import Lock
+
+
+class Metrics():
+    """
+    A helper class for recording process-wide performance metrics.
+
+    Counters are monotonically increasing values (e.g., the number of batches
+    run) and gauges are values that are overwritten (e.g., the current depth of
+    a queue). All methods are thread safe so that metrics can be recorded from
+    Flask handlers and background workers alike.
+
+    Attributes:
+        counters (dict[str, float])
+        gauges (dict[str, float])
+    """
+    def __init__(self):
+        self.counters: dict[str, float] = {}
+        self.gauges: dict[str, float] = {}
+        self._lock = Lock()
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """
+        Increment a counter by value. Counters that do not exist yet are
+        initialized to 0.
+
+        Args:
+            name (str)
+            value (float, optional): Defaults to 1.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name: str, value: float) -> None:
+        """
+        Set the value of a gauge.
+
+        Args:
+            name (str)
+            value (float)
+        """
+        with self._lock:
+            self.gauges[name] = value
+
+    def maximum(self, name: str, value: float) -> None:
+        """
+        Set the value of a gauge only if value is greater than its current
+        value. This is useful for recording high-water marks.
+
+        Args:
+            name (str)
+            value (float)
+        """
+        with self._lock:
+            if value > self.gauges.get(name, float("-inf")):
+                self.gauges[name] = value
+
+    def snapshot(self) -> dict[str, float]:
+        """
+        Return a copy of all counters and gauges.
+
+        Returns:
+            dict[str, float]
+        """
+        with self._lock:
+            return {**self.counters, **self.gauges}
+
+    def drain(self) -> tuple[dict[str, float], dict[str, float]]:
+        """
+        Return a copy of all counters and gauges and remove them, so that the
+        metrics recorded in another process can be merged into this one.
+
+        Returns:
+            tuple[dict[str, float], dict[str, float]]: (counters, gauges)
+        """
+        with self._lock:
+            counters, gauges = dict(self.counters), dict(self.gauges)
+            self.counters.clear()
+            self.gauges.clear()
+
+        return counters, gauges
+
+    def merge(self, counters: dict[str, float], gauges: dict[str, float]) -> None:
+        """
+        Add counters and set gauges drained from another process.
+
+        Args:
+            counters (dict[str, float])
+            gauges (dict[str, float])
+        """
+        with self._lock:
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            self.gauges.update(gauges)
+
+    def reset(self) -> None:
+        """
+        Remove all counters and gauges.
+        """
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
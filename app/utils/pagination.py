@@ -0,0 +1,140 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import binascii
+import os
+from typing import Any, Callable
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from graphql import GraphQLError
+from graphene import relay
+from pymongo.collection import Collection
+
+# The number of documents returned by a connection when first is not given
+default_page_size = int(os.getenv("GRAPHQL_DEFAULT_PAGE_SIZE", 20))
+
+# The largest number of documents a connection returns in one page
+max_page_size = int(os.getenv("GRAPHQL_MAX_PAGE_SIZE", 100))
+
+
+def to_cursor(id: ObjectId) -> str:
+    """
+    Encode the ID of a document as an opaque cursor.
+
+    Args:
+        id (ObjectId)
+
+    Returns:
+        str
+    """
+    return urlsafe_b64encode(("cursor:%s" % id).encode()).decode()
+
+
+def from_cursor(cursor: str) -> ObjectId:
+    """
+    Decode the ID of a document from a cursor.
+
+    Args:
+        cursor (str)
+
+    Raises:
+        GraphQLError: If the cursor is invalid.
+
+    Returns:
+        ObjectId
+    """
+    try:
+        prefix, id = urlsafe_b64decode(cursor.encode()).decode().split(":", 1)
+        if prefix != "cursor":
+            raise ValueError
+
+        return ObjectId(id)
+
+    except (binascii.Error, UnicodeDecodeError, ValueError, InvalidId):
+        raise GraphQLError("Invalid cursor: %s" % cursor)
+
+
+def get_page_size(first: int | None) -> int:
+    """
+    Get the number of documents to return in a page.
+
+    Args:
+        first (int | None): The number of documents requested
+
+    Raises:
+        GraphQLError: If first is negative or greater than the maximum page
+            size.
+
+    Returns:
+        int
+    """
+    if first is None:
+        return min(default_page_size, max_page_size)
+
+    if first < 0 or first > max_page_size:
+        raise GraphQLError("first must be between 0 and %d." % max_page_size)
+
+    return first
+
+
+def paginate(
+        collection: Collection,
+        connection: type[relay.Connection],
+        from_mongo: Callable[[dict], Any],
+        first: int | None = None,
+        after: str | None = None,
+        filter: dict | None = None,
+        projection: dict | None = None
+    ) -> relay.Connection:
+    """
+    Get a page of a Relay connection over a collection in the order of the
+    documents' IDs. Each page is a range scan of the _id index starting after
+    the cursor, so every page costs the same no matter how deep it is, and at
+    most one page of documents is read from the server.
+
+    Args:
+        collection (Collection)
+        connection (type[relay.Connection]): The connection type to return
+        from_mongo (Callable[[dict], Any]): Converts a document to a node
+        first (int | None, optional): The number of documents to return.
+            Defaults to GRAPHQL_DEFAULT_PAGE_SIZE.
+        after (str | None, optional): Return documents after this cursor.
+            Defaults to None.
+        filter (dict | None, optional): A filter on the documents. Defaults
+            to None.
+        projection (dict | None, optional): The fields of each document to
+            return. Defaults to None.
+
+    Returns:
+        relay.Connection
+    """
+    size = get_page_size(first)
+    query = dict(filter or {})
+
+    # Keep any filter on _id so that pages never leave the filtered documents
+    if after is not None:
+        after_query = {"_id": {"$gt": from_cursor(after)}}
+        query = {"$and": [query, after_query]} if "_id" in query else {**query, **after_query}
+
+    # Fetch one more document than requested to know whether there is a next
+    # page, in a single batch
+    documents = list(
+        collection.find(query, projection)
+        .sort("_id", 1)
+        .limit(size + 1)
+        .batch_size(size + 1)
+    ) if size else []
+
+    edges = [
+        connection.Edge(node=from_mongo(document), cursor=to_cursor(document["_id"]))
+        for document in documents[:size]
+    ]
+
+    return connection(
+        edges=edges,
+        page_info=relay.PageInfo(
+            has_next_page=len(documents) > size,
+            has_previous_page=after is not None,
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None
+        )
+    )
@@ -0,0 +1,95 @@
+from graphene import ResolveInfo
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    SelectionSetNode
+)
+
+
+def get_selections(info: ResolveInfo, selection_set: SelectionSetNode | None) -> list[FieldNode]:
+    """
+    Get the fields of a selection set, including the fields of its fragments.
+
+    Args:
+        info (ResolveInfo)
+        selection_set (SelectionSetNode | None)
+
+    Returns:
+        list[FieldNode]
+    """
+    if selection_set is None:
+        return []
+
+    fields = []
+
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            fields.append(selection)
+
+        elif isinstance(selection, InlineFragmentNode):
+            fields += get_selections(info, selection.selection_set)
+
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = info.fragments[selection.name.value]
+            fields += get_selections(info, fragment.selection_set)
+
+    return fields
+
+
+def get_selected_fields(info: ResolveInfo, path: tuple[str, ...] = ()) -> set[str]:
+    """
+    Get the names of the fields selected on the object returned by the field
+    being resolved, or on an object nested within it.
+
+    Args:
+        info (ResolveInfo)
+        path (tuple[str, ...], optional): The names of the fields from the
+            resolved field to the nested object, such as ("edges", "node")
+            for the nodes of a connection. Defaults to ().
+
+    Returns:
+        set[str]
+    """
+    nodes = list(info.field_nodes)
+
+    for name in path:
+        nodes = [
+            field for node in nodes
+            for field in get_selections(info, node.selection_set)
+            if field.name.value == name
+        ]
+
+    return {
+        field.name.value
+        for node in nodes
+        for field in get_selections(info, node.selection_set)
+    }
+
+
+def get_projection(
+        info: ResolveInfo,
+        mongo_fields: dict[str, list[str]],
+        path: tuple[str, ...] = ()
+    ) -> dict[str, int]:
+    """
+    Get a MongoDB projection of only the document fields needed to resolve
+    the GraphQL fields that are selected.
+
+    Args:
+        info (ResolveInfo)
+        mongo_fields (dict[str, list[str]]): The document fields needed by
+            each GraphQL field
+        path (tuple[str, ...], optional): The path to the object, as in
+            get_selected_fields. Defaults to ().
+
+    Returns:
+        dict[str, int]
+    """
+    projection = {"_id": 1}
+
+    for name in get_selected_fields(info, path):
+        for field in mongo_fields.get(name, []):
+            projection[field] = 1
+
+    return projection
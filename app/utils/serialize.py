@@ -0,0 +1,171 @@
+import json
+import time
+from typing import Any, Callable, TypedDict
+
+from app.collections import DictionaryEntryWithSenses
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The media type of the compact /infer response format
+compact_mimetype = "application/vnd.lexica.compact+json"
+
+# The number of decimal places of ranks in the compact format
+rank_precision = 4
+
+
+class EncodingResult(TypedDict):
+    format: str
+    backend: str
+    size: int
+    latency: float
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Encode an object as compact UTF-8 JSON with orjson if it is installed and
+    the standard library otherwise.
+
+    Args:
+        obj (Any)
+
+    Returns:
+        bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def format_entry(entry: DictionaryEntryWithSenses) -> dict:
+    """
+    Transform a dictionary entry with ranked senses into the format returned
+    by the /infer endpoints.
+
+    Args:
+        entry (DictionaryEntryWithSenses)
+
+    Returns:
+        dict
+    """
+    return {
+        "writtenForm": entry["writtenForm"],
+        "partOfSpeech": entry["partOfSpeech"],
+        "senses": [{
+            "definition": sense["definition"],
+            "rank": sense["rank"],
+            "equivalents": [
+                {
+                    "equivalentLanguage": equivalent["equivalentLanguage"],
+                    "equivalent": equivalent["equivalent"],
+                    "definition": equivalent["definition"],
+                }
+                for equivalent in sense["equivalents"]
+                if equivalent["equivalentLanguage"] == "영어"
+            ]  # TODO: Enable user filtering by language
+        } for sense in entry["senses"]]
+    }
+
+
+def format_compact(entries: list[DictionaryEntryWithSenses]) -> dict:
+    """
+    Transform dictionary entries with ranked senses into the compact /infer
+    response format. Each sense is listed once in a sense table, even if its
+    word appears more than once in the query, and words refer to their senses
+    by index:
+
+    {
+        "s": [[definition, [[equivalent, definition], ...]], ...],
+        "r": [[writtenForm, partOfSpeech, [[sense index, rank], ...]], ...]
+    }
+
+    Only English equivalents are included, and ranks are rounded.
+
+    Args:
+        entries (list[DictionaryEntryWithSenses])
+
+    Returns:
+        dict
+    """
+    table = []
+    index = {}
+    result = []
+
+    for entry in entries:
+        ranks = []
+
+        for sense in entry["senses"]:
+            if sense["_id"] not in index:
+                index[sense["_id"]] = len(table)
+                table.append([
+                    sense["definition"],
+                    [
+                        [equivalent["equivalent"], equivalent["definition"]]
+                        for equivalent in sense["equivalents"]
+                        if equivalent["equivalentLanguage"] == "영어"
+                    ]
+                ])
+
+            ranks.append([index[sense["_id"]], round(sense["rank"], rank_precision)])
+
+        result.append([entry["writtenForm"], entry["partOfSpeech"], ranks])
+
+    return {"s": table, "r": result}
+
+
+def benchmark_encoding(
+        entries: list[DictionaryEntryWithSenses],
+        repeats: int = 1000
+    ) -> list[EncodingResult]:
+    """
+    Measure the size and encoding time of an /infer response in the verbose
+    and compact formats with each available JSON backend. Formatting the
+    entries is included in the encoding time.
+
+    Args:
+        entries (list[DictionaryEntryWithSenses])
+        repeats (int, optional): The number of times to encode each response.
+            Defaults to 1000.
+
+    Returns:
+        list[EncodingResult]: The size in bytes and the mean encoding time in
+            seconds of each format and backend
+    """
+    formats: dict[str, Callable[[], dict]] = {
+        "verbose": lambda: {
+            "Message": "Success.",
+            "Result": [format_entry(entry) for entry in entries],
+        },
+        "compact": lambda: format_compact(entries),
+    }
+
+    backends: dict[str, Callable[[Any], bytes]] = {
+        "json": lambda obj: json.dumps(obj).encode(),
+        "json-compact": lambda obj: json.dumps(
+            obj, ensure_ascii=False, separators=(",", ":")
+        ).encode(),
+    }
+
+    if orjson is not None:
+        backends["orjson"] = orjson.dumps
+
+    results: list[EncodingResult] = []
+
+    for format, get_response in formats.items():
+        for backend, encode in backends.items():
+            start = time.perf_counter()
+            for _ in range(repeats):
+                body = encode(get_response())
+            latency = (time.perf_counter() - start) / repeats
+
+            results.append({
+                "format": format,
+                "backend": backend,
+                "size": len(body),
+                "latency": latency,
+            })
+
+    return results
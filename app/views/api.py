@@ -1,15 +1,51 @@
-from flask import Blueprint, make_response, request, jsonify
+from queue import Queue
 
+from flask import (
+    Blueprint,
+    current_app,
+    jsonify,
+    make_response,
+    redirect,
+    request,
+    Response,
+    url_for
+)
+
+from app.extensions import metrics
 from app.json_schemas import API, validate_schema
-from app.schema import schema
-from app.utils.dictionary.infer import get_inference
+from app.schema import execute
+from app.utils.caching import (
+    canonicalize_text,
+    get_etag,
+    max_age,
+    TTLValue,
+    version_ttl
+)
+from app.utils.cognito import get_access_token_from_request
+from app.utils.dictionary.dictionary import get_dictionary_version
+from app.utils.dictionary.infer import get_inference, inference_id, iter_inference
+from app.utils.executor import BoundedExecutor, ExecutorFull
 from app.utils.logging import logger
+from app.utils.serialize import (
+    compact_mimetype,
+    dumps,
+    format_compact,
+    format_entry
+)
 
 blueprint = Blueprint("api", __name__)
 
+# Bound the model and MongoDB work that views can have in flight
+infer_executor = BoundedExecutor("INFER", workers=4, max_pending=64)
+graphql_executor = BoundedExecutor("GRAPHQL", workers=16, max_pending=256)
+
+# Read the dictionary version of GET /infer ETags at most once every
+# INFER_VERSION_TTL seconds
+dictionary_version = TTLValue(get_dictionary_version, version_ttl)
+
 
 @blueprint.route("/graphql", methods=["POST"])
-def graphql():
+async def graphql():
     """
     Handle GraphQL requests via POST method.
 
@@ -19,6 +55,9 @@ def graphql():
 
     Request Body (JSON):
         - query (str): The GraphQL query string.
+        - id (str, optional): The SHA-256 hash of a persisted query to
+            execute instead of query. The hash can also be sent as
+            extensions.persistedQuery.sha256Hash.
         - variables (dict, optional): A dictionary of variables for
             parameterized queries.
         - operationName (str, optional): The name of the operation to execute
@@ -54,6 +93,7 @@ def graphql():
     HTTP Status:
         - 200 OK: The request was successfully processed and a valid response
                   was returned.
+        - 503 Service Unavailable: Too many GraphQL requests are in flight.
     """
     data = request.get_json()
 
@@ -62,12 +102,32 @@ def graphql():
     variables = data.get("variables")
     operation_name = data.get("operationName")
 
-    # Execute the GraphQL query
-    result = schema.execute(
-        query,
-        variables=variables,
-        operation_name=operation_name,
-    )
+    # Persisted queries are sent by their hash as "id" or as an Apollo
+    # persisted query extension
+    query_hash = data.get("id") or (
+        (data.get("extensions") or {}).get("persistedQuery") or {}
+    ).get("sha256Hash")
+
+    # User data is only resolved for requests with a valid Access Token,
+    # which is verified by the resolvers that need it
+    try:
+        access_token = get_access_token_from_request()
+    except (KeyError, ValueError):
+        access_token = None
+
+    # Execute the GraphQL query in a thread so that MongoDB round trips do not
+    # block the event loop
+    try:
+        result = await graphql_executor.run(
+            execute,
+            query,
+            variables,
+            operation_name,
+            query_hash,
+            access_token,
+        )
+    except ExecutorFull:
+        return make_response({"Message": "The server is busy."}, 503)
 
     # Format the execution result and send the response
     response_data = {
@@ -82,9 +142,26 @@ def graphql():
     return response
 
 
+def wants_compact() -> bool:
+    """
+    Determine whether the client requested the compact /infer response format,
+    either with the "format=compact" query parameter or by preferring its
+    media type in the Accept header.
+
+    Returns:
+        bool
+    """
+    if request.args.get("format") == "compact":
+        return True
+
+    best = request.accept_mimetypes.best_match(["application/json", compact_mimetype])
+
+    return best == compact_mimetype
+
+
 @blueprint.route("/infer", methods=["POST"])
 @validate_schema(API.infer_schema)
-def infer(validated_data: API.InferRequestType):
+async def infer(validated_data: API.InferRequestType):
     """
     Process a POST request to infer the most appropriate dictionary definitions
     for a set of words.
@@ -129,6 +206,16 @@ def infer(validated_data: API.InferRequestType):
                     - definition (str): The definition of the equivalent
                         translation.
 
+    Compact Response (application/vnd.lexica.compact+json):
+        Returned instead if the request has the query parameter
+        "format=compact" or an Accept header that prefers
+        application/vnd.lexica.compact+json. Each sense is listed once and
+        words refer to senses by their index in the sense table:
+        - s (list): The sense table. Each sense is a [definition, equivalents]
+            list where equivalents are [equivalent, definition] lists.
+        - r (list): One [writtenForm, partOfSpeech, ranks] list for each word
+            in "Query", where ranks are [sense index, rank] lists.
+
     Raises:
         - 500 Internal Server Error: If an unexpected error occurs during the
             inference process.
@@ -136,40 +223,218 @@ def infer(validated_data: API.InferRequestType):
     Returns:
         - 200 OK: If the request is successfully processed.
         - 500 Internal Server Error: If an unexpected error occurs.
+        - 503 Service Unavailable: If too many inferences are in flight.
     """
+    query = validated_data["Query"]
+    context = validated_data.get("Context")
+
+    return await get_infer_response(query, context)
+
+
+@blueprint.route("/infer", methods=["GET"])
+async def infer_get():
+    """
+    Process a GET request to infer the most appropriate dictionary definitions
+    for a set of words. The response is the same as POST /infer, but it can be
+    stored by browsers and shared caches.
+
+    For a given dictionary and model, a response depends only on the query,
+    the context, and the format. Its ETag is a hash of these and of the
+    versions of the dictionary and the model, so it changes whenever the
+    dictionary is imported again (within INFER_VERSION_TTL seconds) or the
+    model or its settings change. Requests
+    with a matching If-None-Match header receive 304 Not Modified without
+    running the model.
+
+    Parameters that are not canonical (not NFC-normalized, or with leading,
+    trailing, or repeated whitespace) are redirected to the canonical URL so
+    that equivalent requests share a cache entry.
+
+    Query Parameters:
+        - Query (str): The words for which to retrieve dictionary definitions.
+        - Context (str, optional): A string that provides context for ranking
+            the definitions.
+        - format (str, optional): "compact" for the compact response format.
+
+    Returns:
+        - 200 OK: If the request is successfully processed.
+        - 301 Moved Permanently: If the parameters are not canonical.
+        - 304 Not Modified: If the client's cached response is current.
+        - 400 Bad Request: If Query is missing.
+        - 500 Internal Server Error: If an unexpected error occurs.
+        - 503 Service Unavailable: If too many inferences are in flight.
+    """
+    query = canonicalize_text(request.args.get("Query"))
+    context = canonicalize_text(request.args.get("Context"))
+    compact = request.args.get("format") == "compact"
+
+    if not query:
+        return make_response({"Message": "Missing Query."}, 400)
+
+    # Redirect to the canonical URL so that caches store one copy of each
+    # response
+    args = {"Query": query}
+    if context:
+        args["Context"] = context
+    if compact:
+        args["format"] = "compact"
+
+    if request.args.to_dict() != args:
+        return redirect(url_for("api.infer_get", **args), 301)
+
     try:
-        query = validated_data["Query"]
-        try:
-            context = validated_data["Context"]
-        except KeyError:
-            context = None
-
-        # Execute the query
-        inference = get_inference(query, context=context)
-
-        # Transform the query results into the correct response format
-        result = []
-        for entry in inference:
-            result.append({
-                "writtenForm": entry["writtenForm"],
-                "partOfSpeech": entry["partOfSpeech"],
-                "senses": [{
-                    "definition": sense["definition"],
-                    "rank": sense["rank"],
-                    "equivalents": [
-                        {
-                            "equivalentLanguage": equivalent["equivalentLanguage"],
-                            "equivalent": equivalent["equivalent"],
-                            "definition": equivalent["definition"],
-                        }
-                        for equivalent in sense["equivalents"]
-                        if equivalent["equivalentLanguage"] == "영어"
-                    ]  # TODO: Enable user filtering by language
-                } for sense in entry["senses"]]
-            })
+        version = dictionary_version.get()
+    except Exception as e:
+        logger.exception(e)
+        return make_response({"Message": "An unexpected error occured."}, 500)
+
+    etag = get_etag(
+        query,
+        context,
+        "compact" if compact else "verbose",
+        version,
+        inference_id
+    )
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = await get_infer_response(query, context or None, compact)
+
+        # Only cache successful responses
+        if response.status_code != 200:
+            return response
+
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+
+    return response
+
+
+async def get_infer_response(
+        query: str,
+        context: str | None,
+        compact: bool | None = None
+    ) -> Response:
+    """
+    Run inference for an /infer request and format the response.
+
+    Args:
+        query (str)
+        context (str | None)
+        compact (bool | None, optional): Whether to return the compact
+            response format. If None, it is negotiated from the request.
+            Defaults to None.
+
+    Returns:
+        Response
+    """
+    negotiated = compact is None
+    if negotiated:
+        compact = wants_compact()
+
+    try:
+        # Execute the query in a thread so that the model does not block the
+        # event loop
+        inference = await infer_executor.run(get_inference, query, context=context)
+
+        # Transform the query results into the requested response format
+        if compact:
+            response = Response(dumps(format_compact(inference)), mimetype=compact_mimetype)
+        else:
+            response = make_response({
+                "Message": "Success.",
+                "Result": [format_entry(entry) for entry in inference]
+            }, 200)
+
+    except ExecutorFull:
+        return make_response({"Message": "The server is busy."}, 503)
 
     except Exception as e:
         logger.exception(e)
         return make_response({"Message": "An unexpected error occured."}, 500)
 
-    return make_response({"Message": "Success.", "Result": result}, 200)
+    # The format of a negotiated response depends on the Accept header
+    if negotiated:
+        response.vary.add("Accept")
+
+    return response
+
+
+@blueprint.route("/infer/stream", methods=["POST"])
+@validate_schema(API.infer_schema)
+def infer_stream(validated_data: API.InferRequestType):
+    """
+    Process a POST request to infer the most appropriate dictionary definitions
+    for a set of words and stream each word as soon as it is ranked.
+
+    The request body is the same as /infer. The response is newline-delimited
+    JSON (application/x-ndjson) with one line per word in the same format as
+    each element of the "Result" of /infer, with an additional "index" field
+    giving the position of the word in the query. Words are sent in the order
+    they are ranked, so words with a single sense, which need no model call,
+    are sent first. If an error occurs after the response has started, a
+    final line with a "Message" field is sent. Words are ranked in the same
+    bounded threads as /infer.
+
+    Request Body (JSON):
+        - Query (str): The words for which to retrieve dictionary definitions.
+        - Context (str, optional): A string that provides context for ranking
+            the definitions.
+
+    Returns:
+        - 200 OK: A stream of ranked dictionary entries.
+        - 503 Service Unavailable: If too many inferences are in flight.
+    """
+    query = validated_data["Query"]
+    context = validated_data.get("Context")
+    lines = Queue()
+
+    def produce():
+        try:
+            for index, entry in iter_inference(query, context, stream=True):
+                line = {"index": index, **format_entry(entry)}
+                lines.put(dumps(line) + b"\n")
+
+        except Exception as e:
+            logger.exception(e)
+            lines.put(dumps({"Message": "An unexpected error occured."}) + b"\n")
+
+        finally:
+            lines.put(None)
+
+    # Rank the words in the inference threads and send each line as soon as
+    # it is ready
+    try:
+        infer_executor.submit(produce)
+    except ExecutorFull:
+        return make_response({"Message": "The server is busy."}, 503)
+
+    def generate():
+        while (line := lines.get()) is not None:
+            yield line
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+
+@blueprint.route("/metrics")
+def get_metrics():
+    """
+    Return a snapshot of the performance metrics recorded by this process,
+    such as the depth of the inference scheduler's queue and the number of
+    batches it has run. Metrics are only served when METRICS_ENABLED is true,
+    so they should only be enabled where /metrics is not publicly reachable.
+
+    Response (JSON):
+        - Message (str): A status message.
+        - Metrics (dict): A mapping of metric names to their current values.
+
+    Returns:
+        - 200 OK
+        - 404 Not Found: If metrics are not enabled.
+    """
+    if not current_app.config["METRICS_ENABLED"]:
+        return make_response({"Message": "Not found."}, 404)
+
+    return make_response({"Message": "Success.", "Metrics": metrics.snapshot()}, 200)
@@ -0,0 +1,24 @@
+from app.utils.dictionary.bucketing import get_length_buckets
+
+
+def test_get_length_buckets_splits_outliers():
+    lengths = [30, 200, 32, 28, 31]
+
+    assert get_length_buckets(lengths, overhead=16) == [[3, 0, 4, 2], [1]]
+
+
+def test_get_length_buckets_keeps_uniform_lengths_together():
+    lengths = [30, 31, 32, 33]
+
+    assert get_length_buckets(lengths, overhead=16) == [[0, 1, 2, 3]]
+
+
+def test_get_length_buckets_max_size():
+    buckets = get_length_buckets([10] * 10, max_size=4)
+
+    assert [len(bucket) for bucket in buckets] == [2, 4, 4]
+    assert sorted(i for bucket in buckets for i in bucket) == list(range(10))
+
+
+def test_get_length_buckets_empty():
+    assert get_length_buckets([]) == []
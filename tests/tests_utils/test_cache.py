@@ -0,0 +1,54 @@
+from bson.objectid import ObjectId
+from app.utils.dictionary.cache import get_rank_key, RankCache
+from app.utils.mongo import Mongo
+
+
+def test_get_rank_key():
+    sense_ids = [ObjectId(), ObjectId()]
+    key = get_rank_key("model", "강아지는 뽀송뽀송하다.", "강아지", sense_ids)
+
+    assert key == get_rank_key("model", "강아지는 뽀송뽀송하다.", "강아지", sense_ids)
+    assert key != get_rank_key("model", "강아지는 귀엽다.", "강아지", sense_ids)
+    assert key != get_rank_key("model", "강아지는 뽀송뽀송하다.", "강아지", sense_ids[::-1])
+    assert key != get_rank_key("other", "강아지는 뽀송뽀송하다.", "강아지", sense_ids)
+
+
+class TestRankCache:
+    def test_get_set(self):
+        cache = RankCache("model", max_size=2)
+        sense_ids = [ObjectId(), ObjectId()]
+
+        assert cache.get("context", "word", sense_ids) is None
+
+        cache.set("context", "word", sense_ids, [0.9, 0.1])
+
+        assert cache.get("context", "word", sense_ids) == [0.9, 0.1]
+
+    def test_lru_eviction(self):
+        cache = RankCache("model", max_size=2)
+        sense_ids = [ObjectId(), ObjectId()]
+
+        cache.set("first", "word", sense_ids, [0.9, 0.1])
+        cache.set("second", "word", sense_ids, [0.8, 0.2])
+        cache.get("first", "word", sense_ids)
+        cache.set("third", "word", sense_ids, [0.7, 0.3])
+
+        assert cache.get("first", "word", sense_ids) == [0.9, 0.1]
+        assert cache.get("second", "word", sense_ids) is None
+        assert cache.get("third", "word", sense_ids) == [0.7, 0.3]
+
+    def test_mongo(self, mongo: Mongo):
+        collection = mongo.db["SenseRankCache"]
+        collection.drop()
+        sense_ids = [ObjectId(), ObjectId()]
+
+        RankCache("model", collection).set("context", "word", sense_ids, [0.6, 0.4])
+
+        # A new cache with an empty LRU cache finds the ranks in MongoDB
+        cache = RankCache("model", collection)
+
+        assert cache.get("context", "word", sense_ids) == [0.6, 0.4]
+
+        cache.clear()
+
+        assert cache.get("context", "word", sense_ids) is None
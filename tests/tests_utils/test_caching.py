@@ -0,0 +1,32 @@
+from app.utils import caching
+from app.utils.caching import canonicalize_text, get_etag
+
+
+def test_canonicalize_text():
+    # "한" as a sequence of conjoining jamo
+    decomposed = "한"
+
+    assert canonicalize_text("  %s\t 국어\n" % decomposed) == "한 국어"
+    assert canonicalize_text(None) == ""
+
+
+def test_get_etag():
+    etag = get_etag("한국어", "", "verbose", "1", "model")
+
+    assert etag == get_etag("한국어", "", "verbose", "1", "model")
+    assert etag != get_etag("한국어", "", "verbose", "2", "model")
+    assert get_etag("ab", "c") != get_etag("a", "bc")
+
+
+def test_ttl_value(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(caching.time, "monotonic", lambda: now[0])
+
+    calls = []
+    value = caching.TTLValue(lambda: calls.append(None) or len(calls), 5)
+
+    assert value.get() == 1
+    now[0] = 4.9
+    assert value.get() == 1
+    now[0] = 5.0
+    assert value.get() == 2
@@ -0,0 +1,20 @@
+import click
+import pytest
+
+from app.utils.cli import get_percentiles, parse_counts
+
+
+def test_parse_counts():
+    assert parse_counts(None, None, "1,4,16") == [1, 4, 16]
+
+    with pytest.raises(click.BadParameter):
+        parse_counts(None, None, "1,x")
+
+
+def test_get_percentiles():
+    assert get_percentiles([]) == [0.0] * 99
+    assert get_percentiles([0.5]) == [0.5] * 99
+
+    percentiles = get_percentiles([0.1, 0.2, 0.3])
+    assert len(percentiles) == 99
+    assert percentiles[49] == pytest.approx(0.2)
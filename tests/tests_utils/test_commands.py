@@ -0,0 +1,44 @@
+from unittest.mock import Mock
+
+from flask import Flask
+import pytest
+
+from app import commands
+
+
+def test_init_database_embeds_senses(monkeypatch, tmp_path):
+    monkeypatch.setenv("MONGO_HOST", "localhost")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "dict.json").write_text("[]")
+
+    embedded = []
+    monkeypatch.setattr(commands, "sense_rank_cache", Mock())
+    monkeypatch.setattr(commands, "import_dictionary", Mock())
+    monkeypatch.setattr(commands, "embed", embedded.append)
+    monkeypatch.setattr(commands, "retrieval_k", 5)
+
+    result = Flask(__name__).test_cli_runner().invoke(commands.init_database)
+
+    assert result.exit_code == 0, result.output
+    assert embedded == [commands.embeddings_path]
+
+
+def test_create_indexes(monkeypatch):
+    create_indexes = Mock()
+    monkeypatch.setattr(commands, "create_collection_indexes", create_indexes)
+
+    result = Flask(__name__).test_cli_runner().invoke(commands.create_indexes)
+
+    assert result.exit_code == 0, result.output
+    create_indexes.assert_called_once_with()
+
+
+@pytest.mark.parametrize("option", ["--batch-size", "--writers"])
+def test_init_database_rejects_zero(monkeypatch, option: str):
+    sense_rank_cache = Mock()
+    monkeypatch.setattr(commands, "sense_rank_cache", sense_rank_cache)
+
+    result = Flask(__name__).test_cli_runner().invoke(commands.init_database, [option, "0"])
+
+    assert result.exit_code != 0
+    sense_rank_cache.drop.assert_not_called()
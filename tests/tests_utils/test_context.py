@@ -0,0 +1,56 @@
+import pytest
+from transformers import BertTokenizerFast
+from app.utils.dictionary.context import (
+    get_query_span,
+    get_sentence_window,
+    get_sentences,
+    get_token_window
+)
+
+paragraph = "윤동주는 시인이다. 하늘과 바람과 별과 시를 썼다! 그는 1945년에 죽었다.\n그의 시는 유명하다."
+
+
+@pytest.fixture
+def tokenizer(tmp_path) -> BertTokenizerFast:
+    words = "the quick brown fox jumps over lazy dog".split()
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *words]))
+
+    return BertTokenizerFast(vocab_file=str(vocab))
+
+
+def test_get_query_span():
+    assert get_query_span("시인", paragraph) == (5, 7)
+    assert get_query_span("소설가", paragraph) == (0, len(paragraph))
+
+
+def test_get_sentence_window():
+    assert get_sentence_window("윤동주", paragraph) == "윤동주는 시인이다."
+    assert get_sentence_window("바람", paragraph) == "하늘과 바람과 별과 시를 썼다!"
+    assert get_sentence_window("유명", paragraph) == "그의 시는 유명하다."
+
+
+def test_get_sentence_window_multiple_sentences():
+    assert get_sentence_window("썼다! 그는", paragraph) == "하늘과 바람과 별과 시를 썼다! 그는 1945년에 죽었다."
+
+
+def test_get_token_window(tokenizer: BertTokenizerFast):
+    context = "the quick brown fox jumps over the lazy dog"
+
+    assert get_token_window("jumps", context, tokenizer, 2) == "fox jumps over"
+    assert get_token_window("quick", context, tokenizer, 4) == "the quick brown fox"
+    assert get_token_window("jumps over", context, tokenizer, 0) == "jumps over"
+    assert get_token_window("jumps", context, tokenizer, 100) == context
+
+
+def test_get_sentences():
+    sentences = get_sentences(paragraph)
+
+    assert [sentence for _, sentence in sentences] == [
+        "윤동주는 시인이다.",
+        "하늘과 바람과 별과 시를 썼다!",
+        "그는 1945년에 죽었다.",
+        "그의 시는 유명하다.",
+    ]
+    assert all(paragraph[i:].startswith(sentence) for i, sentence in sentences)
+    assert get_sentences("  \n") == []
@@ -0,0 +1,51 @@
+from graphene import Field, Int, List, ObjectType, relay, Schema, String
+from graphql import parse
+
+from app.utils.cost import CostAnalyzer, QueryCost
+
+
+class Item(ObjectType):
+    title = String()
+    tags = List(String)
+    children = List(lambda: Item)
+
+
+class ItemConnection(relay.Connection):
+    class Meta:
+        node = Item
+
+
+class Query(ObjectType):
+    item = Field(Item)
+    items = Field(ItemConnection, first=Int())
+
+
+schema = Schema(query=Query)
+analyzer = CostAnalyzer(schema.graphql_schema, default_first=20, weights={"Query.items": 10})
+
+
+def get_cost(query, variables=None):
+    return analyzer.get_cost(parse(query), variables=variables)
+
+
+def test_get_cost_fields():
+    assert get_cost("{ item { title tags } }") == QueryCost(3, 2)
+    assert get_cost("{ __schema { types { name } } }") == QueryCost(0, 1)
+
+
+def test_get_cost_lists():
+    # Each child is multiplied by the list size
+    assert get_cost("{ item { children { title } } }") == QueryCost(1 + 1 + 10, 3)
+
+    # Connections are multiplied by first and their edges are not multiplied
+    query = "query ($first: Int) { items(first: $first) { edges { node { title } } } }"
+    assert get_cost(query, {"first": 5}) == QueryCost(10 + 5 * (1 + 1 + 1), 4)
+    assert get_cost(query) == QueryCost(10 + 20 * 3, 4)
+
+
+def test_check():
+    analyzer = CostAnalyzer(schema.graphql_schema, default_first=20, max_cost=100, max_depth=3)
+
+    assert analyzer.check(QueryCost(100, 3)) is None
+    assert "cost" in analyzer.check(QueryCost(101, 3)).message
+    assert "depth" in analyzer.check(QueryCost(1, 4)).message
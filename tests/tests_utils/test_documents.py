@@ -0,0 +1,42 @@
+import json
+
+from graphene import ObjectType, Schema, String
+
+from app.utils.documents import DocumentCache, get_query_hash, PersistedQueries
+
+
+class Query(ObjectType):
+    hello = String()
+
+
+schema = Schema(query=Query)
+
+
+def test_document_cache():
+    cache = DocumentCache(schema.graphql_schema, max_size=1)
+
+    document, errors = cache.get("{ hello }")
+    assert errors == []
+    assert cache.get("{ hello }")[0] is document
+
+    # Invalid documents are not cached
+    assert cache.get("{ goodbye }")[1]
+    assert cache.get("{")[0] is None
+    assert cache.get("{ hello }")[0] is document
+
+    # Documents are evicted when the cache is full
+    cache.get("{ __typename }")
+    assert cache.get("{ hello }")[0] is not document
+
+
+def test_persisted_queries(tmp_path):
+    path = tmp_path / "persisted_queries.json"
+    path.write_text(json.dumps({
+        get_query_hash("{ hello }"): "{ hello }",
+        "0" * 64: "{ __typename }",
+    }))
+
+    queries = PersistedQueries(str(path))
+
+    assert queries.get(get_query_hash("{ hello }")) == "{ hello }"
+    assert queries.get("0" * 64) is None
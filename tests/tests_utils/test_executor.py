@@ -0,0 +1,39 @@
+import asyncio
+from threading import Event
+import pytest
+from app.utils.executor import BoundedExecutor, ExecutorFull
+
+
+def test_bounded_executor_rejects_when_full():
+    executor = BoundedExecutor("TEST", workers=1, max_pending=2)
+    release = Event()
+
+    futures = [executor.submit(release.wait) for _ in range(2)]
+
+    with pytest.raises(ExecutorFull):
+        executor.submit(release.wait)
+
+    release.set()
+    for future in futures:
+        future.result()
+
+    assert executor.pending == 0
+    assert executor.submit(lambda: 1).result() == 1
+
+
+def test_bounded_executor_run():
+    executor = BoundedExecutor("TEST", workers=2, max_pending=4)
+
+    async def main():
+        return await asyncio.gather(*[executor.run(pow, 2, i) for i in range(4)])
+
+    assert asyncio.run(main()) == [1, 2, 4, 8]
+
+
+def test_bounded_executor_environment(monkeypatch):
+    monkeypatch.setenv("TEST_EXECUTOR_WORKERS", "3")
+    monkeypatch.setenv("TEST_EXECUTOR_MAX_PENDING", "5")
+    executor = BoundedExecutor("TEST", workers=1, max_pending=1)
+
+    assert executor.workers == 3
+    assert executor.max_pending == 5
@@ -0,0 +1,64 @@
+import pytest
+import torch
+from app.utils.dictionary.export import export_model
+from app.utils.dictionary.infer import (
+    EagerBackend,
+    encode_pairs,
+    get_candidate,
+    get_prompt,
+    load_backend,
+    load_model,
+    max_length,
+    score_sequences,
+    tokenizer
+)
+
+prompt = get_prompt("강아지는 뽀송뽀송하다.", "강아지")
+sequences = encode_pairs([
+    [prompt, get_candidate("개의 새끼.")],
+    [prompt, get_candidate("주로 어린 자식이나 손주를 귀엽게 이르는 말.")],
+    [prompt, get_candidate("아직 다 자라지 않은 어린 짐승.")],
+])
+
+
+@pytest.fixture(scope="module")
+def eager_logits() -> list[float]:
+    return score_sequences(sequences, EagerBackend(load_model("fp32")))
+
+
+def test_get_candidate():
+    assert get_candidate("개의 새끼.") == "\"개의 새끼\"예요."
+    assert get_candidate("어린 짐승") == "\"어린 짐승\"이에요."
+
+
+@pytest.mark.parametrize("format", ["torchscript", "onnx"])
+def test_export_parity(format: str, eager_logits: list[float], tmp_path):
+    if format == "onnx":
+        pytest.importorskip("onnxruntime")
+
+    export_model(format, str(tmp_path))
+    logits = score_sequences(sequences, load_backend(format, path=str(tmp_path)))
+
+    assert torch.allclose(torch.tensor(logits), torch.tensor(eager_logits), atol=1e-4)
+
+
+def test_encode_pairs_matches_tokenizer():
+    text = [prompt, get_candidate("개의 새끼.")]
+    (sequence,) = encode_pairs([text])
+    inputs = tokenizer(*text)
+
+    assert sequence.input_ids == inputs["input_ids"]
+    assert sequence.token_type_ids == inputs["token_type_ids"]
+
+
+def test_encode_pairs_keeps_word_in_long_context():
+    long_prompt = get_prompt("강아지는 뽀송뽀송하다. " * max_length, "강아지")
+    candidate = get_candidate("개의 새끼.")
+    (sequence,) = encode_pairs([[long_prompt, candidate]])
+    prompt_ids = tokenizer(long_prompt, add_special_tokens=False)["input_ids"]
+    candidate_ids = tokenizer(candidate, add_special_tokens=False)["input_ids"]
+
+    # [CLS] prompt [SEP] candidate [SEP], with the end of the prompt kept
+    first = sequence.input_ids[1:-len(candidate_ids) - 2]
+    assert len(sequence.input_ids) == max_length
+    assert first == prompt_ids[-len(first):]
@@ -0,0 +1,39 @@
+from io import StringIO
+import json
+
+import pytest
+
+from app.utils import jsonstream
+from app.utils.jsonstream import iter_json_array
+
+
+def test_iter_json_array(monkeypatch):
+    items = [{"writtenForm": "한국어", "senses": [{"n": i}] * i} for i in range(50)] + [1, 2.5, "x", None]
+    text = json.dumps(items, ensure_ascii=False, indent=2)
+
+    # Read a few characters at a time so that items span chunks
+    monkeypatch.setattr(jsonstream, "chunk_size", 7)
+
+    assert list(iter_json_array(StringIO(text), use_ijson=False)) == items
+
+
+@pytest.mark.parametrize("size", range(1, 9))
+def test_iter_json_array_numbers(monkeypatch, size: int):
+    text = '[1e5, -0.5, 12.25E-3, 1234567, true, null, {"a": [1, 2]}, 3.5]'
+
+    # Split numbers at every position so that their prefixes also parse
+    monkeypatch.setattr(jsonstream, "chunk_size", size)
+
+    assert list(iter_json_array(StringIO(text), use_ijson=False)) == json.loads(text)
+
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array(StringIO(" [ ] "), use_ijson=False)) == []
+
+
+def test_iter_json_array_invalid():
+    with pytest.raises(ValueError):
+        list(iter_json_array(StringIO("{}"), use_ijson=False))
+
+    with pytest.raises(ValueError):
+        list(iter_json_array(StringIO("[1, {"), use_ijson=False))
@@ -0,0 +1,35 @@
+import asyncio
+
+from app.utils.loaders import DocumentLoader
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.queries = []
+
+    def find(self, filter):
+        self.queries.append(filter)
+        ((field, condition),) = filter.items()
+        return [d for d in self.documents if d[field] in condition["$in"]]
+
+
+def test_document_loader_batches_keys():
+    collection = FakeCollection([{"_id": 1}, {"_id": 2}])
+    loader = DocumentLoader(collection)
+
+    async def load():
+        return await asyncio.gather(loader.load(1), loader.load(2), loader.load(3), loader.load(1))
+
+    assert asyncio.run(load()) == [{"_id": 1}, {"_id": 2}, None, {"_id": 1}]
+    assert collection.queries == [{"_id": {"$in": [1, 2, 3]}}]
+
+
+def test_document_loader_many():
+    collection = FakeCollection([{"_id": 1, "entryId": 1}, {"_id": 2, "entryId": 1}])
+    loader = DocumentLoader(collection, "entryId", many=True)
+
+    async def load():
+        return await asyncio.gather(loader.load(1), loader.load(2))
+
+    assert asyncio.run(load()) == [[{"_id": 1, "entryId": 1}, {"_id": 2, "entryId": 1}], []]
@@ -0,0 +1,24 @@
+import socket
+
+from app.utils import loadtest
+from app.utils.loadtest import load_test, send
+
+
+def test_send_connection_refused():
+    # Bind a port without listening on it so that connections are refused
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        url = "http://127.0.0.1:%d/infer" % s.getsockname()[1]
+
+        status, _ = send(url, {}, timeout=1)
+
+    assert status == 0
+
+
+def test_load_test_counts_failures(monkeypatch):
+    statuses = iter([200, 503, 0, 500])
+    monkeypatch.setattr(loadtest, "send", lambda url, body, timeout: (next(statuses), 0.1))
+
+    (result,) = load_test("http://localhost:5000/infer", {}, [1], requests=4)
+
+    assert (result["ok"], result["rejected"], result["failed"]) == (1, 1, 2)
@@ -0,0 +1,14 @@
+from app.utils.metrics import Metrics
+
+
+def test_drain_and_merge():
+    worker = Metrics()
+    worker.increment("infer.tokens", 10)
+    worker.set("infer.padding_efficiency", 0.5)
+
+    parent = Metrics()
+    parent.increment("infer.tokens", 5)
+    parent.merge(*worker.drain())
+
+    assert worker.snapshot() == {}
+    assert parent.snapshot() == {"infer.tokens": 15, "infer.padding_efficiency": 0.5}
@@ -0,0 +1,66 @@
+from bson.objectid import ObjectId
+from graphene import ObjectType, relay, String
+from graphql import GraphQLError
+import pytest
+
+from app.utils.pagination import (
+    from_cursor,
+    get_page_size,
+    max_page_size,
+    paginate,
+    to_cursor
+)
+
+
+class Item(ObjectType):
+    id = String()
+
+
+class ItemConnection(relay.Connection):
+    class Meta:
+        node = Item
+
+
+def test_cursor_round_trip():
+    id = ObjectId()
+
+    assert from_cursor(to_cursor(id)) == id
+
+
+def test_from_cursor_invalid():
+    with pytest.raises(GraphQLError):
+        from_cursor("not a cursor")
+
+
+def test_get_page_size():
+    assert get_page_size(5) == 5
+
+    with pytest.raises(GraphQLError):
+        get_page_size(max_page_size + 1)
+
+    with pytest.raises(GraphQLError):
+        get_page_size(-1)
+
+
+def test_paginate_keeps_id_filter():
+    id = ObjectId()
+    queries = []
+
+    class Cursor(list):
+        def sort(self, *args):
+            return self
+
+        def limit(self, *args):
+            return self
+
+        def batch_size(self, *args):
+            return self
+
+    class Collection:
+        def find(self, query, projection):
+            queries.append(query)
+            return Cursor()
+
+    paginate(Collection(), ItemConnection, Item, None, to_cursor(ObjectId()), {"_id": id})
+
+    assert queries[0]["$and"][0] == {"_id": id}
@@ -0,0 +1,46 @@
+from graphene import Field, List, ObjectType, Schema, String
+
+from app.utils.projection import get_projection
+
+
+class Item(ObjectType):
+    title = String()
+    text = String()
+
+
+projections = []
+
+
+class Query(ObjectType):
+    items = List(Item)
+    page = Field(lambda: Page)
+
+    def resolve_items(self, info):
+        projections.append(get_projection(info, {"title": ["title"], "text": ["text", "ix"]}))
+        return []
+
+    def resolve_page(self, info):
+        projections.append(get_projection(info, {"title": ["title"]}, ("items",)))
+        return None
+
+
+class Page(ObjectType):
+    items = List(Item)
+
+
+schema = Schema(query=Query)
+
+
+def test_get_projection():
+    projections.clear()
+    schema.execute("{ items { title } }")
+    schema.execute("query { items { ...F } } fragment F on Item { text }")
+
+    assert projections == [{"_id": 1, "title": 1}, {"_id": 1, "text": 1, "ix": 1}]
+
+
+def test_get_projection_nested():
+    projections.clear()
+    schema.execute("{ page { items { title } } }")
+
+    assert projections == [{"_id": 1, "title": 1}]
@@ -0,0 +1,48 @@
+from typing import Any
+
+from app.utils.dictionary.prune import get_sense_weights
+
+
+def entry(pos: str, grade: str, senses: int) -> dict[str, Any]:
+    return {
+        "partOfSpeech": pos,
+        "grade": grade,
+        "senses": [{"definition": str(i)} for i in range(senses)],
+    }
+
+
+group = [
+    entry("명사", "고급", 2),
+    entry("동사", "초급", 1),
+    entry("품사 없음", "", 1),
+]
+
+
+def test_get_sense_weights_filter():
+    assert get_sense_weights(group, "common noun") == [1.0, 1.0, 0.0, 1.0]
+    assert get_sense_weights(group, "verb") == [0.0, 0.0, 1.0, 1.0]
+
+
+def test_get_sense_weights_unknown_morph_type():
+    assert get_sense_weights(group, None) == [1.0] * 4
+    assert get_sense_weights(group, "foreign language") == [1.0] * 4
+
+
+def test_get_sense_weights_weight():
+    assert get_sense_weights(group, "verb", "weight", 0.5) == [0.5, 0.5, 1.0, 1.0]
+
+
+def test_get_sense_weights_off():
+    assert get_sense_weights(group, "verb", "off") == [1.0] * 4
+
+
+def test_get_sense_weights_never_prunes_all():
+    assert get_sense_weights(group[:2], "adverb") == [1.0] * 3
+    assert get_sense_weights([entry("명사", "", 2)], "verb") == [1.0, 1.0]
+
+
+def test_get_sense_weights_max_candidates():
+    # Matching senses first, then more common grades, then lower sense numbers
+    assert get_sense_weights(group, None, max_candidates=2) == [1.0, 0.0, 1.0, 0.0]
+    assert get_sense_weights(group, "common noun", "weight", max_candidates=2) == [1.0, 1.0, 0.0, 0.0]
+    assert get_sense_weights(group, "verb", "weight", max_candidates=3) == [0.1, 0.0, 1.0, 1.0]
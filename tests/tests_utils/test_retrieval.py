@@ -0,0 +1,38 @@
+from bson.objectid import ObjectId
+import numpy as np
+from app.utils.dictionary.retrieval import SenseEmbeddings
+
+
+def test_sense_embeddings_top_k(tmp_path):
+    sense_ids = [ObjectId() for _ in range(3)]
+    embeddings = np.eye(3, dtype=np.float32)
+    SenseEmbeddings.save(str(tmp_path), sense_ids, embeddings)
+
+    loaded = SenseEmbeddings(str(tmp_path))
+    vector = np.array([0.1, 0.9, 0.5], dtype=np.float32)
+
+    assert loaded.rank(vector, sense_ids) == [1, 2, 0]
+    assert loaded.top_k(vector, sense_ids, 2) == [1, 2]
+
+
+def test_sense_embeddings_keeps_senses_without_embeddings(tmp_path):
+    sense_ids = [ObjectId() for _ in range(2)]
+    SenseEmbeddings.save(str(tmp_path), sense_ids, np.eye(2, dtype=np.float32))
+
+    new_id = ObjectId()
+    loaded = SenseEmbeddings(str(tmp_path))
+
+    assert loaded.top_k(np.array([1.0, 0.0]), [*sense_ids, new_id], 2) == [0, 2]
+
+
+def test_sense_embeddings_missing(tmp_path):
+    assert SenseEmbeddings(str(tmp_path)).index == {}
+
+
+def test_sense_embeddings_other_dictionary_version(tmp_path):
+    sense_ids = [ObjectId() for _ in range(2)]
+    SenseEmbeddings.save(str(tmp_path), sense_ids, np.eye(2, dtype=np.float32), "1")
+
+    assert SenseEmbeddings(str(tmp_path), "1").index
+    assert SenseEmbeddings(str(tmp_path), "2").index == {}
+    assert SenseEmbeddings(str(tmp_path), "2").embeddings is None
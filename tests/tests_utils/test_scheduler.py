@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+import pytest
+from app.extensions import metrics
+from app.utils.dictionary.scheduler import InferenceScheduler
+
+
+def fake_run_batch(pairs: list[list[str]]) -> list[float]:
+    return [float(len(candidate)) for _, candidate in pairs]
+
+
+class TestInferenceScheduler:
+    def test_submit(self):
+        scheduler = InferenceScheduler(fake_run_batch, max_size=8, max_wait_ms=0)
+        future = scheduler.submit([["prompt", "a"], ["prompt", "bbb"]])
+
+        assert future.result(timeout=5) == [1.0, 3.0]
+
+    def test_submit_empty(self):
+        scheduler = InferenceScheduler(fake_run_batch, max_size=8, max_wait_ms=0)
+        future = scheduler.submit([])
+
+        assert future.result(timeout=5) == []
+
+    def test_submit_concurrent(self):
+        batches = []
+        release = Event()
+
+        def run_batch(pairs):
+            release.wait(timeout=5)
+            batches.append(len(pairs))
+            return fake_run_batch(pairs)
+
+        scheduler = InferenceScheduler(run_batch, max_size=16, max_wait_ms=50)
+        candidate_sets = [[["prompt", "x" * (i + 1)]] * 2 for i in range(6)]
+
+        with ThreadPoolExecutor(6) as executor:
+            futures = list(executor.map(scheduler.submit, candidate_sets))
+            release.set()
+            results = [future.result(timeout=5) for future in futures]
+
+        # Each candidate set gets only its own logits back
+        for i, result in enumerate(results):
+            assert result == [float(i + 1)] * 2
+
+        # Candidate sets were run together and no batch exceeded the maximum
+        assert len(batches) < len(candidate_sets)
+        assert all(size <= 16 for size in batches)
+
+    def test_submit_oversized(self):
+        scheduler = InferenceScheduler(fake_run_batch, max_size=2, max_wait_ms=0)
+        future = scheduler.submit([["prompt", "a"]] * 5)
+
+        assert future.result(timeout=5) == [1.0] * 5
+
+    def test_submit_exception(self):
+        def run_batch(pairs):
+            raise RuntimeError("Error")
+
+        scheduler = InferenceScheduler(run_batch, max_size=8, max_wait_ms=0)
+        future = scheduler.submit([["prompt", "a"]])
+
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+
+    def test_metrics(self):
+        metrics.reset()
+        scheduler = InferenceScheduler(fake_run_batch, max_size=8, max_wait_ms=0)
+        scheduler.submit([["prompt", "a"], ["prompt", "b"]]).result(timeout=5)
+        snapshot = metrics.snapshot()
+
+        assert snapshot["infer.scheduler.batches"] == 1
+        assert snapshot["infer.scheduler.sequences"] == 2
+        assert "infer.scheduler.queue_depth" in snapshot
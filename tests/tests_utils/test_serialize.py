@@ -0,0 +1,43 @@
+import json
+from app.utils.dictionary.synthetic import get_synthetic_entries
+from app.utils.serialize import (
+    benchmark_encoding,
+    dumps,
+    format_compact,
+    format_entry
+)
+
+entries = get_synthetic_entries(3, 4)
+
+
+def test_format_compact():
+    compact = format_compact(entries)
+
+    assert len(compact["s"]) == 12
+    assert len(compact["r"]) == 3
+
+    written_form, pos, ranks = compact["r"][1]
+    definition, equivalents = compact["s"][ranks[0][0]]
+    verbose = format_entry(entries[1])
+
+    assert [written_form, pos] == [verbose["writtenForm"], verbose["partOfSpeech"]]
+    assert definition == verbose["senses"][0]["definition"]
+    assert equivalents[0][0] == verbose["senses"][0]["equivalents"][0]["equivalent"]
+    assert abs(ranks[0][1] - verbose["senses"][0]["rank"]) < 1e-4
+
+
+def test_format_compact_deduplicates_senses():
+    compact = format_compact([entries[0], entries[0]])
+
+    assert len(compact["s"]) == 4
+    assert compact["r"][0] == compact["r"][1]
+
+
+def test_dumps():
+    assert json.loads(dumps(format_compact(entries))) == format_compact(entries)
+
+
+def test_benchmark_encoding():
+    results = {(r["format"], r["backend"]): r for r in benchmark_encoding(entries, 2)}
+
+    assert results["compact", "json-compact"]["size"] < results["verbose", "json"]["size"]
@@ -0,0 +1,29 @@
+import pytest
+from app.utils.dictionary.dictionary import get_query_str
+from app.utils.dictionary.synthetic import (
+    get_synthetic_dictionary,
+    get_synthetic_query,
+    words
+)
+
+
+def test_get_synthetic_dictionary():
+    dictionary = get_synthetic_dictionary(8, 3)
+
+    assert len(dictionary) == 8
+    assert all(len(entry["senses"]) == 3 for entry in dictionary)
+    assert dictionary == get_synthetic_dictionary(8, 3)
+
+    with pytest.raises(ValueError):
+        get_synthetic_dictionary(len(words) + 1, 1)
+
+
+def test_get_synthetic_query_matches_dictionary():
+    query, context = get_synthetic_query(len(words), 2)
+    keys = get_query_str(query, context).split()
+
+    assert query in context
+    assert all(
+        entry["queryStrs"][0] in keys
+        for entry in get_synthetic_dictionary(len(words), 1)
+    )
@@ -0,0 +1,91 @@
+from flask.testing import FlaskClient
+import pytest
+
+from app.utils.caching import TTLValue
+import app.views.api as api
+
+
+@pytest.fixture
+def infer_client(monkeypatch) -> FlaskClient:
+    from app.app import create_app
+
+    queries = []
+
+    def get_inference(query, context=None):
+        queries.append((query, context))
+        return []
+
+    monkeypatch.setattr(api, "get_inference", get_inference)
+    monkeypatch.setattr(api, "dictionary_version", TTLValue(lambda: "version", 0))
+
+    client = create_app(testing=True).test_client()
+    client.queries = queries
+
+    return client
+
+
+def test_infer_get(infer_client: FlaskClient):
+    res = infer_client.get("/infer", query_string={"Query": "강아지", "Context": "강아지는 귀엽다."})
+
+    assert res.status_code == 200
+    assert res.json == {"Message": "Success.", "Result": []}
+    assert res.headers["ETag"]
+    assert res.cache_control.public
+    assert res.cache_control.max_age == api.max_age
+    assert infer_client.queries == [("강아지", "강아지는 귀엽다.")]
+
+
+def test_infer_get_etag(infer_client: FlaskClient, monkeypatch):
+    etag = infer_client.get("/infer", query_string={"Query": "강아지"}).headers["ETag"]
+
+    res = infer_client.get("/infer", query_string={"Query": "강아지"}, headers={"If-None-Match": etag})
+
+    assert res.status_code == 304
+    assert res.headers["ETag"] == etag
+    assert len(infer_client.queries) == 1
+
+    # The ETag changes with the format and the dictionary version
+    compact = infer_client.get("/infer", query_string={"Query": "강아지", "format": "compact"})
+    assert compact.headers["ETag"] != etag
+
+    monkeypatch.setattr(api, "dictionary_version", TTLValue(lambda: "other", 0))
+    res = infer_client.get("/infer", query_string={"Query": "강아지"}, headers={"If-None-Match": etag})
+
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("args", [
+    # "강아지" as a sequence of conjoining jamo
+    {"Query": "\u1100\u1161\u11bc\u110b\u1161\u110c\u1175"},
+    {"Query": "  강아지   "},
+    {"Query": "강아지", "Context": "강아지는   귀엽다."},
+    {"Query": "강아지", "Context": ""},
+    {"Query": "강아지", "extra": "1"},
+])
+def test_infer_get_redirect(infer_client: FlaskClient, args: dict):
+    res = infer_client.get("/infer", query_string=args)
+
+    assert res.status_code == 301
+    assert "Query=%EA%B0%95%EC%95%84%EC%A7%80" in res.headers["Location"]
+    assert "extra" not in res.headers["Location"]
+    assert infer_client.queries == []
+
+
+def test_infer_get_missing_query(infer_client: FlaskClient):
+    res = infer_client.get("/infer", query_string={"Context": "강아지는 귀엽다."})
+
+    assert res.status_code == 400
+    assert "ETag" not in res.headers
+
+
+def test_infer_get_error_not_cached(infer_client: FlaskClient, monkeypatch):
+    def get_inference(query, context=None):
+        raise RuntimeError("model failed")
+
+    monkeypatch.setattr(api, "get_inference", get_inference)
+    res = infer_client.get("/infer", query_string={"Query": "강아지"})
+
+    assert res.status_code == 500
+    assert "ETag" not in res.headers
+    assert "Cache-Control" not in res.headers
@@ -0,0 +1,318 @@
+from types import SimpleNamespace
+
+from bson.objectid import ObjectId
+from flask.testing import FlaskClient
+from pymongo.errors import BulkWriteError
+import pytest
+
+import app.schema
+import app.utils.loaders
+from app.utils.pagination import to_cursor
+
+
+def matches(document: dict, query: dict) -> bool:
+    for key, value in query.items():
+        if key == "$and":
+            if not all(matches(document, q) for q in value):
+                return False
+        elif isinstance(value, dict) and "$in" in value:
+            if document.get(key) not in value["$in"]:
+                return False
+        elif isinstance(value, dict) and "$gt" in value:
+            if key not in document or not document[key] > value["$gt"]:
+                return False
+        elif document.get(key) != value:
+            return False
+
+    return True
+
+
+class FakeCursor(list):
+    def sort(self, key, direction):
+        return FakeCursor(sorted(self, key=lambda document: document[key]))
+
+    def limit(self, n):
+        return FakeCursor(self[:n])
+
+    def batch_size(self, n):
+        return self
+
+
+class FakeCollection:
+    def __init__(self, documents: list[dict]):
+        self.documents = documents
+
+    def find(self, query: dict, projection: dict | None = None) -> FakeCursor:
+        return FakeCursor(document for document in self.documents if matches(document, query))
+
+    def find_one(self, query: dict, projection: dict | None = None) -> dict | None:
+        return next((document for document in self.documents if matches(document, query)), None)
+
+    def update(self, document: dict, update: dict) -> None:
+        document.update(update.get("$set", {}))
+
+        for field, value in update.get("$push", {}).items():
+            document.setdefault(field, []).extend(value["$each"])
+
+    def find_one_and_update(self, query: dict, update: dict, **kwargs) -> dict | None:
+        document = self.find_one(query)
+        if document is not None:
+            self.update(document, update)
+
+        return document
+
+    # Documents with "locked" set fail to update
+    def bulk_write(self, operations: list, ordered: bool = True) -> SimpleNamespace:
+        self.writes = operations
+        result = {"nMatched": 0, "nModified": 0, "writeErrors": []}
+
+        for index, operation in enumerate(operations):
+            document = self.find_one(operation._filter)
+
+            if document is None:
+                continue
+
+            if document.get("locked"):
+                result["writeErrors"].append({"index": index, "errmsg": "locked"})
+                continue
+
+            self.update(document, operation._doc)
+            result["nMatched"] += 1
+            result["nModified"] += 1
+
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+
+        return SimpleNamespace(bulk_api_result=result)
+
+
+foo = {"_id": ObjectId(), "username": "foo@email.com"}
+bar = {"_id": ObjectId(), "username": "bar@email.com"}
+foo_content = {"_id": ObjectId(), "title": "foo's", "userId": foo["_id"]}
+bar_content = {"_id": ObjectId(), "title": "bar's", "userId": bar["_id"]}
+
+
+@pytest.fixture
+def graphql_client(monkeypatch) -> FlaskClient:
+    from app.app import create_app
+
+    users = FakeCollection([foo, bar])
+    monkeypatch.setattr(app.schema, "users", users)
+    monkeypatch.setattr(app.utils.loaders, "users", users)
+    monkeypatch.setattr(app.schema, "contents", FakeCollection([foo_content, bar_content]))
+
+    # Access Tokens in these tests are the username of the user
+    def get_claim_from_access_token(token: str) -> dict:
+        if token not in (foo["username"], bar["username"]):
+            raise ValueError("Invalid token.")
+        return {"username": token}
+
+    monkeypatch.setattr(app.schema.cognito, "get_claim_from_access_token", get_claim_from_access_token)
+
+    return create_app(testing=True).test_client()
+
+
+def post_graphql(
+        client: FlaskClient,
+        query: str,
+        username: str | None = None,
+        variables: dict | None = None
+    ) -> dict:
+    headers = {"Authorization": "Bearer %s" % username} if username else {}
+    res = client.post("/graphql", json={"query": query, "variables": variables}, headers=headers)
+
+    assert res.status_code == 200
+    return res.json
+
+
+contents_query = "{ contents%s { edges { node { title user { username } } } } }"
+
+
+def test_contents_requires_access_token(graphql_client: FlaskClient):
+    for username in (None, "unknown@email.com"):
+        result = post_graphql(graphql_client, contents_query % "", username)
+
+        assert result["data"]["contents"] is None
+        assert result["errors"][0].startswith("Unauthorized request.")
+
+
+def test_contents_of_viewer(graphql_client: FlaskClient):
+    result = post_graphql(graphql_client, contents_query % "", foo["username"])
+
+    assert "errors" not in result
+    assert result["data"]["contents"]["edges"] == [
+        {"node": {"title": "foo's", "user": {"username": foo["username"]}}}
+    ]
+
+
+def test_contents_of_other_user(graphql_client: FlaskClient):
+    query = contents_query % ("(userId: \"%s\")" % bar["_id"])
+    result = post_graphql(graphql_client, query, foo["username"])
+
+    assert result["data"]["contents"] is None
+    assert result["errors"][0].startswith("Unauthorized request.")
+
+
+def test_users_of_viewer(graphql_client: FlaskClient):
+    query = "{ users%s { edges { node { username } } } }"
+    result = post_graphql(graphql_client, query % "", bar["username"])
+
+    assert result["data"]["users"]["edges"] == [{"node": {"username": bar["username"]}}]
+
+    # A cursor does not widen the filter to other users
+    after = to_cursor(ObjectId("0" * 24))
+    result = post_graphql(graphql_client, query % ("(after: \"%s\")" % after), bar["username"])
+
+    assert result["data"]["users"]["edges"] == [{"node": {"username": bar["username"]}}]
+
+
+@pytest.fixture
+def mutation_client(graphql_client: FlaskClient, monkeypatch) -> FlaskClient:
+    documents = FakeCollection([
+        {"_id": ObjectId(), "title": "first", "explanations": [], "highlights": []},
+        {"_id": ObjectId(), "title": "second", "highlights": [], "locked": True},
+    ])
+    annotated = []
+
+    monkeypatch.setattr(app.schema, "contents", documents)
+    monkeypatch.setattr(app.schema, "annotate_on_save", True)
+    monkeypatch.setattr(app.schema, "queue_annotation", annotated.append)
+
+    graphql_client.documents = documents.documents
+    graphql_client.annotated = annotated
+
+    return graphql_client
+
+
+bulk_mutation = """
+mutation Bulk($updates: [ContentUpdateInput]!) {
+    bulkUpdateContents(updates: $updates) { ok matchedCount modifiedCount ids errors %s }
+}
+"""
+
+
+def test_bulk_update_contents(mutation_client: FlaskClient):
+    first = mutation_client.documents[0]
+    sense_id = ObjectId()
+    highlight = {"position": 2, "score": 90, "senseRanks": [{"rank": 0.75, "senseId": str(sense_id)}]}
+
+    result = post_graphql(mutation_client, bulk_mutation % "", variables={"updates": [{
+        "id": str(first["_id"]),
+        "title": "renamed",
+        "pushExplanations": [{"expression": "귀엽다", "position": 3}],
+        "pushHighlights": [highlight],
+    }]})
+
+    assert "errors" not in result
+    assert result["data"]["bulkUpdateContents"] == {
+        "ok": True,
+        "matchedCount": 1,
+        "modifiedCount": 1,
+        "ids": [str(first["_id"])],
+        "errors": [],
+    }
+
+    # Fields are set and lists are appended to in the same update
+    assert first["title"] == "renamed"
+    assert first["explanations"] == [{"expression": "귀엽다", "position": 3}]
+    assert first["highlights"] == [
+        {"position": 2, "score": 90, "senseRanks": [{"rank": 0.75, "senseId": sense_id}]}
+    ]
+
+
+def test_bulk_update_contents_selects_contents(mutation_client: FlaskClient, monkeypatch):
+    first = mutation_client.documents[0]
+    finds = []
+    find = app.schema.contents.find
+    monkeypatch.setattr(app.schema.contents, "find", lambda *args: finds.append(args) or find(*args))
+    updates = [{"id": str(first["_id"]), "title": "renamed"}]
+
+    post_graphql(mutation_client, bulk_mutation % "", variables={"updates": updates})
+
+    assert finds == []
+
+    result = post_graphql(mutation_client, bulk_mutation % "contents { title }", variables={"updates": updates})
+
+    assert result["data"]["bulkUpdateContents"]["contents"] == [{"title": "renamed"}]
+    assert len(finds) == 1
+
+
+def test_bulk_update_contents_partial_failure(mutation_client: FlaskClient):
+    first, second = mutation_client.documents
+
+    result = post_graphql(mutation_client, bulk_mutation % "", variables={"updates": [
+        {"id": str(first["_id"]), "title": "renamed"},
+        {"id": str(second["_id"]), "title": "renamed"},
+    ]})
+
+    assert result["data"]["bulkUpdateContents"]["ok"] is False
+    assert result["data"]["bulkUpdateContents"]["matchedCount"] == 1
+    assert result["data"]["bulkUpdateContents"]["errors"] == ["%s: locked" % second["_id"]]
+    assert first["title"] == "renamed"
+    assert second["title"] == "second"
+
+
+@pytest.mark.parametrize("update, message", [
+    ({"id": "not an id"}, "Invalid id: not an id"),
+    (
+        {"id": str(ObjectId()), "pushHighlights": [{"senseRanks": [{"rank": 1, "senseId": "bad"}]}]},
+        "Invalid senseId: bad"
+    ),
+])
+def test_bulk_update_contents_invalid_ids(mutation_client: FlaskClient, update: dict, message: str):
+    result = post_graphql(mutation_client, bulk_mutation % "", variables={"updates": [update]})
+
+    assert result["data"]["bulkUpdateContents"] is None
+    assert result["errors"][0].startswith(message)
+    assert not hasattr(app.schema.contents, "writes")
+
+
+def test_bulk_update_contents_max_updates(mutation_client: FlaskClient, monkeypatch):
+    monkeypatch.setattr(app.schema, "max_bulk_updates", 1)
+    updates = [{"id": str(document["_id"])} for document in mutation_client.documents]
+
+    result = post_graphql(mutation_client, bulk_mutation % "", variables={"updates": updates})
+
+    assert result["data"]["bulkUpdateContents"] is None
+    assert result["errors"][0].startswith("updates must have at most 1 items.")
+
+
+def test_bulk_update_contents_annotation(mutation_client: FlaskClient):
+    first = mutation_client.documents[0]
+    highlight = {"position": 0, "score": 50, "senseRanks": []}
+
+    post_graphql(mutation_client, bulk_mutation % "", variables={"updates": [
+        {"id": str(first["_id"]), "text": "new text"},
+    ]})
+    post_graphql(mutation_client, bulk_mutation % "", variables={"updates": [
+        {"id": str(first["_id"]), "text": "new text", "highlights": [highlight]},
+        {"id": str(first["_id"]), "text": "new text", "pushHighlights": [highlight]},
+    ]})
+
+    # Only the update without highlights is annotated
+    assert mutation_client.annotated == [first["_id"]]
+
+
+def test_update_content_highlights(mutation_client: FlaskClient):
+    first = mutation_client.documents[0]
+    sense_id = ObjectId()
+    mutation = """
+    mutation Update($id: String!, $highlights: [HighlightInput]) {
+        updateContent(id: $id, highlights: $highlights) {
+            ok
+            content { highlights { position score senseRanks { rank senseId } } }
+        }
+    }
+    """
+    highlight = {"position": 1, "score": 80, "senseRanks": [{"rank": 0.5, "senseId": str(sense_id)}]}
+
+    result = post_graphql(mutation_client, mutation, variables={
+        "id": str(first["_id"]),
+        "highlights": [highlight],
+    })
+
+    # Highlights are stored with senseRanks and ObjectId sense IDs
+    assert first["highlights"] == [
+        {"position": 1, "score": 80, "senseRanks": [{"rank": 0.5, "senseId": sense_id}]}
+    ]
+    assert result["data"]["updateContent"] == {"ok": True, "content": {"highlights": [highlight]}}